@@ -0,0 +1,133 @@
+"""
+机器人消息解析基准测试
+
+用法（在 backend 目录下运行）：
+    python -m benchmarks.bot_parse_benchmark --messages 500 --repeat 20
+
+构造一批典型的机器人消息（各平台长链接、短链接、其他网站链接和无链接的消息），
+统计以下方式每秒解析的消息数：
+    legacy    原实现：每次调用重建平台映射、逐个子串扫描、使用未编译的正则，每个 URL 解析三次主机名
+    compiled  parse_links：预编译正则、按域名后缀查表（结果缓存），每个 URL 解析一次主机名
+"""
+import argparse
+import random
+import re
+import statistics
+import time
+from typing import List, Optional
+from urllib.parse import urlparse
+from routers.bot import parse_links
+
+TEMPLATES = [
+    "年后明牌主线 算力！ http://xhslink.com/o/{code}",
+    "看看这个 https://www.xiaohongshu.com/discovery/item/{hex} 挺有意思",
+    "https://www.bilibili.com/video/BV1{code} 和 https://b23.tv/{code} 都收藏一下",
+    "知乎回答 https://www.zhihu.com/question/{num}/answer/{num2}",
+    "专栏 https://zhuanlan.zhihu.com/p/{num}",
+    "抖音 https://v.douyin.com/{code}/ 以及 https://www.douyin.com/video/{num}",
+    "公众号文章 https://mp.weixin.qq.com/s/{code}_{hex}",
+    "参考 https://github.com/tiangolo/fastapi/issues/{num} 和 https://docs.python.org/3/library/re.html",
+    "今天没有链接，只是聊聊天",
+]
+
+def build_messages(count: int, seed: int = 42) -> List[str]:
+    rng = random.Random(seed)
+    alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+    messages = []
+    for _ in range(count):
+        template = rng.choice(TEMPLATES)
+        messages.append(template.format(
+            code="".join(rng.choice(alphabet) for _ in range(10)),
+            hex=f"{rng.getrandbits(96):024x}",
+            num=rng.randrange(10 ** 8, 10 ** 9),
+            num2=rng.randrange(10 ** 9, 10 ** 10),
+        ))
+    return messages
+
+# ---- 原实现（routers/bot.py 优化前的版本），仅用于对比 ----
+
+def legacy_extract_urls(text: str) -> List[str]:
+    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/\w\-\.?=%&_\-\+]*'
+    urls = re.findall(url_pattern, text)
+    return list(set([url for url in urls if url]))
+
+def legacy_identify_platform(url: str) -> str:
+    parsed_url = urlparse(url)
+    hostname = parsed_url.hostname.lower() if parsed_url.hostname else ""
+    platform_mapping = {
+        'xiaohongshu.com': 'xiaohongshu', 'xhslink.com': 'xiaohongshu', 'xhslink': 'xiaohongshu',
+        'weixin.qq.com': 'wechat', 'mp.weixin.qq.com': 'wechat',
+        'bilibili.com': 'bilibili', 'b23.tv': 'bilibili',
+        'zhihu.com': 'zhihu', 'zhuanlan.zhihu.com': 'zhihu',
+        'douyin.com': 'douyin', 'v.douyin.com': 'douyin',
+    }
+    for domain, platform in platform_mapping.items():
+        if domain in hostname:
+            return platform
+    return 'other'
+
+def legacy_extract_content_id(url: str, platform: str) -> Optional[str]:
+    if platform == 'xiaohongshu':
+        match = re.search(r'/([a-zA-Z0-9]+)$', url) if 'xhslink.com' in url else re.search(r'/item/([a-zA-Z0-9]+)', url)
+    elif platform == 'wechat':
+        match = re.search(r'/s/([a-zA-Z0-9_-]+)', url)
+    elif platform == 'bilibili':
+        match = re.search(r'/([a-zA-Z0-9]+)$', url) if 'b23.tv' in url else re.search(r'/video/([a-zA-Z0-9]+)', url)
+    elif platform == 'zhihu':
+        match = re.search(r'/answer/(\d+)', url) or re.search(r'/question/(\d+)', url)
+    elif platform == 'douyin':
+        match = re.search(r'/([a-zA-Z0-9]+)$', url) if 'v.douyin.com' in url else re.search(r'/video/(\d+)', url)
+    else:
+        return None
+    return match.group(1) if match else None
+
+def legacy_is_short_link(url: str) -> bool:
+    parsed_url = urlparse(url)
+    hostname = parsed_url.hostname.lower() if parsed_url.hostname else ""
+    short_link_domains = ['xhslink.com', 'b23.tv', 'v.douyin.com', 't.cn', 'dwz.cn', 'bit.ly', 'tinyurl.com']
+    return any(domain in hostname for domain in short_link_domains)
+
+def legacy_parse_links(text: str) -> List[dict]:
+    links = []
+    for url in legacy_extract_urls(text):
+        platform = legacy_identify_platform(url)
+        links.append({
+            'url': url,
+            'platform': platform,
+            'content_id': legacy_extract_content_id(url, platform),
+            'short_link': legacy_is_short_link(url),
+        })
+    return links
+
+# ---- 基准测试 ----
+
+def measure(parse, messages: List[str], repeat: int) -> List[float]:
+    """返回每轮的吞吐量（消息数/秒）"""
+    for message in messages[:50]:  # 预热
+        parse(message)
+    rates = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for message in messages:
+            parse(message)
+        rates.append(len(messages) / (time.perf_counter() - started))
+    return rates
+
+def main():
+    parser = argparse.ArgumentParser(description="机器人消息解析基准测试")
+    parser.add_argument("--messages", type=int, default=500, help="每轮解析的消息数（与批量接口上限一致）")
+    parser.add_argument("--repeat", type=int, default=20, help="轮数")
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages)
+    for message in messages:
+        # 两种实现的解析结果一致（原实现的 URL 顺序不固定，按 URL 排序后比较）
+        assert sorted(legacy_parse_links(message), key=lambda link: link['url']) == \
+            sorted(parse_links(message), key=lambda link: link['url']), message
+
+    for name, parse in {"legacy": legacy_parse_links, "compiled": parse_links}.items():
+        rates = measure(parse, messages, args.repeat)
+        print(f"{name:9} median={statistics.median(rates):10,.0f} msg/s  min={min(rates):10,.0f} msg/s")
+
+if __name__ == "__main__":
+    main()
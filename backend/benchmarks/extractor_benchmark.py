@@ -0,0 +1,108 @@
+"""
+小红书/抖音页面字段提取基准测试
+
+用法（在 backend 目录下运行）：
+    python -m benchmarks.extractor_benchmark --padding-kb 300
+
+读取 tests/fixtures/pages 下保存的页面，在 <head> 中填充内联脚本模拟真实页面体积，
+对比旧的逐字段正则提取与单次解析状态JSON的提取耗时。
+"""
+import argparse
+import codecs
+import json
+import os
+import re
+import statistics
+import time
+from services.page_extractor import extract_page_fields
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), '..', '..', 'tests', 'fixtures', 'pages')
+FIXTURES = {
+    'xiaohongshu': 'xiaohongshu_note.html',
+    'douyin': 'douyin_video.html',
+}
+
+LEGACY_IMAGE_PATTERNS = {
+    'xiaohongshu': [
+        r'"cover":"([^"]+)"',
+        r'"defaultCover":"([^"]+)"',
+        r'"imageDefault":"([^"]+)"',
+        r'"url":"([^"]+\\.(?:jpg|jpeg|png|gif|webp))"',
+        r'<meta[^>]*property="og:image"[^>]*content="([^"]+)"',
+        r'<meta[^>]*property="twitter:image"[^>]*content="([^"]+)"',
+        r'https://[^"\'\\s,}]+xhslink[^"\'\\s,}]*',
+        r'https://[^"\'\\s,}]+sns[^"\'\\s,}]*',
+    ],
+    'douyin': [
+        r'"cover":"([^"]+)"',
+        r'"thumbnail":"([^"]+)"',
+        r'"originCover":"([^"]+)"',
+        r'"dynamicCover":"([^"]+)"',
+        r'"staticCover":"([^"]+)"',
+        r'"videoCover":"([^"]+)"',
+        r'<meta[^>]*property="og:image"[^>]*content="([^"]+)"',
+        r'<meta[^>]*property="twitter:image"[^>]*content="([^"]+)"',
+        r'https://[^"\'\\s,}]+aweme[^"\'\\s,}]*',
+        r'https://[^"\'\\s,}]+douyin[^"\'\\s,}]*',
+    ],
+}
+
+def legacy_decode(text: str) -> str:
+    try:
+        return json.loads(f'"{text}"')
+    except Exception:
+        try:
+            return codecs.decode(text, 'unicode-escape') if '\\u' in text else text
+        except Exception:
+            return text
+
+def legacy_extract(platform: str, page: str) -> dict:
+    """改造前的提取方式：对整页逐字段执行未编译的正则"""
+    title = ''
+    for pattern in [r'"title":"([^"]+)"', r'"desc":"([^"]+)"', r'<title>(.*?)</title>']:
+        match = re.search(pattern, page, re.IGNORECASE | re.DOTALL)
+        if match:
+            title = legacy_decode(match.group(1)).strip()
+            break
+    desc_match = re.search(r'"desc":"([^"]+)"', page)
+    desc = legacy_decode(desc_match.group(1)) if desc_match else ''
+    cover_image = ''
+    for pattern in LEGACY_IMAGE_PATTERNS[platform]:
+        matches = re.findall(pattern, page, re.IGNORECASE)
+        if matches:
+            cover_image = matches[0]
+            break
+    author_match = re.search(r'"nickname":"([^"]+)"', page)
+    author = legacy_decode(author_match.group(1)) if author_match else ''
+    content_type = 'video' if 'video' in page.lower() else 'post'
+    return {'title': title, 'content': desc, 'cover_image': cover_image, 'author': author, 'content_type': content_type}
+
+def pad_page(page: str, padding_kb: int) -> str:
+    """在 <head> 中插入内联脚本，模拟打包后的大体积页面"""
+    chunk = 'var a%d=function(e,t){return e&&t?{x:e,y:t}:null};'
+    filler = ''.join(chunk % i for i in range(padding_kb * 1024 // len(chunk % 0)))
+    return page.replace('</head>', f'<script>{filler}</script></head>', 1)
+
+def measure(func, platform: str, page: str, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(platform, page)
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="页面字段提取基准测试")
+    parser.add_argument("--padding-kb", type=int, default=300, help="每个页面填充的脚本体积（KB）")
+    parser.add_argument("--repeat", type=int, default=50, help="重复次数")
+    args = parser.parse_args()
+
+    for platform, filename in FIXTURES.items():
+        with open(os.path.join(FIXTURES_DIR, filename), encoding='utf-8') as f:
+            page = pad_page(f.read(), args.padding_kb)
+        legacy = measure(legacy_extract, platform, page, args.repeat)
+        current = measure(extract_page_fields, platform, page, args.repeat)
+        print(f"{platform:12} size={len(page) // 1024:4d}KB legacy={legacy:7.2f}ms extractor={current:7.2f}ms speedup={legacy / current:5.1f}x")
+
+if __name__ == "__main__":
+    main()
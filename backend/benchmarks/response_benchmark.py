@@ -0,0 +1,95 @@
+"""
+列表响应编码基准测试
+
+用法（在 backend 目录下运行）：
+    python -m benchmarks.response_benchmark --items 100 --repeat 2000
+
+构造一页收藏列表（collection_to_dict 的输出），分别统计以下方式从 PaginatedResponse
+到响应字节的耗时分位数：
+    default        FastAPI 默认流程：按 response_model 校验、序列化后由 JSONResponse 编码（原实现）
+    default-typed  同上，response_model 声明为 PaginatedResponse[List[Collection]]
+    orjson         FastJSONRoute：浅拷贝后由 FastJSONResponse 一次编码
+"""
+import argparse
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+from typing import List
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from models import Collection as CollectionModel, ContentTypeEnum, PlatformEnum
+from routers.collections import collection_to_dict
+from schemas import Collection, PaginatedResponse
+from utils.responses import FastJSONResponse
+
+def build_page(items: int) -> PaginatedResponse:
+    """生成一页典型的收藏数据"""
+    now = datetime(2024, 1, 1, 12, 0, 0)
+    rows = []
+    for i in range(items):
+        collection = CollectionModel(
+            id=i + 1, user_id=1, platform=PlatformEnum.BILIBILI, content_id=f"BV1{i:08d}",
+            title=f"收藏标题 {i} 深度学习入门教程", content="这是一段内容摘要，" * 20,
+            url=f"https://www.bilibili.com/video/BV1{i:08d}", author=f"作者{i}",
+            cover_image=f"https://i0.hdslb.com/bfs/archive/{i:08d}.jpg", content_type=ContentTypeEnum.VIDEO,
+            category="学习", category_id=3, tags='["教程", "编程", "AI"]', like_count=i % 7,
+            collected_at=now - timedelta(minutes=i), created_at=now, updated_at=now
+        )
+        rows.append(collection_to_dict(collection))
+    return PaginatedResponse(data=rows, next_cursor="eyJhIjoxfQ", message="Collections retrieved successfully")
+
+def run(coro):
+    """serialize_response 在 is_coroutine=True 时不会挂起，直接驱动协程取结果"""
+    try:
+        coro.send(None)
+    except StopIteration as e:
+        return e.value
+    raise RuntimeError("serialize_response suspended unexpectedly")
+
+def default_encoder(response_model):
+    field = create_response_field(name="response", type_=response_model, mode="serialization")
+
+    def encode(page: PaginatedResponse) -> bytes:
+        content = run(serialize_response(field=field, response_content=page))
+        return JSONResponse(content).body
+    return encode
+
+def orjson_encode(page: PaginatedResponse) -> bytes:
+    return FastJSONResponse(dict(page)).body
+
+def measure(encode, page: PaginatedResponse, repeat: int) -> List[float]:
+    for _ in range(min(repeat, 50)):  # 预热
+        encode(page)
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        encode(page)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="列表响应编码基准测试")
+    parser.add_argument("--items", type=int, default=100, help="每页收藏数量")
+    parser.add_argument("--repeat", type=int, default=2000, help="每种方式的重复次数")
+    args = parser.parse_args()
+
+    page = build_page(args.items)
+    encoders = {
+        "default": default_encoder(PaginatedResponse),
+        "default-typed": default_encoder(PaginatedResponse[List[Collection]]),
+        "orjson": orjson_encode,
+    }
+
+    expected = json.loads(encoders["default"](page))
+    for name, encode in encoders.items():
+        body = encode(page)
+        assert json.loads(body) == expected, name  # 三种方式输出的 JSON 内容一致
+        timings = measure(encode, page, args.repeat)
+        p99 = timings[int(len(timings) * 0.99) - 1]
+        print(f"{name:14} size={len(body):6d}B p50={statistics.median(timings):7.3f}ms p99={p99:7.3f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ class Settings(BaseSettings):
     
     # Redis配置
     REDIS_URL: str = "redis://localhost:6379/0"
+    URL_CACHE_MAX_ENTRIES: int = 10000  # URL元数据进程内缓存条目上限
     
     # JWT配置
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -29,13 +30,49 @@ class Settings(BaseSettings):
     CHROME_DRIVER_PATH: str = "/usr/local/bin/chromedriver"
     REQUEST_TIMEOUT: int = 30
     MAX_RETRIES: int = 3
+    HTTP_MAX_CONNECTIONS: int = 200  # 共享连接池总连接数
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 50  # 保持的空闲长连接数
+    HTTP_MAX_CONNECTIONS_PER_HOST: int = 10  # 单个域名并发请求数（未在 OUTBOUND_DOMAIN_LIMITS 中配置时）
+    OUTBOUND_RATE_PER_SECOND: float = 2  # 单个域名每秒请求数，0 表示不限速
+    OUTBOUND_BURST: int = 5  # 单个域名允许的突发请求数
+    # 按域名覆盖限流参数（rate / burst / concurrency），子域名共用上级域名的配置
+    OUTBOUND_DOMAIN_LIMITS: dict = {
+        "xiaohongshu.com": {"rate": 1, "burst": 3, "concurrency": 2},
+        "xhslink.com": {"rate": 1, "burst": 3, "concurrency": 2},
+        "douyin.com": {"rate": 1, "burst": 3, "concurrency": 2},
+        "zhihu.com": {"rate": 1, "burst": 3, "concurrency": 2},
+        "weixin.qq.com": {"rate": 1, "burst": 3, "concurrency": 2},
+        "bilibili.com": {"rate": 3, "burst": 6, "concurrency": 4},
+    }
+    
+    # 导入配置
+    IMPORT_MAX_FILE_SIZE_MB: int = 100  # 导入文件大小上限
+    
+    # 点赞计数配置
+    LIKE_FLUSH_INTERVAL_SECONDS: int = 5  # 点赞增量写回数据库的间隔
+    
+    # 后台清理配置
+    JANITOR_INTERVAL_SECONDS: int = 300  # 清理过期回收站消息等数据的间隔
+    JANITOR_BATCH_SIZE: int = 500  # 每个事务删除的行数
     
     # 监控配置
     ENABLE_MONITORING: bool = True
     LOG_LEVEL: str = "INFO"
+    LOOP_LAG_CHECK_INTERVAL_MS: int = 500  # 事件循环延迟的采样间隔
+    LOOP_LAG_THRESHOLD_MS: int = 100  # 事件循环被占用超过该时长时记录日志和调用栈
+    THREADPOOL_MAX_WORKERS: int = 40  # 同步接口和 run_in_threadpool 共用线程池的线程数上限
     
     # 机器人配置
     BOT_TOKEN: Optional[str] = None  # 外部机器人调用验证token
+    BOT_WORKER_CONCURRENCY: int = 4  # worker 同时处理的链接数
+    BOT_WORKER_POLL_INTERVAL_SECONDS: float = 2  # 队列为空时的轮询间隔
+    BOT_WORKER_METRICS_PORT: int = 9101  # worker 暴露 Prometheus 指标的端口
+    BOT_JOB_LEASE_SECONDS: int = 300  # 任务租约时长，执行期间每隔三分之一租约时长续约
+    BOT_JOB_MAX_ATTEMPTS: int = 5  # 超过后转入死信
+    BOT_JOB_RETRY_BASE_SECONDS: int = 30  # 重试退避基数，每次失败翻倍
+    BOT_JOB_RETRY_MAX_SECONDS: int = 3600  # 重试退避上限
+    BOT_DEDUPE_WINDOW_SECONDS: int = 600  # 相同消息（或相同消息ID）在该时间内重复到达时直接返回首次的结果
+    LIST_COUNT_CACHE_TTL_SECONDS: int = 30  # 消息、回收站列表总数的缓存时间，0 表示每次精确计算
     
     class Config:
         env_file = ".env"
@@ -1,3 +1,5 @@
+import asyncio
+import anyio
 from fastapi import FastAPI, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -10,6 +12,11 @@ from loguru import logger
 
 # 导入路由
 from routers import auth, collections, categories, tags, hot_content, users, bot
+from services.http_client import http_client
+from services.like_counter import flush_like_counts, flush_periodically
+from services.loop_monitor import loop_monitor
+from services.janitor import janitor
+from utils.responses import FastJSONResponse
 
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
@@ -23,7 +30,8 @@ app = FastAPI(
     description="多平台媒体聚合系统API",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse
 )
 
 # 配置CORS
@@ -44,6 +52,45 @@ app.include_router(tags.router, prefix="/api/v1", tags=["标签"])
 app.include_router(hot_content.router, prefix="/api/v1", tags=["热门内容"])
 app.include_router(bot.router, prefix="/api/v1", tags=["机器人"])
 
+@app.on_event("startup")
+async def configure_threadpool():
+    """同步接口在线程池中执行，限制线程数以免同时占用过多数据库连接"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_MAX_WORKERS
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    """监控事件循环是否被同步代码阻塞"""
+    loop_monitor.start()
+
+@app.on_event("startup")
+async def start_like_counter_flush():
+    """定期将点赞数增量写回收藏表"""
+    app.state.like_flush_task = asyncio.create_task(flush_periodically(settings.LIKE_FLUSH_INTERVAL_SECONDS))
+
+@app.on_event("startup")
+async def start_janitor():
+    """定期清理过期的回收站消息等数据"""
+    janitor.start()
+
+@app.on_event("shutdown")
+async def stop_janitor():
+    janitor.stop()
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """关闭共享的外部请求连接池"""
+    await http_client.close()
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    loop_monitor.stop()
+
+@app.on_event("shutdown")
+async def stop_like_counter_flush():
+    """停止定期写回并写回剩余的点赞增量"""
+    app.state.like_flush_task.cancel()
+    flush_like_counts()
+
 @app.get("/health")
 async def health_check():
     """健康检查端点"""
@@ -0,0 +1,40 @@
+"""
+迁移辅助函数
+
+应用启动时仍会执行 Base.metadata.create_all，已有数据库中可能已经存在部分表和索引，
+因此迁移中的建表、建索引都先检查是否存在，保证在任何已有库上都可以安全执行。
+"""
+from typing import List
+import sqlalchemy as sa
+from alembic import op
+
+def has_table(table: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(table)
+
+def index_names(table: str) -> set:
+    inspector = sa.inspect(op.get_bind())
+    names = {index["name"] for index in inspector.get_indexes(table)}
+    names.update(constraint["name"] for constraint in inspector.get_unique_constraints(table))
+    return names
+
+def create_table_if_missing(table: str, *columns, **kwargs):
+    if not has_table(table):
+        op.create_table(table, *columns, **kwargs)
+
+def create_index_if_missing(name: str, table: str, columns: List[str], unique: bool = False):
+    if name not in index_names(table):
+        op.create_index(name, table, columns, unique=unique)
+
+def drop_index_if_exists(name: str, table: str):
+    if has_table(table) and name in index_names(table):
+        op.drop_index(name, table_name=table)
+
+def column_names(table: str) -> set:
+    return {column["name"] for column in sa.inspect(op.get_bind()).get_columns(table)}
+
+def add_column_if_missing(table: str, column: sa.Column) -> bool:
+    """返回是否新增了该列，便于只在首次添加时回填数据"""
+    if column.name in column_names(table):
+        return False
+    op.add_column(table, column)
+    return True
@@ -0,0 +1,184 @@
+"""initial schema
+
+建立迁移前由 create_all 创建的全部表，以及此前在模型中声明的索引。
+已通过 create_all 建好的数据库上执行时只会补齐缺失的表和索引。
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_table_if_missing, create_index_if_missing
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PLATFORM_VALUES = ('xiaohongshu', 'wechat', 'bilibili', 'douyin', 'zhihu', 'other')
+PLATFORM_NAMES = ('XIAOHONGSHU', 'WECHAT', 'BILIBILI', 'DOUYIN', 'ZHIHU', 'OTHER')
+CONTENT_TYPE_NAMES = ('POST', 'VIDEO', 'ARTICLE', 'IMAGE')
+
+INDEXES = [
+    ('ix_users_id', 'users', ['id'], False),
+    ('ix_users_username', 'users', ['username'], True),
+    ('ix_users_email', 'users', ['email'], True),
+    ('ix_categories_id', 'categories', ['id'], False),
+    ('ix_tags_id', 'tags', ['id'], False),
+    ('ix_collections_id', 'collections', ['id'], False),
+    ('ix_collections_user_collected', 'collections', ['user_id', 'collected_at', 'id'], False),
+    ('ix_collections_user_platform_content', 'collections', ['user_id', 'platform', 'content_id'], False),
+    ('ix_collection_search_terms_id', 'collection_search_terms', ['id'], False),
+    ('ix_search_terms_user_term', 'collection_search_terms', ['user_id', 'term', 'weight', 'collection_id'], False),
+    ('ix_search_terms_collection_term', 'collection_search_terms', ['collection_id', 'term', 'weight'], False),
+    ('ix_collection_tags_id', 'collection_tags', ['id'], False),
+    ('ix_collection_tags_tag_collection', 'collection_tags', ['tag_id', 'collection_id'], False),
+    ('ix_collection_tags_user_tag', 'collection_tags', ['user_id', 'tag_id'], False),
+    ('ix_likes_id', 'likes', ['id'], False),
+    ('ix_likes_collection_id', 'likes', ['collection_id'], False),
+    ('ix_import_jobs_id', 'import_jobs', ['id'], False),
+    ('ix_import_jobs_user_id', 'import_jobs', ['user_id'], False),
+    ('ix_hot_contents_id', 'hot_contents', ['id'], False),
+    ('ix_bot_messages_id', 'bot_messages', ['id'], False),
+    ('ix_bot_messages_received', 'bot_messages', ['received_at', 'id'], False),
+    ('ix_bot_messages_trash_id', 'bot_messages_trash', ['id'], False),
+    ('ix_bot_messages_trash_deleted', 'bot_messages_trash', ['deleted_at', 'id'], False),
+]
+
+
+def upgrade() -> None:
+    create_table_if_missing(
+        'users',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('username', sa.String(50), nullable=False),
+        sa.Column('email', sa.String(100), nullable=False),
+        sa.Column('hashed_password', sa.String(100), nullable=False),
+        sa.Column('is_active', sa.Boolean()),
+        sa.Column('is_superuser', sa.Boolean()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    create_table_if_missing(
+        'categories',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('name', sa.String(50), nullable=False),
+        sa.Column('description', sa.Text()),
+        sa.Column('color', sa.String(7)),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    create_table_if_missing(
+        'tags',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('name', sa.String(30), nullable=False, unique=True),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    create_table_if_missing(
+        'collections',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('platform', sa.Enum(*PLATFORM_VALUES, name='platformenum'), nullable=False),
+        sa.Column('content_id', sa.String(100), nullable=False),
+        sa.Column('title', sa.String(200), nullable=False),
+        sa.Column('content', sa.Text()),
+        sa.Column('url', sa.String(500)),
+        sa.Column('author', sa.String(100)),
+        sa.Column('cover_image', sa.String(500)),
+        sa.Column('content_type', sa.Enum(*CONTENT_TYPE_NAMES, name='contenttypeenum')),
+        sa.Column('category', sa.String(50)),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('categories.id')),
+        sa.Column('tags', sa.Text()),
+        sa.Column('collected_at', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('updated_at', sa.DateTime()),
+    )
+    create_table_if_missing(
+        'collection_search_terms',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('collection_id', sa.Integer(), sa.ForeignKey('collections.id'), nullable=False),
+        sa.Column('term', sa.String(64), nullable=False),
+        sa.Column('weight', sa.Integer()),
+    )
+    create_table_if_missing(
+        'collection_tags',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('collection_id', sa.Integer(), sa.ForeignKey('collections.id'), nullable=False),
+        sa.Column('tag_id', sa.Integer(), sa.ForeignKey('tags.id'), nullable=False),
+        sa.UniqueConstraint('collection_id', 'tag_id', name='uq_collection_tags_collection_tag'),
+    )
+    create_table_if_missing(
+        'likes',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('collection_id', sa.Integer(), sa.ForeignKey('collections.id'), nullable=False),
+        sa.Column('liked_at', sa.DateTime()),
+    )
+    create_table_if_missing(
+        'import_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('filename', sa.String(255)),
+        sa.Column('format', sa.String(10), nullable=False),
+        sa.Column('status', sa.String(20)),
+        sa.Column('total_bytes', sa.Integer()),
+        sa.Column('processed_bytes', sa.Integer()),
+        sa.Column('processed', sa.Integer()),
+        sa.Column('created', sa.Integer()),
+        sa.Column('duplicates', sa.Integer()),
+        sa.Column('failed', sa.Integer()),
+        sa.Column('errors', sa.Text()),
+        sa.Column('error_message', sa.Text()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('started_at', sa.DateTime()),
+        sa.Column('finished_at', sa.DateTime()),
+    )
+    create_table_if_missing(
+        'hot_contents',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('platform', sa.Enum(*PLATFORM_NAMES, name='platformenum'), nullable=False),
+        sa.Column('title', sa.String(200), nullable=False),
+        sa.Column('url', sa.String(500), nullable=False),
+        sa.Column('hot_score', sa.Integer()),
+        sa.Column('crawled_at', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime()),
+    )
+    create_table_if_missing(
+        'bot_messages',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('source', sa.String(50)),
+        sa.Column('parsed_urls', sa.Text()),
+        sa.Column('total_links', sa.Integer()),
+        sa.Column('processed', sa.Boolean()),
+        sa.Column('received_at', sa.DateTime()),
+    )
+    create_table_if_missing(
+        'bot_messages_trash',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('original_id', sa.Integer(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('source', sa.String(50)),
+        sa.Column('parsed_urls', sa.Text()),
+        sa.Column('total_links', sa.Integer()),
+        sa.Column('processed', sa.Boolean()),
+        sa.Column('received_at', sa.DateTime(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime()),
+        sa.Column('deleted_by', sa.Integer(), sa.ForeignKey('users.id')),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+    )
+
+    for name, table, columns, unique in INDEXES:
+        create_index_if_missing(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    for table in ('bot_messages_trash', 'bot_messages', 'hot_contents', 'import_jobs', 'likes',
+                  'collection_tags', 'collection_search_terms', 'collections', 'tags', 'categories', 'users'):
+        op.drop_table(table)
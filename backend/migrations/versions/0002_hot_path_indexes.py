@@ -0,0 +1,42 @@
+"""hot path indexes
+
+为列表筛选、机器人消息来源筛选、热门内容URL查找等高频查询补充组合索引。
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 10:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_if_missing, drop_index_if_exists
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_collections_user_platform_collected', 'collections', ['user_id', 'platform', 'collected_at', 'id']),
+    ('ix_collections_user_category_collected', 'collections', ['user_id', 'category', 'collected_at', 'id']),
+    ('ix_collections_user_category_id_collected', 'collections', ['user_id', 'category_id', 'collected_at', 'id']),
+    ('ix_categories_user_name', 'categories', ['user_id', 'name']),
+    ('ix_hot_contents_url', 'hot_contents', ['url']),
+    ('ix_hot_contents_score', 'hot_contents', ['hot_score']),
+    ('ix_hot_contents_platform_score', 'hot_contents', ['platform', 'hot_score']),
+    ('ix_bot_messages_source_received', 'bot_messages', ['source', 'received_at', 'id']),
+    ('ix_bot_messages_trash_expires', 'bot_messages_trash', ['expires_at']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        create_index_if_missing(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        drop_index_if_exists(name, table)
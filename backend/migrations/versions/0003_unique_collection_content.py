@@ -0,0 +1,44 @@
+"""unique collection content
+
+将 (user_id, platform, content_id) 索引改为唯一索引，作为收藏 upsert 的冲突目标。
+库中存在重复收藏时无法建立唯一索引，需先执行 python -m services.collection_upsert 合并重复数据。
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 11:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_if_missing, drop_index_if_exists
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+KEY_COLUMNS = ['user_id', 'platform', 'content_id']
+
+
+def upgrade() -> None:
+    duplicates = op.get_bind().execute(sa.text(
+        "SELECT COUNT(*) FROM (SELECT 1 FROM collections GROUP BY user_id, platform, content_id "
+        "HAVING COUNT(*) > 1) AS duplicate_groups"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} duplicate collection groups found, "
+            "run `python -m services.collection_upsert` before upgrading"
+        )
+
+    # 先建新索引再删旧索引，保证 user_id 外键始终有可用的索引
+    create_index_if_missing('uq_collections_user_platform_content', 'collections', KEY_COLUMNS, unique=True)
+    drop_index_if_exists('ix_collections_user_platform_content', 'collections')
+
+
+def downgrade() -> None:
+    create_index_if_missing('ix_collections_user_platform_content', 'collections', KEY_COLUMNS)
+    drop_index_if_exists('uq_collections_user_platform_content', 'collections')
@@ -0,0 +1,42 @@
+"""like counts
+
+为收藏增加反规范化的 like_count 列并按 likes 表回填；清理重复点赞后
+在 (user_id, collection_id) 上建立唯一索引。
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 11:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import add_column_if_missing, create_index_if_missing, drop_index_if_exists
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 重复点赞只保留最早的一条（MySQL 不允许在 DELETE 的子查询中直接读取同一张表，需多包一层）
+    op.execute(
+        "DELETE FROM likes WHERE id NOT IN ("
+        "SELECT id FROM (SELECT MIN(id) AS id FROM likes GROUP BY user_id, collection_id) AS first_likes)"
+    )
+    create_index_if_missing('uq_likes_user_collection', 'likes', ['user_id', 'collection_id'], unique=True)
+
+    if add_column_if_missing('collections', sa.Column('like_count', sa.Integer(), nullable=False, server_default='0')):
+        op.execute(
+            "UPDATE collections SET like_count = "
+            "(SELECT COUNT(*) FROM likes WHERE likes.collection_id = collections.id)"
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('collections') as batch_op:
+        batch_op.drop_column('like_count')
+    drop_index_if_exists('uq_likes_user_collection', 'likes')
@@ -0,0 +1,46 @@
+"""collection changes
+
+为收藏增加 change_seq 列（最近一次变化时用户的数据版本号）并建立 (user_id, change_seq, id) 索引，
+新增 collection_tombstones 表记录删除的收藏，用于增量同步接口。已有收藏的 change_seq 为 0。
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 12:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import add_column_if_missing, create_index_if_missing, create_table_if_missing, drop_index_if_exists
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_column_if_missing('collections', sa.Column('change_seq', sa.Integer(), nullable=False, server_default='0'))
+    create_index_if_missing('ix_collections_user_change_seq', 'collections', ['user_id', 'change_seq', 'id'])
+
+    create_table_if_missing(
+        'collection_tombstones',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('collection_id', sa.Integer(), nullable=False),
+        sa.Column('change_seq', sa.Integer(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime()),
+    )
+    create_index_if_missing('ix_collection_tombstones_id', 'collection_tombstones', ['id'])
+    create_index_if_missing(
+        'ix_collection_tombstones_user_change_seq', 'collection_tombstones', ['user_id', 'change_seq', 'collection_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('collection_tombstones')
+    drop_index_if_exists('ix_collections_user_change_seq', 'collections')
+    with op.batch_alter_table('collections') as batch_op:
+        batch_op.drop_column('change_seq')
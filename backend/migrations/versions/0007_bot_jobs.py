@@ -0,0 +1,44 @@
+"""bot jobs
+
+新增 bot_jobs 表，作为机器人链接处理的持久化任务队列。
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_if_missing, create_table_if_missing
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_table_if_missing(
+        'bot_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('url', sa.String(500), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('lease_owner', sa.String(100)),
+        sa.Column('leased_until', sa.DateTime()),
+        sa.Column('last_error', sa.Text()),
+        sa.Column('created_at', sa.DateTime()),
+        sa.Column('finished_at', sa.DateTime()),
+    )
+    create_index_if_missing('ix_bot_jobs_id', 'bot_jobs', ['id'])
+    create_index_if_missing('ix_bot_jobs_status_run_at', 'bot_jobs', ['status', 'run_at'])
+    create_index_if_missing('ix_bot_jobs_status_leased', 'bot_jobs', ['status', 'leased_until'])
+
+
+def downgrade() -> None:
+    op.drop_table('bot_jobs')
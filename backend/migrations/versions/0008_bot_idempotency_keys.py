@@ -0,0 +1,38 @@
+"""bot idempotency keys
+
+新增 bot_idempotency_keys 表，记录去重窗口内已处理的机器人请求及其响应。
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_if_missing, create_table_if_missing
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_table_if_missing(
+        'bot_idempotency_keys',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('endpoint', sa.String(20), nullable=False),
+        sa.Column('key', sa.String(64), nullable=False),
+        sa.Column('response', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    create_index_if_missing('ix_bot_idempotency_keys_id', 'bot_idempotency_keys', ['id'])
+    create_index_if_missing('uq_bot_idempotency_endpoint_key', 'bot_idempotency_keys', ['endpoint', 'key'], unique=True)
+    create_index_if_missing('ix_bot_idempotency_created', 'bot_idempotency_keys', ['created_at'])
+
+
+def downgrade() -> None:
+    op.drop_table('bot_idempotency_keys')
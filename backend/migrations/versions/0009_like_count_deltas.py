@@ -0,0 +1,35 @@
+"""like count deltas
+
+新增 like_count_deltas 表：点赞增量与点赞记录在同一事务内写入数据库，
+取代进程内的写缓冲，多个进程看到相同的待写回增量，对账可以在线执行。
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 10:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from migrations.helpers import create_index_if_missing, create_table_if_missing
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_table_if_missing(
+        'like_count_deltas',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('collection_id', sa.Integer(), nullable=False),
+        sa.Column('delta', sa.Integer(), nullable=False),
+    )
+    create_index_if_missing('ix_like_count_deltas_collection', 'like_count_deltas', ['collection_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('like_count_deltas')
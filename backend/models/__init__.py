@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, Enum, Index, UniqueConstraint, func, select
+from sqlalchemy.orm import column_property, relationship
 from database import Base
 from datetime import datetime
 import enum
@@ -27,6 +27,7 @@ class User(Base):
     hashed_password = Column(String(100), nullable=False)
     is_active = Column(Boolean, default=True)
     is_superuser = Column(Boolean, default=False)
+    data_version = Column(Integer, nullable=False, default=0, server_default="0")  # 收藏/分类数据版本号（用于列表 ETag）
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -49,7 +50,9 @@ class Collection(Base):
     content_type = Column(Enum(ContentTypeEnum), default=ContentTypeEnum.POST)
     category = Column(String(50))  # AI分类结果（保留兼容性）
     category_id = Column(Integer, ForeignKey("categories.id"))  # 用户选择的分类
-    tags = Column(Text)  # JSON格式存储标签
+    tags = Column(Text)  # JSON格式存储标签（展示用副本，筛选与统计使用 collection_tags）
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")  # 点赞数（like_count_deltas 中的增量定期写回）
+    change_seq = Column(Integer, nullable=False, default=0, server_default="0")  # 最近一次变化时用户的数据版本号（增量同步）
     collected_at = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -59,18 +62,101 @@ class Collection(Base):
     likes = relationship("Like", back_populates="collection")
     category_ref = relationship("Category")  # 用户分类关联
 
+    __table_args__ = (
+        Index("ix_collections_user_collected", "user_id", "collected_at", "id"),  # 游标分页
+        Index("uq_collections_user_platform_content", "user_id", "platform", "content_id", unique=True),  # 同一内容只收藏一次，upsert 冲突目标
+        Index("ix_collections_user_platform_collected", "user_id", "platform", "collected_at", "id"),  # 按平台筛选
+        Index("ix_collections_user_category_collected", "user_id", "category", "collected_at", "id"),  # 按AI分类筛选
+        Index("ix_collections_user_category_id_collected", "user_id", "category_id", "collected_at", "id"),  # 按用户分类筛选
+        Index("ix_collections_user_change_seq", "user_id", "change_seq", "id"),  # 增量同步
+    )
+
+class CollectionTombstone(Base):
+    """已删除收藏的墓碑，供增量同步通知客户端删除本地缓存"""
+    __tablename__ = "collection_tombstones"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    collection_id = Column(Integer, nullable=False)  # 收藏已删除，不建外键
+    change_seq = Column(Integer, nullable=False)  # 删除时用户的数据版本号
+    deleted_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_collection_tombstones_user_change_seq", "user_id", "change_seq", "collection_id"),  # 增量同步
+    )
+
+class CollectionSearchTerm(Base):
+    """收藏全文检索倒排索引：每个 (收藏, 词项) 一行"""
+    __tablename__ = "collection_search_terms"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    collection_id = Column(Integer, ForeignKey("collections.id"), nullable=False)
+    term = Column(String(64), nullable=False)  # 拉丁单词或中日韩二元组
+    weight = Column(Integer, default=1)  # 字段权重 × 词频
+
+    __table_args__ = (
+        Index("ix_search_terms_user_term", "user_id", "term", "weight", "collection_id"),  # 覆盖索引，单词项按权重取前N
+        Index("ix_search_terms_collection_term", "collection_id", "term", "weight"),  # 候选集校验与删除
+    )
+
+class ImportJob(Base):
+    """收藏导入任务，记录文件处理进度与结果"""
+    __tablename__ = "import_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    filename = Column(String(255))
+    format = Column(String(10), nullable=False)  # ndjson / csv
+    status = Column(String(20), default="pending")  # pending / running / completed / failed
+    total_bytes = Column(Integer, default=0)
+    processed_bytes = Column(Integer, default=0)
+    processed = Column(Integer, default=0)  # 已读取的记录数
+    created = Column(Integer, default=0)
+    duplicates = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    errors = Column(Text)  # JSON格式存储前若干条错误
+    error_message = Column(Text)  # 任务整体失败原因
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
 class Like(Base):
     __tablename__ = "likes"
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    collection_id = Column(Integer, ForeignKey("collections.id"), nullable=False)
+    collection_id = Column(Integer, ForeignKey("collections.id"), nullable=False, index=True)
     liked_at = Column(DateTime, default=datetime.utcnow)
     
     # 关系
     user = relationship("User", back_populates="likes")
     collection = relationship("Collection", back_populates="likes")
 
+    __table_args__ = (
+        Index("uq_likes_user_collection", "user_id", "collection_id", unique=True),  # 同一用户只能点赞一次
+    )
+
+class LikeCountDelta(Base):
+    """点赞数增量：与点赞记录在同一事务内追加，由 like_counter 定期合并写回 collections.like_count"""
+    __tablename__ = "like_count_deltas"
+
+    id = Column(Integer, primary_key=True)
+    collection_id = Column(Integer, nullable=False)  # 不加外键，收藏删除后残留的增量写回时不匹配任何行
+    delta = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_like_count_deltas_collection", "collection_id"),
+    )
+
+# 尚未写回 like_count 的增量，读取点赞数时加上；延迟加载，列表只在需要点赞数时一起查询
+Collection.pending_like_count = column_property(
+    select(func.coalesce(func.sum(LikeCountDelta.delta), 0))
+    .where(LikeCountDelta.collection_id == Collection.id)
+    .scalar_subquery(),
+    deferred=True
+)
+
 class Category(Base):
     __tablename__ = "categories"
     
@@ -84,6 +170,10 @@ class Category(Base):
     # 关系
     user = relationship("User")
 
+    __table_args__ = (
+        Index("ix_categories_user_name", "user_id", "name"),  # 用户分类列表与重名检查
+    )
+
 class Tag(Base):
     __tablename__ = "tags"
     
@@ -91,6 +181,21 @@ class Tag(Base):
     name = Column(String(30), unique=True, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class CollectionTag(Base):
+    """收藏与标签的关联，每个 (收藏, 标签) 一行"""
+    __tablename__ = "collection_tags"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    collection_id = Column(Integer, ForeignKey("collections.id"), nullable=False)
+    tag_id = Column(Integer, ForeignKey("tags.id"), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("collection_id", "tag_id", name="uq_collection_tags_collection_tag"),
+        Index("ix_collection_tags_tag_collection", "tag_id", "collection_id"),  # 按标签筛选收藏
+        Index("ix_collection_tags_user_tag", "user_id", "tag_id"),  # 用户标签计数
+    )
+
 class HotContent(Base):
     __tablename__ = "hot_contents"
     
@@ -102,6 +207,12 @@ class HotContent(Base):
     crawled_at = Column(DateTime, default=datetime.utcnow)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_hot_contents_url", "url"),  # 爬取结果按URL更新
+        Index("ix_hot_contents_score", "hot_score"),  # 热门列表
+        Index("ix_hot_contents_platform_score", "platform", "hot_score"),  # 按平台的热门列表
+    )
+
 class BotMessage(Base):
     __tablename__ = "bot_messages"
     
@@ -113,6 +224,11 @@ class BotMessage(Base):
     processed = Column(Boolean, default=False)  # 是否已处理
     received_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        Index("ix_bot_messages_received", "received_at", "id"),  # 游标分页
+        Index("ix_bot_messages_source_received", "source", "received_at", "id"),  # 按来源筛选
+    )
+
 class BotMessageTrash(Base):
     __tablename__ = "bot_messages_trash"
     
@@ -126,4 +242,45 @@ class BotMessageTrash(Base):
     received_at = Column(DateTime, nullable=False)  # 原始接收时间
     deleted_at = Column(DateTime, default=datetime.utcnow)  # 删除时间
     deleted_by = Column(Integer, ForeignKey("users.id"))  # 删除者ID
-    expires_at = Column(DateTime, nullable=False)  # 过期时间（7天后）
\ No newline at end of file
+    expires_at = Column(DateTime, nullable=False)  # 过期时间（7天后）
+
+    __table_args__ = (
+        Index("ix_bot_messages_trash_deleted", "deleted_at", "id"),  # 游标分页
+        Index("ix_bot_messages_trash_expires", "expires_at"),  # 清理过期消息
+    )
+
+class BotIdempotencyKey(Base):
+    """机器人请求去重记录：去重窗口内相同请求直接返回首次的响应"""
+    __tablename__ = "bot_idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    endpoint = Column(String(20), nullable=False)  # parse / message
+    key = Column(String(64), nullable=False)  # 请求头中的消息ID或消息内容的哈希
+    response = Column(Text, nullable=False)  # 首次响应（JSON）
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("uq_bot_idempotency_endpoint_key", "endpoint", "key", unique=True),  # 并发重试只有一个能写入
+        Index("ix_bot_idempotency_created", "created_at"),  # 清理过期记录
+    )
+
+class BotJob(Base):
+    """机器人链接处理任务（持久化队列），由独立的 worker 进程租约执行"""
+    __tablename__ = "bot_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    url = Column(String(500), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending / running / succeeded / dead
+    attempts = Column(Integer, nullable=False, default=0)  # 已租约执行的次数
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)  # 最早可执行时间（重试退避）
+    lease_owner = Column(String(100))  # 当前租约标识
+    leased_until = Column(DateTime)  # 租约到期时间，worker 异常退出后任务在此之后重新可被租约
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_bot_jobs_status_run_at", "status", "run_at"),  # 租约待执行任务
+        Index("ix_bot_jobs_status_leased", "status", "leased_until"),  # 回收过期租约
+    )
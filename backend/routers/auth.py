@@ -8,10 +8,11 @@ from models import User as UserModel
 from database import get_db
 from utils.security import verify_password, get_password_hash, create_access_token, decode_access_token
 from config.settings import settings
+from utils.responses import FastJSONRoute
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.post("/register", response_model=SuccessResponse)
 def register(user: UserCreate, db: Session = Depends(get_db)):
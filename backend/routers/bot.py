@@ -1,17 +1,24 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Header, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Header, Response, status, Query
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, Any, List, Optional, Tuple
+from pydantic import BaseModel, Field, ValidationError
 import re
 import json
 from datetime import datetime, timezone, timedelta
-from urllib.parse import urlparse
 from services.scraper import ScraperFactory
 from services.ai_classifier import ai_classifier
-from models import Collection as CollectionModel, User as UserModel, BotMessage as BotMessageModel, BotMessageTrash as BotMessageTrashModel
+from services import bot_dedupe, bot_trash, collection_upsert
+from services.list_counts import list_counts
+from services.data_version import record_collection_changes
+from services.bot_jobs import PermanentJobError, enqueue_jobs
+from services.platforms import classify_host, url_hostname
+from models import User as UserModel, BotMessage as BotMessageModel, BotMessageTrash as BotMessageTrashModel, BotJob as BotJobModel
 from schemas import CollectionCreate, SuccessResponse
 from database import get_db
 from routers.auth import get_current_user
+from utils.pagination import keyset_paginate
+from utils.responses import FastJSONRoute
 from config.settings import settings
 from loguru import logger
 
@@ -24,7 +31,7 @@ def to_beijing_time(dt: datetime) -> datetime:
         dt = dt.replace(tzinfo=timezone.utc)
     return dt.astimezone(BEIJING_TZ)
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 class BotMessageRequest(BaseModel):
     """机器人消息请求模型"""
@@ -36,154 +43,109 @@ class BotResponse(BaseModel):
     message: str
     data: Optional[Dict[str, Any]] = None
 
-class LinkInfo(BaseModel):
-    """链接信息模型"""
-    url: str
-    platform: str
-    content_id: Optional[str] = None
-    short_link: bool = False
+PARSE_BATCH_MAX_MESSAGES = 500  # 批量解析每次最多的消息数
+
+class BotBatchMessage(BaseModel):
+    """批量解析中的单条消息"""
+    message: str = Field(..., description="包含链接的消息内容", min_length=1)
+    message_id: Optional[str] = Field(None, description="平台消息ID，用于去重；未提供时按消息内容去重")
+
+class BotBatchParseRequest(BaseModel):
+    """批量解析请求模型"""
+    messages: List[BotBatchMessage] = Field(..., min_length=1, max_length=PARSE_BATCH_MAX_MESSAGES)
+
+# URL 正则，支持短链接和长链接
+URL_PATTERN = re.compile(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/\w\-\.?=%&_\-\+]*')
+
+# 各平台内容ID的正则，按顺序尝试第一个匹配的
+CONTENT_ID_PATTERNS = {
+    'xiaohongshu': [re.compile(r'/item/([a-zA-Z0-9]+)')],  # https://www.xiaohongshu.com/discovery/item/xxxxxx
+    'wechat': [re.compile(r'/s/([a-zA-Z0-9_-]+)')],  # 微信文章URL
+    'bilibili': [re.compile(r'/video/([a-zA-Z0-9]+)')],  # https://www.bilibili.com/video/BVxxxxxxxx
+    'zhihu': [re.compile(r'/answer/(\d+)'), re.compile(r'/question/(\d+)')],  # https://www.zhihu.com/question/xxxxx/answer/xxxxx
+    'douyin': [re.compile(r'/video/(\d+)')],  # https://www.douyin.com/video/xxxxx
+}
+# 平台短链接（http://xhslink.com/o/375N4Taih1F、https://b23.tv/xxxxx、https://v.douyin.com/xxxxx）直接取短链接代码
+SHORT_LINK_ID_PATTERN = re.compile(r'/([a-zA-Z0-9]+)$')
 
 def extract_urls(text: str) -> List[str]:
-    """从文本中提取URL（支持http和https）"""
-    # 更强大的URL正则表达式，支持短链接和长链接
-    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/\w\-\.?=%&_\-\+]*'
-    urls = re.findall(url_pattern, text)
-    
-    # 去重并过滤空值
-    unique_urls = list(set([url for url in urls if url]))
-    return unique_urls
+    """从文本中提取URL（支持http和https），去重并保持出现顺序"""
+    return list(dict.fromkeys(url for url in URL_PATTERN.findall(text) if url))
 
 def identify_platform(url: str) -> str:
     """识别URL所属平台"""
-    parsed_url = urlparse(url)
-    hostname = parsed_url.hostname.lower() if parsed_url.hostname else ""
-    
-    # 支持更多平台和短链接
-    platform_mapping = {
-        # 小红书
-        'xiaohongshu.com': 'xiaohongshu',
-        'xhslink.com': 'xiaohongshu',  # 小红书短链接
-        'xhslink': 'xiaohongshu',
-        # 微信
-        'weixin.qq.com': 'wechat',
-        'mp.weixin.qq.com': 'wechat',
-        # B站
-        'bilibili.com': 'bilibili',
-        'b23.tv': 'bilibili',  # B站短链接
-        # 知乎
-        'zhihu.com': 'zhihu',
-        'zhuanlan.zhihu.com': 'zhihu',
-        # 抖音
-        'douyin.com': 'douyin',
-        'v.douyin.com': 'douyin',  # 抖音短链接
-    }
-    
-    for domain, platform in platform_mapping.items():
-        if domain in hostname:
-            return platform
-    
-    return 'other'
+    return classify_host(url_hostname(url))[0]
 
-def extract_content_id(url: str, platform: str) -> Optional[str]:
+def extract_content_id(url: str, platform: str, short_link: Optional[bool] = None) -> Optional[str]:
     """从URL中提取内容ID"""
-    try:
-        if platform == 'xiaohongshu':
-            # 小红书URL格式: https://www.xiaohongshu.com/discovery/item/xxxxxx
-            # 小红书短链接: http://xhslink.com/o/375N4Taih1F
-            if 'xhslink.com' in url:
-                # 短链接，直接返回短链接代码
-                match = re.search(r'/([a-zA-Z0-9]+)$', url)
-                return match.group(1) if match else None
-            else:
-                match = re.search(r'/item/([a-zA-Z0-9]+)', url)
-                return match.group(1) if match else None
-        elif platform == 'wechat':
-            # 微信文章URL
-            match = re.search(r'/s/([a-zA-Z0-9_-]+)', url)
-            return match.group(1) if match else None
-        elif platform == 'bilibili':
-            # B站URL格式: https://www.bilibili.com/video/BVxxxxxxxx
-            # B站短链接: https://b23.tv/xxxxx
-            if 'b23.tv' in url:
-                match = re.search(r'/([a-zA-Z0-9]+)$', url)
-                return match.group(1) if match else None
-            else:
-                match = re.search(r'/video/([a-zA-Z0-9]+)', url)
-                return match.group(1) if match else None
-        elif platform == 'zhihu':
-            # 知乎URL格式: https://www.zhihu.com/question/xxxxx/answer/xxxxx
-            match = re.search(r'/answer/(\d+)', url)
-            if match:
-                return match.group(1)
-            match = re.search(r'/question/(\d+)', url)
-            return match.group(1) if match else None
-        elif platform == 'douyin':
-            # 抖音URL格式: https://www.douyin.com/video/xxxxx
-            # 抖音短链接: https://v.douyin.com/xxxxx
-            if 'v.douyin.com' in url:
-                match = re.search(r'/([a-zA-Z0-9]+)$', url)
-                return match.group(1) if match else None
-            else:
-                match = re.search(r'/video/(\d+)', url)
-                return match.group(1) if match else None
-        else:
-            return None
-    except Exception as e:
-        logger.error(f"Failed to extract content ID from {url}: {e}")
+    patterns = CONTENT_ID_PATTERNS.get(platform)
+    if not patterns:
         return None
+    if short_link is None:
+        short_link = is_short_link(url)
+    if short_link:
+        patterns = [SHORT_LINK_ID_PATTERN]
+    for pattern in patterns:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
 
 def is_short_link(url: str) -> bool:
     """判断是否为短链接"""
-    parsed_url = urlparse(url)
-    hostname = parsed_url.hostname.lower() if parsed_url.hostname else ""
-    
-    short_link_domains = [
-        'xhslink.com',
-        'b23.tv',
-        'v.douyin.com',
-        't.cn',
-        'dwz.cn',
-        'bit.ly',
-        'tinyurl.com'
-    ]
-    
-    return any(domain in hostname for domain in short_link_domains)
-
-async def process_content_async(url: str, user_id: int, db: Session):
-    """异步处理内容收集"""
+    return classify_host(url_hostname(url))[1]
+
+def parse_links(text: str) -> List[dict]:
+    """提取消息中的链接并解析平台、内容ID和是否短链接，每个URL只解析一次主机名"""
+    links = []
+    for url in extract_urls(text):
+        platform, short_link = classify_host(url_hostname(url))
+        links.append({
+            'url': url,
+            'platform': platform,
+            'content_id': extract_content_id(url, platform, short_link),
+            'short_link': short_link,
+        })
+    return links
+
+def process_bot_job(db: Session, job: BotJobModel):
+    """
+    处理机器人链接任务：爬取内容、AI分类和摘要后保存到收藏库（由 services.bot_worker 调用）
+
+    抛出 PermanentJobError 的链接直接转入死信，其他异常按退避时间重试。
+    """
+    url, user_id = job.url, job.user_id
+
+    # 识别平台
+    platform = identify_platform(url)
+    if platform == 'other':
+        raise PermanentJobError(f"Unsupported platform for URL: {url}")
+
+    # 提取内容ID
+    content_id = extract_content_id(url, platform)
+    if not content_id:
+        raise PermanentJobError(f"Failed to extract content ID from URL: {url}")
+
+    # 爬取内容
+    scraper_result = ScraperFactory.scrape_content(platform, content_id)
+    if not scraper_result:
+        raise RuntimeError(f"Failed to scrape content from {url}")
+
+    # AI分类
+    ai_result = ai_classifier.classify_content(
+        scraper_result.get('title', ''),
+        scraper_result.get('content', ''),
+        platform
+    )
+
+    # 生成摘要
+    summary = ai_classifier.generate_summary(
+        scraper_result.get('title', ''),
+        scraper_result.get('content', '')
+    )
+
+    # 创建收藏记录
     try:
-        # 识别平台
-        platform = identify_platform(url)
-        if platform == 'other':
-            logger.warning(f"Unsupported platform for URL: {url}")
-            return
-        
-        # 提取内容ID
-        content_id = extract_content_id(url, platform)
-        if not content_id:
-            logger.warning(f"Failed to extract content ID from URL: {url}")
-            return
-        
-        # 爬取内容
-        scraper_result = ScraperFactory.scrape_content(platform, content_id)
-        if not scraper_result:
-            logger.warning(f"Failed to scrape content from {url}")
-            return
-        
-        # AI分类
-        ai_result = ai_classifier.classify_content(
-            scraper_result.get('title', ''),
-            scraper_result.get('content', ''),
-            platform
-        )
-        
-        # 生成摘要
-        summary = ai_classifier.generate_summary(
-            scraper_result.get('title', ''),
-            scraper_result.get('content', '')
-        )
-        
-        # 创建收藏记录
         collection_data = CollectionCreate(
             platform=platform,
             content_id=content_id,
@@ -195,17 +157,15 @@ async def process_content_async(url: str, user_id: int, db: Session):
             category=ai_result['categories'][0] if ai_result['categories'] else None,
             tags=ai_result['tags']
         )
-        
-        db_collection = CollectionModel(**collection_data.model_dump(), user_id=user_id)
-        db.add(db_collection)
-        db.commit()
-        db.refresh(db_collection)
-        
-        logger.info(f"Successfully processed content: {url}")
-        
-    except Exception as e:
-        logger.error(f"Error processing content {url}: {e}")
-        db.rollback()
+    except ValidationError as e:
+        raise PermanentJobError(f"Invalid scraped content from {url}: {e}")
+
+    # 同一内容重复推送时刷新已有收藏，不再新增记录
+    collection, created = collection_upsert.upsert_collection(db, user_id, collection_data.model_dump())
+    record_collection_changes(db, user_id, [collection.id])
+    db.commit()
+
+    logger.info(f"Successfully processed content: {url} ({'created' if created else 'refreshed'})")
 
 def verify_bot_token(authorization: Optional[str] = Header(None)) -> bool:
     """验证机器人token"""
@@ -228,11 +188,81 @@ def verify_bot_token(authorization: Optional[str] = Header(None)) -> bool:
     
     return True
 
+def replay_response(db: Session, response: Response, endpoint: str, key: str) -> Optional[BotResponse]:
+    """去重窗口内的重复请求直接返回首次的响应，并通过响应头标明"""
+    replayed = bot_dedupe.find_response(db, endpoint, key)
+    if replayed is None:
+        return None
+    response.headers["Idempotent-Replayed"] = "true"
+    return BotResponse(**replayed)
+
+def parse_result(message_id: int, link_infos: List[dict]) -> BotResponse:
+    """单条消息的解析结果"""
+    if not link_infos:
+        return BotResponse(
+            success=False,
+            message="未检测到有效的URL，请发送包含链接的消息",
+            data={"message_id": message_id}
+        )
+    return BotResponse(
+        success=True,
+        message=f"成功解析{len(link_infos)}个链接",
+        data={
+            "message_id": message_id,
+            "total_links": len(link_infos),
+            "links": link_infos
+        }
+    )
+
+def save_parsed_batch(db: Session, messages: List[BotBatchMessage], keys: List[str], source: Optional[str]) -> Tuple[List[dict], int]:
+    """
+    解析并保存一批消息，返回 (按请求顺序的结果, 重复消息数)
+
+    已处理过的消息（包括同一批内重复的消息）直接使用首次的结果。新消息、去重记录都在一次 flush 中写入，
+    整批一次提交。
+    """
+    stored = bot_dedupe.find_responses(db, 'parse', keys)
+    parsed = {}
+    for item, key in zip(messages, keys):
+        if key not in stored and key not in parsed:
+            parsed[key] = (item.message, parse_links(item.message))
+    rows = {
+        key: BotMessageModel(
+            message=message,
+            source=source or "manual",
+            parsed_urls=json.dumps(link_infos, ensure_ascii=False),
+            total_links=len(link_infos),
+            processed=True
+        )
+        for key, (message, link_infos) in parsed.items()
+    }
+    db.add_all(rows.values())
+    db.flush()
+    responses = {key: parse_result(rows[key].id, parsed[key][1]).model_dump() for key in parsed}
+    bot_dedupe.save_responses(db, 'parse', responses)
+    db.commit()
+    list_counts.adjust('bot_messages', bot_trash.message_count_deltas({source or "manual": len(rows)}))
+    return [stored.get(key) or responses[key] for key in keys], len(keys) - len(parsed)
+
+def commit_once(db: Session, response: Response, endpoint: str, key: str, result: BotResponse) -> BotResponse:
+    """记录去重键并提交；相同请求已被并发处理并先提交时，回滚本次写入并返回先提交的响应"""
+    if bot_dedupe.save_response(db, endpoint, key, result.model_dump()):
+        db.commit()
+        return result
+    db.rollback()
+    replayed = replay_response(db, response, endpoint, key)
+    if replayed is None:
+        raise RuntimeError(f"Idempotency key conflict without a stored response: {endpoint} {key}")
+    return replayed
+
 @router.post("/bot/parse", response_model=BotResponse)
-async def parse_bot_message(
+def parse_bot_message(
     request: BotMessageRequest,
+    response: Response,
     authorization: Optional[str] = Header(None),
     x_message_source: Optional[str] = Header(None, alias="X-Message-Source"),  # 消息来源
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    x_message_id: Optional[str] = Header(None, alias="X-Message-Id"),  # 平台消息ID，重试 webhook 时不变
     db: Session = Depends(get_db)
 ):
     """
@@ -249,6 +279,8 @@ async def parse_bot_message(
     请求头：
     - Authorization: Bearer {your_token} 或直接 {your_token}
     - X-Message-Source: 消息来源（可选，如：feishu、dingtalk）
+    - Idempotency-Key / X-Message-Id: 请求唯一标识（可选），去重窗口内相同标识的请求直接返回首次的结果；
+      未提供时按消息内容去重
     
     请求体：
     {
@@ -279,68 +311,106 @@ async def parse_bot_message(
             detail="Invalid or missing bot token"
         )
     
+    key = bot_dedupe.dedupe_key(request.message, idempotency_key or x_message_id, x_message_source)
+    replayed = replay_response(db, response, 'parse', key)
+    if replayed:
+        return replayed
+    
     try:
-        # 提取URL
-        urls = extract_urls(request.message)
-        
-        # 解析每个链接
-        link_infos = []
-        for url in urls:
-            platform = identify_platform(url)
-            content_id = extract_content_id(url, platform)
-            short_link = is_short_link(url)
-            
-            link_info = LinkInfo(
-                url=url,
-                platform=platform,
-                content_id=content_id,
-                short_link=short_link
-            )
-            link_infos.append(link_info.model_dump())
+        # 提取并解析链接
+        link_infos = parse_links(request.message)
         
         # 保存消息到数据库
         bot_message = BotMessageModel(
             message=request.message,
             source=x_message_source or "manual",
             parsed_urls=json.dumps(link_infos, ensure_ascii=False),
-            total_links=len(urls),
+            total_links=len(link_infos),
             processed=True
         )
         db.add(bot_message)
-        db.commit()
-        db.refresh(bot_message)
+        db.flush()
         
-        logger.info(f"Bot message saved: id={bot_message.id}, links={len(urls)}")
+        parsed = parse_result(bot_message.id, link_infos)
+        result = commit_once(db, response, 'parse', key, parsed)
+        if result is parsed:  # 并发的相同请求先提交时本次写入已回滚
+            list_counts.adjust('bot_messages', bot_trash.message_count_deltas({x_message_source or "manual": 1}))
         
-        if not urls:
-            return BotResponse(
-                success=False,
-                message="未检测到有效的URL，请发送包含链接的消息",
-                data={"message_id": bot_message.id}
-            )
+        logger.info(f"Bot message saved: id={result.data['message_id']}, links={len(link_infos)}")
+        return result
         
+    except Exception as e:
+        logger.error(f"Bot message parsing failed: {e}")
+        return BotResponse(
+            success=False,
+            message="解析消息时发生错误"
+        )
+
+@router.post("/bot/parse/batch", response_model=BotResponse)
+def parse_bot_messages_batch(
+    request: BotBatchParseRequest,
+    authorization: Optional[str] = Header(None),
+    x_message_source: Optional[str] = Header(None, alias="X-Message-Source"),  # 消息来源
+    db: Session = Depends(get_db)
+):
+    """
+    批量解析机器人消息，每次最多 500 条
+    
+    每条消息的解析、保存和去重方式与 /bot/parse 相同（共用去重记录），结果按请求顺序放在 data.results 中，
+    每项与 /bot/parse 的响应格式一致。整批只查询一次去重记录、提交一次。
+    
+    请求体：
+    {
+        "messages": [
+            {"message": "年后明牌主线 算力！ http://xhslink.com/o/375N4Taih1F", "message_id": "om_123"},
+            {"message": "https://www.bilibili.com/video/BV1xx411c7mD"}
+        ]
+    }
+    """
+    # 验证token
+    if not verify_bot_token(authorization):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing bot token"
+        )
+    
+    keys = [bot_dedupe.dedupe_key(item.message, item.message_id, x_message_source) for item in request.messages]
+    try:
+        try:
+            results, replayed_count = save_parsed_batch(db, request.messages, keys, x_message_source)
+        except IntegrityError:
+            # 并发请求先提交了其中的消息，回滚后重新按已处理的结果返回
+            db.rollback()
+            results, replayed_count = save_parsed_batch(db, request.messages, keys, x_message_source)
+        
+        total_links = sum((result["data"] or {}).get("total_links", 0) for result in results)
+        logger.info(f"Bot batch parsed: messages={len(results)}, links={total_links}, replayed={replayed_count}")
         return BotResponse(
             success=True,
-            message=f"成功解析{len(urls)}个链接",
+            message=f"成功解析{len(results)}条消息，共{total_links}个链接",
             data={
-                "message_id": bot_message.id,
-                "total_links": len(urls),
-                "links": link_infos
+                "total_messages": len(results),
+                "total_links": total_links,
+                "replayed_count": replayed_count,
+                "results": results
             }
         )
         
     except Exception as e:
-        logger.error(f"Bot message parsing failed: {e}")
+        logger.error(f"Bot batch parsing failed: {e}")
+        db.rollback()
         return BotResponse(
             success=False,
-            message="解析消息时发生错误"
+            message="批量解析消息时发生错误"
         )
 
 @router.post("/bot/message", response_model=BotResponse)
-async def handle_bot_message(
+def handle_bot_message(
     request: BotMessageRequest,
-    background_tasks: BackgroundTasks,
+    response: Response,
     authorization: Optional[str] = Header(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    x_message_id: Optional[str] = Header(None, alias="X-Message-Id"),
     db: Session = Depends(get_db)
 ):
     """
@@ -348,12 +418,13 @@ async def handle_bot_message(
     
     功能：
     1. 解析消息中的链接
-    2. 自动爬取链接内容
-    3. AI分类和摘要
-    4. 保存到收藏库
+    2. 为每个链接写入持久化任务，由独立的 worker 进程爬取内容、AI分类和摘要后保存到收藏库
+       （python -m services.bot_worker），失败时按指数退避重试，多次失败的链接转入死信
     
     请求头：
     - Authorization: Bearer {your_token}
+    - Idempotency-Key / X-Message-Id: 请求唯一标识（可选），去重窗口内的重复请求返回首次的任务，不会重复抓取；
+      未提供时按消息内容去重
     
     请求体：
     {
@@ -367,6 +438,11 @@ async def handle_bot_message(
             detail="Invalid or missing bot token"
         )
     
+    key = bot_dedupe.dedupe_key(request.message, idempotency_key or x_message_id)
+    replayed = replay_response(db, response, 'message', key)
+    if replayed:
+        return replayed
+    
     try:
         # 提取URL
         urls = extract_urls(request.message)
@@ -385,20 +461,19 @@ async def handle_bot_message(
                 message="系统未配置用户，无法保存收藏"
             )
         
-        # 处理每个URL
-        processed_count = 0
-        for url in urls:
-            background_tasks.add_task(process_content_async, url, user.id, db)
-            processed_count += 1
+        # 每个URL一个任务，与消息在同一事务内提交，进程重启不会丢失
+        jobs = enqueue_jobs(db, user.id, urls)
+        db.flush()
         
-        return BotResponse(
+        return commit_once(db, response, 'message', key, BotResponse(
             success=True,
-            message=f"成功接收到{processed_count}个链接，正在后台处理并保存...",
+            message=f"成功接收到{len(jobs)}个链接，正在后台处理并保存...",
             data={
-                "urls_processed": processed_count,
-                "urls": urls
+                "urls_processed": len(jobs),
+                "urls": urls,
+                "job_ids": [job.id for job in jobs]
             }
-        )
+        ))
         
     except Exception as e:
         logger.error(f"Bot message processing failed: {e}")
@@ -408,11 +483,13 @@ async def handle_bot_message(
         )
 
 @router.get("/bot/messages")
-async def get_bot_messages(
+def get_bot_messages(
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="跳过的记录数"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页的 next_cursor"),
+    skip: int = Query(0, ge=0, deprecated=True, description="跳过的记录数（已废弃，请使用 cursor）"),
     limit: int = Query(50, ge=1, le=100, description="返回的记录数"),
-    source: Optional[str] = Query(None, description="按来源筛选")
+    source: Optional[str] = Query(None, description="按来源筛选"),
+    exact: bool = Query(False, description="精确计算 total（默认使用缓存的总数，可能滞后几十秒）")
 ):
     """
     获取机器人接收到的消息列表
@@ -420,6 +497,8 @@ async def get_bot_messages(
     响应：
     {
         "total": 10,
+        "total_exact": false,
+        "next_cursor": "WyIyMDI0LTAxLTAxVDAwOjAwOjAwIiwxXQ",
         "messages": [
             {
                 "id": 1,
@@ -438,11 +517,16 @@ async def get_bot_messages(
     if source:
         query = query.filter(BotMessageModel.source == source)
     
-    total = query.count()
-    messages = query.order_by(BotMessageModel.received_at.desc()).offset(skip).limit(limit).all()
+    total, total_exact = list_counts.count(query, 'bot_messages', bot_trash.message_filters(source), exact=exact)
+    messages, next_cursor = keyset_paginate(
+        query, BotMessageModel.received_at, BotMessageModel.id, limit,
+        cursor=cursor, skip=skip
+    )
     
     return {
         "total": total,
+        "total_exact": total_exact,
+        "next_cursor": next_cursor,
         "messages": [
             {
                 "id": msg.id,
@@ -467,6 +551,7 @@ async def get_bot_status():
         "version": "2.0.0",
         "endpoints": {
             "parse": "POST /bot/parse - 仅解析链接信息",
+            "parse_batch": "POST /bot/parse/batch - 批量解析多条消息",
             "message": "POST /bot/message - 解析并自动保存到收藏",
             "status": "GET /bot/status - 获取机器人状态",
             "messages": "GET /bot/messages - 获取接收到的消息列表"
@@ -474,7 +559,7 @@ async def get_bot_status():
     }
 
 @router.delete("/bot/messages/{message_id}")
-async def delete_bot_message(
+def delete_bot_message(
     message_id: int,
     authorization: Optional[str] = Header(None),
     db: Session = Depends(get_db),
@@ -492,33 +577,14 @@ async def delete_bot_message(
         )
     
     try:
-        message = db.query(BotMessageModel).filter(BotMessageModel.id == message_id).first()
-        if not message:
+        # 移动到回收站
+        if not bot_trash.move_to_trash(db, [message_id], deleted_by=current_user.id if current_user else None):
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Message not found"
             )
         
-        # 移动到回收站
-        expires_at = datetime.utcnow() + timedelta(days=7)
-        trash_message = BotMessageTrashModel(
-            original_id=message.id,
-            message=message.message,
-            source=message.source,
-            parsed_urls=message.parsed_urls,
-            total_links=message.total_links,
-            processed=message.processed,
-            received_at=message.received_at,
-            deleted_at=datetime.utcnow(),
-            deleted_by=current_user.id if current_user else None,
-            expires_at=expires_at
-        )
-        
-        db.add(trash_message)
-        db.delete(message)
-        db.commit()
-        
-        logger.info(f"Bot message moved to trash: id={message_id}, expires_at={expires_at}")
+        logger.info(f"Bot message moved to trash: id={message_id}")
         return {"success": True, "message": "消息已移至回收站"}
         
     except HTTPException:
@@ -531,7 +597,7 @@ async def delete_bot_message(
         )
 
 @router.post("/bot/messages/batch-delete")
-async def batch_delete_bot_messages(
+def batch_delete_bot_messages(
     message_ids: List[int],
     authorization: Optional[str] = Header(None),
     db: Session = Depends(get_db),
@@ -555,32 +621,8 @@ async def batch_delete_bot_messages(
                 detail="请提供要删除的消息ID列表"
             )
         
-        # 批量移动到回收站
-        messages = db.query(BotMessageModel).filter(
-            BotMessageModel.id.in_(message_ids)
-        ).all()
-        
-        deleted_count = 0
-        expires_at = datetime.utcnow() + timedelta(days=7)
-        
-        for message in messages:
-            trash_message = BotMessageTrashModel(
-                original_id=message.id,
-                message=message.message,
-                source=message.source,
-                parsed_urls=message.parsed_urls,
-                total_links=message.total_links,
-                processed=message.processed,
-                received_at=message.received_at,
-                deleted_at=datetime.utcnow(),
-                deleted_by=current_user.id if current_user else None,
-                expires_at=expires_at
-            )
-            db.add(trash_message)
-            db.delete(message)
-            deleted_count += 1
-        
-        db.commit()
+        # 批量移动到回收站（分块提交）
+        deleted_count = bot_trash.move_to_trash(db, message_ids, deleted_by=current_user.id if current_user else None)
         
         logger.info(f"Batch moved {deleted_count} messages to trash")
         return {
@@ -600,7 +642,7 @@ async def batch_delete_bot_messages(
         )
 
 @router.delete("/bot/messages")
-async def clear_all_bot_messages(
+def clear_all_bot_messages(
     authorization: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: Optional[UserModel] = Depends(get_current_user)
@@ -617,27 +659,8 @@ async def clear_all_bot_messages(
         )
     
     try:
-        messages = db.query(BotMessageModel).all()
-        deleted_count = len(messages)
-        expires_at = datetime.utcnow() + timedelta(days=7)
-        
-        for message in messages:
-            trash_message = BotMessageTrashModel(
-                original_id=message.id,
-                message=message.message,
-                source=message.source,
-                parsed_urls=message.parsed_urls,
-                total_links=message.total_links,
-                processed=message.processed,
-                received_at=message.received_at,
-                deleted_at=datetime.utcnow(),
-                deleted_by=current_user.id if current_user else None,
-                expires_at=expires_at
-            )
-            db.add(trash_message)
-            db.delete(message)
-        
-        db.commit()
+        # 分块移动，每块单独提交；中途失败时已提交的部分留在回收站，可重新清空
+        deleted_count = bot_trash.move_to_trash(db, deleted_by=current_user.id if current_user else None)
         
         logger.info(f"Cleared all bot messages: {deleted_count} moved to trash")
         return {
@@ -655,10 +678,12 @@ async def clear_all_bot_messages(
         )
 
 @router.get("/bot/trash")
-async def get_trash_messages(
+def get_trash_messages(
     db: Session = Depends(get_db),
-    skip: int = Query(0, ge=0, description="跳过的记录数"),
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页的 next_cursor"),
+    skip: int = Query(0, ge=0, deprecated=True, description="跳过的记录数（已废弃，请使用 cursor）"),
     limit: int = Query(50, ge=1, le=100, description="返回的记录数"),
+    exact: bool = Query(False, description="精确计算 total（默认使用缓存的总数，可能滞后几十秒）"),
     current_user: Optional[UserModel] = Depends(get_current_user)
 ):
     """获取回收站消息列表"""
@@ -669,18 +694,18 @@ async def get_trash_messages(
         )
     
     try:
-        # 清理过期消息
-        db.query(BotMessageTrashModel).filter(
-            BotMessageTrashModel.expires_at < datetime.utcnow()
-        ).delete(synchronize_session=False)
-        db.commit()
-        
-        query = db.query(BotMessageTrashModel)
-        total = query.count()
-        trash_messages = query.order_by(BotMessageTrashModel.deleted_at.desc()).offset(skip).limit(limit).all()
+        # 过期消息由后台清理任务删除（services/janitor.py），这里只读并跳过尚未清理的过期消息
+        query = db.query(BotMessageTrashModel).filter(BotMessageTrashModel.expires_at >= datetime.utcnow())
+        total, total_exact = list_counts.count(query, 'bot_messages_trash', exact=exact)
+        trash_messages, next_cursor = keyset_paginate(
+            query, BotMessageTrashModel.deleted_at, BotMessageTrashModel.id, limit,
+            cursor=cursor, skip=skip
+        )
         
         return {
             "total": total,
+            "total_exact": total_exact,
+            "next_cursor": next_cursor,
             "messages": [
                 {
                     "id": msg.id,
@@ -698,6 +723,8 @@ async def get_trash_messages(
                 for msg in trash_messages
             ]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Failed to get trash messages: {e}")
         raise HTTPException(
@@ -706,7 +733,7 @@ async def get_trash_messages(
         )
 
 @router.post("/bot/trash/{trash_id}/restore")
-async def restore_message(
+def restore_message(
     trash_id: int,
     db: Session = Depends(get_db),
     current_user: Optional[UserModel] = Depends(get_current_user)
@@ -765,9 +792,12 @@ async def restore_message(
                 received_at=trash_message.received_at
             )
         
+        source = trash_message.source
         db.add(restored_message)
         db.delete(trash_message)
         db.commit()
+        list_counts.adjust('bot_messages', bot_trash.message_count_deltas({source: 1}))
+        list_counts.adjust('bot_messages_trash', {'': -1})
         
         logger.info(f"Restored message from trash: trash_id={trash_id}")
         return {"success": True, "message": "消息恢复成功"}
@@ -782,8 +812,46 @@ async def restore_message(
             detail="恢复消息失败"
         )
 
+@router.post("/bot/trash/batch-restore")
+def batch_restore_messages(
+    trash_ids: List[int],
+    db: Session = Depends(get_db),
+    current_user: Optional[UserModel] = Depends(get_current_user)
+):
+    """批量从回收站恢复消息，已过期或不存在的消息被跳过"""
+    if not current_user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required"
+        )
+    
+    if not trash_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="请提供要恢复的消息ID列表"
+        )
+    
+    try:
+        restored_count = bot_trash.restore_from_trash(db, trash_ids)
+        
+        logger.info(f"Batch restored {restored_count} messages from trash")
+        return {
+            "success": True,
+            "message": f"成功恢复{restored_count}条消息",
+            "restored_count": restored_count,
+            "skipped_count": len(set(trash_ids)) - restored_count
+        }
+        
+    except Exception as e:
+        logger.error(f"Failed to batch restore messages: {e}")
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="批量恢复失败"
+        )
+
 @router.delete("/bot/trash/{trash_id}")
-async def permanent_delete_message(
+def permanent_delete_message(
     trash_id: int,
     db: Session = Depends(get_db),
     current_user: Optional[UserModel] = Depends(get_current_user)
@@ -806,8 +874,11 @@ async def permanent_delete_message(
                 detail="回收站消息不存在"
             )
         
+        expired = trash_message.expires_at < datetime.utcnow()
         db.delete(trash_message)
         db.commit()
+        if not expired:  # 过期消息不计入回收站总数
+            list_counts.adjust('bot_messages_trash', {'': -1})
         
         logger.info(f"Permanently deleted message from trash: trash_id={trash_id}")
         return {"success": True, "message": "消息已永久删除"}
@@ -823,7 +894,7 @@ async def permanent_delete_message(
         )
 
 @router.delete("/bot/trash")
-async def clear_all_trash(
+def clear_all_trash(
     db: Session = Depends(get_db),
     current_user: Optional[UserModel] = Depends(get_current_user)
 ):
@@ -837,6 +908,7 @@ async def clear_all_trash(
     try:
         deleted_count = db.query(BotMessageTrashModel).delete()
         db.commit()
+        list_counts.invalidate('bot_messages_trash')
         
         logger.info(f"Cleared all trash: {deleted_count} messages")
         return {
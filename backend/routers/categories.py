@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import List
 from schemas import CategoryCreate, CategoryUpdate, Category, SuccessResponse
 from models import Category as CategoryModel, User as UserModel
 from database import get_db
 from routers.auth import get_current_user
+from utils.responses import FastJSONRoute, not_modified
+from services.data_version import bump_data_version, data_version_tag
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 def category_to_dict(category_model: CategoryModel) -> dict:
     """将 SQLAlchemy Category 模型转换为字典"""
@@ -19,7 +21,7 @@ def category_to_dict(category_model: CategoryModel) -> dict:
         'created_at': category_model.created_at.isoformat() if category_model.created_at else None
     }
 
-@router.post("/categories", response_model=SuccessResponse)
+@router.post("/categories", response_model=SuccessResponse[Category])
 def create_category(
     category: CategoryCreate,
     db: Session = Depends(get_db),
@@ -40,22 +42,29 @@ def create_category(
 
     db_category = CategoryModel(**category.model_dump(), user_id=current_user.id)
     db.add(db_category)
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(db_category)
     return SuccessResponse(data=category_to_dict(db_category), message="Category created successfully")
 
-@router.get("/categories", response_model=SuccessResponse)
+@router.get("/categories", response_model=SuccessResponse[List[Category]])
 def get_categories(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    """获取当前用户的分类列表"""
+    """获取当前用户的分类列表，支持 If-None-Match 条件请求"""
+    cached = not_modified(request, response, data_version_tag(current_user))
+    if cached:
+        return cached
+
     categories = db.query(CategoryModel).filter(
         CategoryModel.user_id == current_user.id
     ).all()
     return SuccessResponse(data=[category_to_dict(cat) for cat in categories], message="Categories retrieved successfully")
 
-@router.get("/categories/{category_id}", response_model=SuccessResponse)
+@router.get("/categories/{category_id}", response_model=SuccessResponse[Category])
 def get_category(
     category_id: int,
     db: Session = Depends(get_db),
@@ -73,7 +82,7 @@ def get_category(
         )
     return SuccessResponse(data=category_to_dict(category), message="Category retrieved successfully")
 
-@router.put("/categories/{category_id}", response_model=SuccessResponse)
+@router.put("/categories/{category_id}", response_model=SuccessResponse[Category])
 def update_category(
     category_id: int,
     category_update: CategoryUpdate,
@@ -96,6 +105,7 @@ def update_category(
     for key, value in update_data.items():
         setattr(db_category, key, value)
 
+    bump_data_version(db, current_user.id)
     db.commit()
     db.refresh(db_category)
     return SuccessResponse(data=category_to_dict(db_category), message="Category updated successfully")
@@ -119,5 +129,6 @@ def delete_category(
         )
 
     db.delete(category)
+    bump_data_version(db, current_user.id)
     db.commit()
     return SuccessResponse(message="Category deleted successfully")
\ No newline at end of file
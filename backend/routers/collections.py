@@ -1,22 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Body, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, load_only, undefer
 from typing import List, Optional
-from schemas import CollectionCreate, CollectionUpdate, Collection, SuccessResponse
-from models import Collection as CollectionModel, User as UserModel, Like as LikeModel
+from pydantic import ValidationError
+from schemas import CollectionCreate, CollectionBulkCreate, CollectionUpdate, Collection, CollectionChanges, CollectionSearchHit, SuccessResponse, PaginatedResponse
+from models import Collection as CollectionModel, CollectionTombstone as CollectionTombstoneModel, User as UserModel, ImportJob as ImportJobModel
 from database import get_db
+from config.settings import settings
 from routers.auth import get_current_user
+from utils.pagination import keyset_paginate, encode_sync_token, decode_sync_token
+from utils.responses import FastJSONRoute, not_modified
+from services import search as search_index
+from services import collection_export, collection_import, collection_tags, collection_upsert
+from services.http_client import http_client
+from services.url_cache import url_metadata_cache
+from services.page_extractor import extract_page_fields
+from services.like_counter import add_like, remove_like
+from services.data_version import record_collection_changes, record_collection_deletion, data_version_tag
 from datetime import datetime
 import json
+import os
 import re
-import requests
-import json
-import codecs
+import tempfile
+from operator import attrgetter
 from urllib.parse import urlparse, parse_qs
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
+
+BULK_CREATE_MAX_ITEMS = 1000  # 批量创建单次请求上限
 
-def parse_bilibili_url(url: str) -> dict:
+XHS_NOTE_ID_PATTERN = re.compile(r'/explore/([a-f0-9]+)')
+DOUYIN_VIDEO_ID_PATTERN = re.compile(r'/video/(\d+)')
+DOUYIN_MODAL_ID_PATTERN = re.compile(r'modal_id=(\d+)')
+
+async def parse_bilibili_url(url: str) -> dict:
     """解析B站URL"""
     try:
         # 提取视频ID
@@ -34,7 +52,7 @@ def parse_bilibili_url(url: str) -> dict:
             'Referer': 'https://www.bilibili.com'
         }
         
-        response = requests.get(api_url, headers=headers, timeout=10)
+        response = await http_client.get(api_url, headers=headers, timeout=10)
         response.raise_for_status()
         data = response.json()
         
@@ -57,7 +75,7 @@ def parse_bilibili_url(url: str) -> dict:
     except Exception as e:
         return {'success': False}
 
-def parse_xiaohongshu_url(url: str) -> dict:
+async def parse_xiaohongshu_url(url: str) -> dict:
     """解析小红书URL"""
     try:
         headers = {
@@ -67,105 +85,38 @@ def parse_xiaohongshu_url(url: str) -> dict:
             'Referer': 'https://www.xiaohongshu.com'
         }
         
-        response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
+        response = await http_client.get(url, headers=headers, timeout=15)
         response.raise_for_status()
         
-        # 提取标题 - 尝试多种方式
-        title = ''
-        title_match = re.search(r'"title":"([^"]+)"', response.text)
-        if not title_match:
-            title_match = re.search(r'<title>(.*?)</title>', response.text, re.IGNORECASE)
-        if title_match:
-            title_match_text = title_match.group(1).strip()
-            try:
-                # 尝试直接解析为 JSON 字符串
-                title = json.loads(f'"{title_match_text}"')
-            except:
-                try:
-                    # 如果是字面形式的 \uXXXX，使用 codecs.decode
-                    if '\\u' in title_match_text:
-                        title = codecs.decode(title_match_text, 'unicode-escape')
-                    else:
-                        title = title_match_text
-                except:
-                    title = title_match_text
-        
-        # 提取描述
-        desc = ''
-        desc_match = re.search(r'"desc":"([^"]+)"', response.text)
-        if desc_match:
-            desc_match_text = desc_match.group(1)
-            try:
-                desc = json.loads(f'"{desc_match_text}"')
-            except:
-                try:
-                    if '\\u' in desc_match_text:
-                        desc = codecs.decode(desc_match_text, 'unicode-escape')
-                    else:
-                        desc = desc_match_text
-                except:
-                    desc = desc_match_text
-        
-        # 提取封面图 - 增强版
-        cover_image = ''
-        image_patterns = [
-            r'"cover":"([^"]+)"',
-            r'"defaultCover":"([^"]+)"',
-            r'"imageDefault":"([^"]+)"',
-            r'"url":"([^"]+\\.(?:jpg|jpeg|png|gif|webp))"',
-            r'<meta[^>]*property="og:image"[^>]*content="([^"]+)"',
-            r'<meta[^>]*property="twitter:image"[^>]*content="([^"]+)"',
-            r'https://[^"\'\\s,}]+xhslink[^"\'\\s,}]*',
-            r'https://[^"\'\\s,}]+sns[^"\'\\s,}]*',
-        ]
-        for pattern in image_patterns:
-            if not cover_image:
-                matches = re.findall(pattern, response.text, re.IGNORECASE)
-                if matches:
-                    # 取第一个匹配项
-                    cover_image = matches[0]
-                    break
-        
-        # 提取作者
-        author = ''
-        author_match = re.search(r'"nickname":"([^"]+)"', response.text)
-        if author_match:
-            author_match_text = author_match.group(1)
-            try:
-                author = json.loads(f'"{author_match_text}"')
-            except:
-                try:
-                    if '\\u' in author_match_text:
-                        author = codecs.decode(author_match_text, 'unicode-escape')
-                    else:
-                        author = author_match_text
-                except:
-                    author = author_match_text
+        fields = extract_page_fields('xiaohongshu', response.text)
         
         # 提取笔记ID
-        note_id = url.split('/')[-1]
-        note_id_match = re.search(r'/explore/([a-f0-9]+)', url)
+        note_id = fields.get('content_id') or url.split('/')[-1]
+        note_id_match = XHS_NOTE_ID_PATTERN.search(url)
         if note_id_match:
             note_id = note_id_match.group(1)
         
         # 判断类型（视频或图文）
-        content_type = 'video' if 'video' in response.text.lower() else 'post'
+        if 'note_type' in fields:
+            content_type = 'video' if fields['note_type'] == 'video' else 'post'
+        else:
+            content_type = 'video' if '"type":"video"' in response.text else 'post'
         
         return {
             'success': True,
             'platform': 'xiaohongshu',
             'content_id': note_id,
-            'title': title,
-            'content': desc,
+            'title': fields.get('title', ''),
+            'content': fields.get('content', ''),
             'url': url,
-            'cover_image': cover_image,
-            'author': author,
+            'cover_image': fields.get('cover_image', ''),
+            'author': fields.get('author', ''),
             'content_type': content_type
         }
     except Exception as e:
         # 即使解析失败，也返回基本平台信息
         note_id = url.split('/')[-1]
-        note_id_match = re.search(r'/explore/([a-f0-9]+)', url)
+        note_id_match = XHS_NOTE_ID_PATTERN.search(url)
         if note_id_match:
             note_id = note_id_match.group(1)
         
@@ -181,7 +132,7 @@ def parse_xiaohongshu_url(url: str) -> dict:
             'content_type': 'post'
         }
 
-def parse_douyin_url(url: str) -> dict:
+async def parse_douyin_url(url: str) -> dict:
     """解析抖音URL"""
     try:
         headers = {
@@ -191,135 +142,40 @@ def parse_douyin_url(url: str) -> dict:
             'Referer': 'https://www.douyin.com'
         }
         
-        response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
+        response = await http_client.get(url, headers=headers, timeout=15)
         response.raise_for_status()
         
-        # 辅助函数：解码 Unicode 转义字符
-        def decode_unicode(text):
-            if not text:
-                return text
-            try:
-                # 尝试使用 codecs.decode
-                decoded = text.encode('utf-8').decode('unicode-escape')
-                return decoded
-            except:
-                try:
-                    # 尝试使用 json.loads
-                    return json.loads(f'"{text}"')
-                except:
-                    return text
+        fields = extract_page_fields('douyin', response.text)
         
         # 提取视频ID - 支持多种格式
-        video_id = url.split('/')[-1]
-        video_id_match = re.search(r'/video/(\d+)', response.url)
+        video_id = fields.get('content_id') or url.split('/')[-1]
+        video_id_match = DOUYIN_VIDEO_ID_PATTERN.search(str(response.url))
         if video_id_match:
             video_id = video_id_match.group(1)
         else:
-            video_id_match = re.search(r'modal_id=(\d+)', url)
+            video_id_match = DOUYIN_MODAL_ID_PATTERN.search(url)
             if video_id_match:
                 video_id = video_id_match.group(1)
         
-        # 提取标题 - 尝试多种方式
-        title = ''
-        title_patterns = [
-            r'"title":"([^"]+)"',
-            r'"desc":"([^"]+)"',
-            r'<title>(.*?)</title>'
-        ]
-        for pattern in title_patterns:
-            if not title:
-                title_match = re.search(pattern, response.text, re.IGNORECASE | re.DOTALL)
-                if title_match:
-                    title_match_text = title_match.group(1)
-                    # 处理 Unicode 转义字符
-                    try:
-                        # 尝试直接解析为 JSON 字符串
-                        title = json.loads(f'"{title_match_text}"')
-                    except:
-                        try:
-                            # 如果是字面形式的 \uXXXX，使用 codecs.decode
-                            if '\\u' in title_match_text:
-                                title = codecs.decode(title_match_text, 'unicode-escape')
-                            else:
-                                title = title_match_text
-                        except:
-                            title = title_match_text
-                    title = title.strip()
-                    break
-        
-        # 提取描述
-        desc = ''
-        desc_match = re.search(r'"desc":"([^"]+)"', response.text)
-        if desc_match:
-            desc_match_text = desc_match.group(1)
-            try:
-                desc = json.loads(f'"{desc_match_text}"')
-            except:
-                try:
-                    if '\\u' in desc_match_text:
-                        desc = codecs.decode(desc_match_text, 'unicode-escape')
-                    else:
-                        desc = desc_match_text
-                except:
-                    desc = desc_match_text
-        
-        # 提取封面图 - 增强版
-        cover_image = ''
-        image_patterns = [
-            r'"cover":"([^"]+)"',
-            r'"thumbnail":"([^"]+)"',
-            r'"originCover":"([^"]+)"',
-            r'"dynamicCover":"([^"]+)"',
-            r'"staticCover":"([^"]+)"',
-            r'"videoCover":"([^"]+)"',
-            r'<meta[^>]*property="og:image"[^>]*content="([^"]+)"',
-            r'<meta[^>]*property="twitter:image"[^>]*content="([^"]+)"',
-            r'https://[^"\'\\s,}]+aweme[^"\'\\s,}]*',
-            r'https://[^"\'\\s,}]+douyin[^"\'\\s,}]*',
-        ]
-        for pattern in image_patterns:
-            if not cover_image:
-                matches = re.findall(pattern, response.text, re.IGNORECASE)
-                if matches:
-                    # 取第一个匹配项
-                    cover_image = matches[0]
-                    break
-        
-        # 提取作者
-        author = ''
-        author_match = re.search(r'"nickname":"([^"]+)"', response.text)
-        if author_match:
-            author_match_text = author_match.group(1)
-            try:
-                author = json.loads(f'"{author_match_text}"')
-            except:
-                try:
-                    if '\\u' in author_match_text:
-                        author = codecs.decode(author_match_text, 'unicode-escape')
-                    else:
-                        author = author_match_text
-                except:
-                    author = author_match_text
-        
         return {
             'success': True,
             'platform': 'douyin',
             'content_id': video_id,
-            'title': title or desc,
-            'content': desc,
+            'title': fields.get('title') or fields.get('content', ''),
+            'content': fields.get('content', ''),
             'url': url,
-            'cover_image': cover_image,
-            'author': author,
+            'cover_image': fields.get('cover_image', ''),
+            'author': fields.get('author', ''),
             'content_type': 'video'
         }
     except Exception as e:
         # 即使解析失败，也返回基本平台信息
         video_id = url.split('/')[-1]
-        video_id_match = re.search(r'/video/(\d+)', url)
+        video_id_match = DOUYIN_VIDEO_ID_PATTERN.search(url)
         if video_id_match:
             video_id = video_id_match.group(1)
         else:
-            video_id_match = re.search(r'modal_id=(\d+)', url)
+            video_id_match = DOUYIN_MODAL_ID_PATTERN.search(url)
             if video_id_match:
                 video_id = video_id_match.group(1)
         
@@ -335,7 +191,7 @@ def parse_douyin_url(url: str) -> dict:
             'content_type': 'video'
         }
 
-def parse_wechat_url(url: str) -> dict:
+async def parse_wechat_url(url: str) -> dict:
     """解析微信文章URL"""
     try:
         headers = {
@@ -343,7 +199,7 @@ def parse_wechat_url(url: str) -> dict:
             'Referer': 'https://mp.weixin.qq.com'
         }
         
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await http_client.get(url, headers=headers, timeout=10)
         response.raise_for_status()
         
         # 提取标题（微信文章标题在 msg_title 或 meta 标签中）
@@ -400,7 +256,7 @@ def parse_wechat_url(url: str) -> dict:
             'content_type': 'post'
         }
 
-def parse_zhihu_url(url: str) -> dict:
+async def parse_zhihu_url(url: str) -> dict:
     """解析知乎URL"""
     try:
         headers = {
@@ -410,7 +266,7 @@ def parse_zhihu_url(url: str) -> dict:
             'Referer': 'https://www.zhihu.com'
         }
         
-        response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
+        response = await http_client.get(url, headers=headers, timeout=15)
         response.raise_for_status()
         
         # 提取标题
@@ -501,38 +357,38 @@ def parse_zhihu_url(url: str) -> dict:
             'content_type': 'post'
         }
 
-def parse_url_content(url: str) -> dict:
+async def parse_url_content(url: str) -> dict:
     """解析URL内容，自动识别平台并提取信息"""
     try:
         # 识别平台并调用对应的解析函数
         if 'bilibili.com' in url or 'b23.tv' in url:
-            result = parse_bilibili_url(url)
+            result = await parse_bilibili_url(url)
             if result.get('success'):
                 return result
         
         elif 'xiaohongshu.com' in url or 'xhslink.com' in url:
-            result = parse_xiaohongshu_url(url)
+            result = await parse_xiaohongshu_url(url)
             if result.get('success'):
                 return result
         
         elif 'douyin.com' in url or 'v.douyin.com' in url:
-            result = parse_douyin_url(url)
+            result = await parse_douyin_url(url)
             if result.get('success'):
                 return result
         
         elif 'weixin.qq.com' in url or 'mp.weixin.qq.com' in url:
-            result = parse_wechat_url(url)
+            result = await parse_wechat_url(url)
             if result.get('success'):
                 return result
         
         elif 'zhihu.com' in url or 'zhuanlan.zhihu.com' in url:
-            result = parse_zhihu_url(url)
+            result = await parse_zhihu_url(url)
             if result.get('success'):
                 return result
         
         # 通用解析（作为后备方案）
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
-        response = requests.get(url, timeout=5, headers=headers)
+        response = await http_client.get(url, headers=headers, timeout=5)
         response.raise_for_status()
         
         # 提取title
@@ -584,8 +440,10 @@ def parse_url_content(url: str) -> dict:
         }
 
 @router.post("/collections/parse-url", response_model=SuccessResponse)
-def parse_url(
+async def parse_url(
+    response: Response,
     url_data: dict = Body(...),
+    bypass_cache: bool = Query(False, description="跳过缓存重新抓取（结果仍会写入缓存）"),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
@@ -597,63 +455,170 @@ def parse_url(
             detail="URL is required"
         )
     
-    result = parse_url_content(url)
+    result = None if bypass_cache else await url_metadata_cache.get(url)
+    response.headers["X-Cache"] = "HIT" if result is not None else "MISS"
+    if result is None:
+        result = await parse_url_content(url)
+        await url_metadata_cache.set(url, result)
     return SuccessResponse(data=result, message="URL parsed successfully")
 
-def collection_to_dict(collection_model: CollectionModel, like_count: int = 0) -> dict:
-    """将 SQLAlchemy Collection 模型转换为字典"""
-    return {
-        'id': collection_model.id,
-        'user_id': collection_model.user_id,
-        'platform': collection_model.platform,
-        'content_id': collection_model.content_id,
-        'title': collection_model.title,
-        'content': collection_model.content,
-        'url': collection_model.url,
-        'author': collection_model.author,
-        'cover_image': collection_model.cover_image,
-        'content_type': collection_model.content_type,
-        'category': collection_model.category,
-        'category_id': collection_model.category_id,
-        'tags': json.loads(collection_model.tags) if collection_model.tags else None,
-        'collected_at': collection_model.collected_at.isoformat() if collection_model.collected_at else None,
-        'created_at': collection_model.created_at.isoformat() if collection_model.created_at else None,
-        'updated_at': collection_model.updated_at.isoformat() if collection_model.updated_at else None,
-        'like_count': like_count
-    }
-
-@router.post("/collections", response_model=SuccessResponse)
+def isoformat_or_none(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+# 收藏各字段的取值方式，fields 参数只能取这些字段
+COLLECTION_FIELD_GETTERS = {
+    'id': attrgetter('id'),
+    'user_id': attrgetter('user_id'),
+    'platform': attrgetter('platform'),
+    'content_id': attrgetter('content_id'),
+    'title': attrgetter('title'),
+    'content': attrgetter('content'),
+    'url': attrgetter('url'),
+    'author': attrgetter('author'),
+    'cover_image': attrgetter('cover_image'),
+    'content_type': attrgetter('content_type'),
+    'category': attrgetter('category'),
+    'category_id': attrgetter('category_id'),
+    'tags': lambda c: json.loads(c.tags) if c.tags else None,
+    'collected_at': lambda c: isoformat_or_none(c.collected_at),
+    'created_at': lambda c: isoformat_or_none(c.created_at),
+    'updated_at': lambda c: isoformat_or_none(c.updated_at),
+    'like_count': attrgetter('like_count'),  # 已写回的点赞数
+}
+COLLECTION_FIELDS = tuple(COLLECTION_FIELD_GETTERS)
+COLLECTION_LIST_FIELDS = tuple(field for field in COLLECTION_FIELDS if field != 'content')  # 列表默认不返回正文
+
+def collection_columns(fields, *extra: str) -> list:
+    """fields 需要从数据库读取的列（用于 load_only）"""
+    return [getattr(CollectionModel, column) for column in sorted(set(extra).union(fields))]
+
+def collection_to_dict(collection_model: CollectionModel, fields=COLLECTION_FIELDS, pending_likes: bool = True) -> dict:
+    """
+    将 SQLAlchemy Collection 模型转换为字典，只读取 fields 中的字段，未加载的列不会触发额外查询
+
+    pending_likes 为 True 时点赞数加上尚未写回的增量。列表和增量同步只返回已写回的点赞数：
+    点赞不递增数据版本号（否则热门收藏的所属用户行又成为锁竞争热点），写回时才递增，
+    这样 ETag 与同步令牌覆盖的点赞数总是和版本号一起变化，不会在 304 中返回旧值。
+    """
+    item = {field: COLLECTION_FIELD_GETTERS[field](collection_model) for field in fields}
+    if pending_likes and 'like_count' in item:
+        item['like_count'] += collection_model.pending_like_count
+    return item
+
+def parse_collection_fields(fields: Optional[str]) -> tuple:
+    """解析逗号分隔的 fields 参数，未指定时使用列表默认字段；id 总是返回"""
+    if fields is None:
+        return COLLECTION_LIST_FIELDS
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in COLLECTION_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return tuple(dict.fromkeys(['id'] + requested))
+
+@router.post("/collections", response_model=SuccessResponse[Collection])
 def create_collection(
     collection: CollectionCreate,
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    """创建收藏"""
-    # 处理 tags 字段
-    collection_data = collection.model_dump()
-    if collection_data.get('tags') and len(collection_data['tags']) > 0:
-        collection_data['tags'] = json.dumps(collection_data['tags'])
-    else:
-        collection_data['tags'] = None
-    
-    db_collection = CollectionModel(**collection_data, user_id=current_user.id)
-    db.add(db_collection)
+    """
+    创建收藏
+
+    同一平台内容已收藏过时不新增记录，而是刷新其标题、正文等元数据并合并标签。
+    """
+    db_collection, created = collection_upsert.upsert_collection(db, current_user.id, collection.model_dump())
+    record_collection_changes(db, current_user.id, [db_collection.id])
     db.commit()
     db.refresh(db_collection)
-    return SuccessResponse(data=collection_to_dict(db_collection), message="Collection created successfully")
 
-@router.get("/collections", response_model=SuccessResponse)
+    if created:
+        return SuccessResponse(data=collection_to_dict(db_collection), message="Collection created successfully")
+    return SuccessResponse(data=collection_to_dict(db_collection), message="Collection already exists, metadata refreshed")
+
+@router.post("/collections/bulk", response_model=SuccessResponse)
+def bulk_create_collections(
+    payload: CollectionBulkCreate,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    批量创建收藏
+
+    逐条校验后在同一个事务内用多行 INSERT 写入，校验失败的条目不会写入，
+    并在 errors 中按下标返回错误信息。已收藏过的内容（含请求内重复）跳过并计入 duplicates。
+    """
+    if len(payload.items) > BULK_CREATE_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {BULK_CREATE_MAX_ITEMS} items per request"
+        )
+
+    now = datetime.utcnow().replace(microsecond=0)  # 与 MySQL DATETIME 精度一致
+    rows = []
+    errors = []
+    for index, item in enumerate(payload.items):
+        try:
+            collection_data = CollectionCreate.model_validate(item).model_dump()
+        except ValidationError as e:
+            errors.append({'index': index, 'errors': collection_import.validation_errors(e)})
+            continue
+
+        collection_data['tags'] = collection_tags.tags_to_json(collection_data['tags'])
+        collection_data.update(user_id=current_user.id, collected_at=now, created_at=now, updated_at=now)
+        rows.append(collection_data)
+
+    try:
+        created_ids = collection_import.insert_collection_rows(db, current_user.id, rows)
+        if created_ids:
+            record_collection_changes(db, current_user.id, created_ids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    return SuccessResponse(
+        data={
+            'created': len(created_ids),
+            'created_ids': created_ids,
+            'duplicates': len(rows) - len(created_ids),
+            'failed': len(errors),
+            'errors': errors
+        },
+        message=f"Created {len(created_ids)} collections"
+    )
+
+@router.get("/collections", response_model=PaginatedResponse[List[Collection]])
 def get_collections(
-    skip: int = Query(0, ge=0),
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = Query(None, description="分页游标，取自上一页的 next_cursor"),
+    skip: int = Query(0, ge=0, deprecated=True, description="偏移分页（已废弃，请使用 cursor）"),
     limit: int = Query(20, le=100),
     platform: Optional[str] = None,
     category: Optional[str] = None,
     category_id: Optional[int] = None,
+    tag: Optional[str] = Query(None, description="按标签名筛选"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔；默认返回除 content 外的全部字段"),
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    """获取用户收藏列表"""
-    query = db.query(CollectionModel).filter(CollectionModel.user_id == current_user.id)
+    """
+    获取用户收藏列表
+
+    只从数据库读取 fields 需要的列，正文等大字段未请求时不会加载。
+    响应带 ETag（由用户数据版本号和查询参数生成），If-None-Match 命中时直接返回 304，不执行列表查询。
+    """
+    cached = not_modified(request, response, data_version_tag(current_user))
+    if cached:
+        return cached
+
+    fields = parse_collection_fields(fields)
+    query = db.query(CollectionModel).options(
+        load_only(*collection_columns(fields, 'id', 'collected_at'))  # 游标分页需要 id 和 collected_at
+    ).filter(CollectionModel.user_id == current_user.id)
 
     if platform:
         query = query.filter(CollectionModel.platform == platform)
@@ -661,20 +626,224 @@ def get_collections(
         query = query.filter(CollectionModel.category == category)
     if category_id:
         query = query.filter(CollectionModel.category_id == category_id)
+    if tag:
+        query = query.filter(CollectionModel.id.in_(collection_tags.tagged_collection_ids(tag)))
+
+    rows, next_cursor = keyset_paginate(
+        query, CollectionModel.collected_at, CollectionModel.id, limit,
+        cursor=cursor, skip=skip
+    )
+
+    result = [collection_to_dict(collection, fields, pending_likes=False) for collection in rows]
 
-    collections = query.offset(skip).limit(limit).all()
+    return PaginatedResponse(data=result, next_cursor=next_cursor, message="Collections retrieved successfully")
+
+@router.get("/collections/search", response_model=SuccessResponse[List[CollectionSearchHit]])
+def search_collections(
+    q: str = Query(..., min_length=1, max_length=100, description="检索关键词"),
+    limit: int = Query(20, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """全文检索收藏（标题、正文、作者），按相关度排序并高亮命中片段"""
+    hits = search_index.search_collections(db, current_user.id, q, limit)
+    if not hits:
+        return SuccessResponse(data=[], message="Collections searched successfully")
+
+    rows = db.query(CollectionModel).options(undefer(CollectionModel.pending_like_count)).filter(
+        CollectionModel.id.in_([collection_id for collection_id, _ in hits])
+    ).all()
+    rows_by_id = {collection.id: collection for collection in rows}
 
-    # 添加点赞计数并转换为字典
     result = []
-    for collection in collections:
-        like_count = db.query(func.count(LikeModel.id)).filter(
-            LikeModel.collection_id == collection.id
-        ).scalar() or 0
-        result.append(collection_to_dict(collection, like_count))
+    for collection_id, score in hits:
+        if collection_id not in rows_by_id:
+            continue
+        collection = rows_by_id[collection_id]
+        item = collection_to_dict(collection)
+        item['score'] = score
+        item['highlight'] = {
+            'title': search_index.highlight(collection.title, q),
+            'author': search_index.highlight(collection.author, q),
+            'content': search_index.highlight(collection.content, q, snippet=True)
+        }
+        result.append(item)
 
-    return SuccessResponse(data=result, message="Collections retrieved successfully")
+    return SuccessResponse(data=result, message="Collections searched successfully")
 
-@router.get("/collections/{collection_id}", response_model=SuccessResponse)
+@router.get("/collections/changes", response_model=SuccessResponse[CollectionChanges])
+def get_collection_changes(
+    since: Optional[str] = Query(None, description="同步令牌，取自上次响应的 next_since；为空时返回全部收藏"),
+    limit: int = Query(100, ge=1, le=500),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔；默认返回除 content 外的全部字段"),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    增量同步收藏
+
+    按 (change_seq, id) 顺序返回 since 之后新增或修改的收藏以及删除的收藏ID，
+    两个查询都走 (user_id, change_seq) 索引，开销与变化数量成正比。
+    """
+    if since:
+        last_seq, last_id = decode_sync_token(since)
+        if last_seq > (current_user.data_version or 0):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync token is no longer valid, reload all collections"
+            )
+    else:
+        last_seq, last_id = -1, 0  # 首次同步，包括迁移前 change_seq 为 0 的收藏
+
+    fields = parse_collection_fields(fields)
+    changed = db.query(CollectionModel).options(
+        load_only(*collection_columns(fields, 'id', 'change_seq'))
+    ).filter(
+        CollectionModel.user_id == current_user.id,
+        or_(
+            CollectionModel.change_seq > last_seq,
+            and_(CollectionModel.change_seq == last_seq, CollectionModel.id > last_id)
+        )
+    ).order_by(CollectionModel.change_seq, CollectionModel.id).limit(limit + 1).all()
+
+    deleted = []
+    if since:  # 首次同步时客户端没有本地缓存，不需要墓碑
+        deleted = db.query(CollectionTombstoneModel.change_seq, CollectionTombstoneModel.collection_id).filter(
+            CollectionTombstoneModel.user_id == current_user.id,
+            or_(
+                CollectionTombstoneModel.change_seq > last_seq,
+                and_(CollectionTombstoneModel.change_seq == last_seq, CollectionTombstoneModel.collection_id > last_id)
+            )
+        ).order_by(CollectionTombstoneModel.change_seq, CollectionTombstoneModel.collection_id).limit(limit + 1).all()
+
+    # 两类变化合并后按同步位置排序，只返回前 limit 个
+    changes = sorted(
+        [(c.change_seq, c.id, c) for c in changed] + [(seq, collection_id, None) for seq, collection_id in deleted],
+        key=lambda change: change[:2]
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        next_since = encode_sync_token(*changes[-1][:2])
+    else:
+        next_since = since or encode_sync_token(current_user.data_version or 0, 0)
+
+    return SuccessResponse(
+        data={
+            'changed': [collection_to_dict(c, fields, pending_likes=False) for _, _, c in changes if c is not None],
+            'deleted': [collection_id for _, collection_id, c in changes if c is None],
+            'next_since': next_since,
+            'has_more': has_more
+        },
+        message="Collection changes retrieved successfully"
+    )
+
+@router.get("/collections/export")
+def export_collections(
+    format: str = Query("ndjson", description="导出格式：ndjson、csv 或 json"),
+    gzip: bool = Query(False, description="是否以 gzip 压缩传输"),
+    platform: Optional[str] = None,
+    category_id: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    流式导出当前用户的全部收藏
+
+    通过服务端游标分批读取并边读边写出，内存占用不随收藏数量增长。
+    """
+    if format not in collection_export.EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format, expected one of: {', '.join(collection_export.EXPORT_FORMATS)}"
+        )
+
+    filename = f"collections-{datetime.utcnow().strftime('%Y%m%d')}.{format}"
+    headers = {'Content-Disposition': f'attachment; filename="{filename}"'}
+    if gzip:
+        headers['Content-Encoding'] = 'gzip'
+
+    return StreamingResponse(
+        collection_export.iter_export(db, current_user.id, format, platform, category_id, gzip=gzip),
+        media_type=collection_export.EXPORT_FORMATS[format],
+        headers=headers
+    )
+
+@router.post("/collections/import", response_model=SuccessResponse)
+def import_collections(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="NDJSON 或 CSV 文件"),
+    format: Optional[str] = Query(None, description="文件格式：ndjson 或 csv，默认按扩展名判断"),
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """
+    导入收藏
+
+    上传文件先分块写入临时文件，随后在后台逐行读取、校验、按 (平台, 内容ID) 去重并分批写入。
+    立即返回任务ID，通过 GET /collections/import/{job_id} 查询进度。
+    """
+    if format is None:
+        format = collection_import.IMPORT_FORMATS.get(os.path.splitext(file.filename or '')[1].lower())
+    if format not in set(collection_import.IMPORT_FORMATS.values()):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported import format, expected ndjson or csv"
+        )
+
+    max_bytes = settings.IMPORT_MAX_FILE_SIZE_MB * 1024 * 1024
+    total_bytes = 0
+    fd, path = tempfile.mkstemp(prefix='streamcraft-import-', suffix=f'.{format}')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            while True:
+                chunk = file.file.read(1024 * 1024)
+                if not chunk:
+                    break
+                total_bytes += len(chunk)
+                if total_bytes > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=f"Import file exceeds {settings.IMPORT_MAX_FILE_SIZE_MB}MB"
+                    )
+                f.write(chunk)
+
+        job = ImportJobModel(
+            user_id=current_user.id,
+            filename=file.filename,
+            format=format,
+            status='pending',
+            total_bytes=total_bytes
+        )
+        db.add(job)
+        db.commit()
+        db.refresh(job)
+    except Exception:
+        os.remove(path)
+        raise
+
+    background_tasks.add_task(collection_import.run_import_job, job.id, path)
+    return SuccessResponse(data=collection_import.job_to_dict(job), message="Import job created")
+
+@router.get("/collections/import/{job_id}", response_model=SuccessResponse)
+def get_import_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """查询导入任务进度"""
+    job = db.query(ImportJobModel).filter(
+        ImportJobModel.id == job_id,
+        ImportJobModel.user_id == current_user.id
+    ).first()
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    return SuccessResponse(data=collection_import.job_to_dict(job), message="Import job retrieved successfully")
+
+@router.get("/collections/{collection_id}", response_model=SuccessResponse[Collection])
 def get_collection(
     collection_id: int,
     db: Session = Depends(get_db),
@@ -692,14 +861,9 @@ def get_collection(
             detail="Collection not found"
         )
 
-    # 添加点赞计数
-    like_count = db.query(func.count(LikeModel.id)).filter(
-        LikeModel.collection_id == collection.id
-    ).scalar() or 0
+    return SuccessResponse(data=collection_to_dict(collection), message="Collection retrieved successfully")
 
-    return SuccessResponse(data=collection_to_dict(collection, like_count), message="Collection retrieved successfully")
-
-@router.put("/collections/{collection_id}", response_model=SuccessResponse)
+@router.put("/collections/{collection_id}", response_model=SuccessResponse[Collection])
 def update_collection(
     collection_id: int,
     collection_update: CollectionUpdate,
@@ -719,16 +883,17 @@ def update_collection(
         )
 
     update_data = collection_update.model_dump(exclude_unset=True)
-    # 处理 tags 字段
     if 'tags' in update_data:
-        if update_data['tags'] is not None and len(update_data['tags']) > 0:
-            update_data['tags'] = json.dumps(update_data['tags'])
-        else:
-            update_data['tags'] = None
+        collection_tags.set_collection_tags(db, db_collection, update_data.pop('tags'))
     
     for key, value in update_data.items():
         setattr(db_collection, key, value)
 
+    # 检索字段变化时更新倒排索引
+    if any(field in update_data for field in search_index.FIELD_WEIGHTS):
+        search_index.index_collection(db, db_collection)
+
+    record_collection_changes(db, current_user.id, [db_collection.id])
     db.commit()
     db.refresh(db_collection)
     return SuccessResponse(data=collection_to_dict(db_collection), message="Collection updated successfully")
@@ -751,7 +916,10 @@ def delete_collection(
             detail="Collection not found"
         )
 
+    search_index.remove_collection(db, collection.id)
+    collection_tags.remove_collection(db, collection.id)
     db.delete(collection)
+    record_collection_deletion(db, current_user.id, collection.id)
     db.commit()
     return SuccessResponse(message="Collection deleted successfully")
 
@@ -761,30 +929,21 @@ def like_collection(
     db: Session = Depends(get_db),
     current_user: UserModel = Depends(get_current_user)
 ):
-    """点赞收藏"""
-    # 检查收藏是否存在
-    collection = db.query(CollectionModel).filter(
-        CollectionModel.id == collection_id
-    ).first()
+    """
+    点赞收藏
 
-    if not collection:
+    只写入点赞记录和点赞数增量，收藏的 like_count 由后台任务定期批量更新，热门收藏不会成为锁竞争热点。
+    """
+    # 检查收藏是否存在
+    exists = db.query(CollectionModel.id).filter(CollectionModel.id == collection_id).first()
+    if not exists:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Collection not found"
         )
 
-    # 检查是否已经点赞
-    existing_like = db.query(LikeModel).filter(
-        LikeModel.user_id == current_user.id,
-        LikeModel.collection_id == collection_id
-    ).first()
-
-    if existing_like:
+    if not add_like(db, current_user.id, collection_id):
         return SuccessResponse(message="Already liked")
-
-    # 创建点赞
-    like = LikeModel(user_id=current_user.id, collection_id=collection_id)
-    db.add(like)
     db.commit()
     return SuccessResponse(message="Liked successfully")
 
@@ -795,18 +954,11 @@ def unlike_collection(
     current_user: UserModel = Depends(get_current_user)
 ):
     """取消点赞收藏"""
-    # 查找点赞记录
-    like = db.query(LikeModel).filter(
-        LikeModel.user_id == current_user.id,
-        LikeModel.collection_id == collection_id
-    ).first()
-
-    if not like:
+    if not remove_like(db, current_user.id, collection_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Like not found"
         )
 
-    db.delete(like)
     db.commit()
-    return SuccessResponse(message="Unliked successfully")
\ No newline at end of file
+    return SuccessResponse(message="Unliked successfully")
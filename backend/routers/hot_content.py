@@ -5,8 +5,9 @@ from schemas import HotContent, HotContentCreate, SuccessResponse
 from models import HotContent as HotContentModel
 from database import get_db
 from services.hot_content_crawler import HotContentCrawler
+from utils.responses import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/hot-content", response_model=List[HotContent])
 def get_hot_content(
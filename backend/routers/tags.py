@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
-from schemas import TagCreate, Tag, SuccessResponse
+from schemas import TagCreate, Tag, TagCount, SuccessResponse
 from models import Tag as TagModel, User as UserModel
+from services import collection_tags
 from database import get_db
 from routers.auth import get_current_user
+from utils.responses import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.post("/tags", response_model=Tag)
 def create_tag(
@@ -36,6 +38,14 @@ def get_tags(db: Session = Depends(get_db)):
     tags = db.query(TagModel).all()
     return tags
 
+@router.get("/tags/counts", response_model=SuccessResponse[List[TagCount]])
+def get_tag_counts(
+    db: Session = Depends(get_db),
+    current_user: UserModel = Depends(get_current_user)
+):
+    """获取当前用户各标签下的收藏数量"""
+    return SuccessResponse(data=collection_tags.tag_counts(db, current_user.id), message="Tag counts retrieved successfully")
+
 @router.get("/tags/{tag_id}", response_model=Tag)
 def get_tag(tag_id: int, db: Session = Depends(get_db)):
     """获取单个标签"""
@@ -67,6 +77,7 @@ def delete_tag(
             detail="Tag not found"
         )
     
+    collection_tags.remove_tag(db, tag)
     db.delete(tag)
     db.commit()
     return SuccessResponse(message="Tag deleted successfully")
\ No newline at end of file
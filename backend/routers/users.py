@@ -6,8 +6,9 @@ from models import User as UserModel
 from database import get_db
 from routers.auth import get_current_user
 from utils.security import get_password_hash
+from utils.responses import FastJSONRoute
 
-router = APIRouter()
+router = APIRouter(route_class=FastJSONRoute)
 
 @router.get("/users/me", response_model=User)
 def get_current_user_info(current_user: UserModel = Depends(get_current_user)):
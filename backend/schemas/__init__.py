@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Generic, TypeVar
 from datetime import datetime
 from models import PlatformEnum, ContentTypeEnum
 
@@ -50,6 +50,9 @@ class CollectionBase(BaseModel):
 class CollectionCreate(CollectionBase):
     pass
 
+class CollectionBulkCreate(BaseModel):
+    items: List[Dict[str, Any]]  # 逐条校验为 CollectionCreate，以便返回每条的错误
+
 class CollectionUpdate(BaseModel):
     title: Optional[str] = None
     content: Optional[str] = None
@@ -68,6 +71,16 @@ class Collection(CollectionBase):
     class Config:
         from_attributes = True
 
+class CollectionSearchHit(Collection):
+    score: int  # 命中词项的权重和
+    highlight: Dict[str, str]  # title / author / content 的高亮片段
+
+class CollectionChanges(BaseModel):
+    changed: List[Collection]  # since 之后新增或修改的收藏
+    deleted: List[int]  # since 之后删除的收藏ID
+    next_since: str  # 下次同步使用的令牌
+    has_more: bool  # 为 true 时用 next_since 继续请求剩余的变化
+
 # 分类相关
 class CategoryBase(BaseModel):
     name: str
@@ -104,6 +117,11 @@ class Tag(TagBase):
     class Config:
         from_attributes = True
 
+class TagCount(BaseModel):
+    id: int
+    name: str
+    count: int
+
 # 热门内容相关
 class HotContentBase(BaseModel):
     platform: PlatformEnum
@@ -123,12 +141,16 @@ class HotContent(HotContentBase):
         from_attributes = True
 
 # 通用响应
-from typing import Any
+DataT = TypeVar("DataT")
 
-class SuccessResponse(BaseModel):
+class SuccessResponse(BaseModel, Generic[DataT]):
+    """通用成功响应，路由中用 SuccessResponse[数据模型] 声明 data 的结构"""
     success: bool = True
     message: str
-    data: Optional[Any] = None
+    data: Optional[DataT] = None
+
+class PaginatedResponse(SuccessResponse[DataT], Generic[DataT]):
+    next_cursor: Optional[str] = None  # 下一页游标，为空表示没有更多数据
 
 class ErrorResponse(BaseModel):
     success: bool = False
@@ -0,0 +1,75 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from config.settings import settings
+from models import BotIdempotencyKey
+
+def dedupe_key(message: str, request_id: Optional[str] = None, source: Optional[str] = None) -> str:
+    """
+    请求的去重键
+
+    请求头带有 Idempotency-Key / X-Message-Id 时按该值去重（平台重试 webhook 时不变），
+    否则按消息内容去重（空白差异忽略），覆盖用户重复转发同一条消息的情况。
+    """
+    if request_id:
+        raw = f"id:{source or ''}:{request_id.strip()}"
+    else:
+        raw = f"message:{source or ''}:{' '.join(message.split())}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def window_start() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=settings.BOT_DEDUPE_WINDOW_SECONDS)
+
+def find_responses(db: Session, endpoint: str, keys: List[str]) -> Dict[str, dict]:
+    """去重窗口内已处理过的请求的响应，按去重键返回"""
+    records = db.query(BotIdempotencyKey.key, BotIdempotencyKey.response).filter(
+        BotIdempotencyKey.endpoint == endpoint,
+        BotIdempotencyKey.key.in_(set(keys)),
+        BotIdempotencyKey.created_at >= window_start()
+    )
+    return {record.key: json.loads(record.response) for record in records}
+
+def find_response(db: Session, endpoint: str, key: str) -> Optional[dict]:
+    """去重窗口内已处理过的相同请求的响应，没有时返回 None"""
+    return find_responses(db, endpoint, [key]).get(key)
+
+def delete_expired(db: Session, endpoint: str, keys: List[str]):
+    """窗口外的旧记录不再生效，重新写入前先删除"""
+    db.query(BotIdempotencyKey).filter(
+        BotIdempotencyKey.endpoint == endpoint,
+        BotIdempotencyKey.key.in_(set(keys)),
+        BotIdempotencyKey.created_at < window_start()
+    ).delete(synchronize_session=False)
+
+def new_record(endpoint: str, key: str, response: dict) -> BotIdempotencyKey:
+    return BotIdempotencyKey(
+        endpoint=endpoint, key=key, response=json.dumps(response, ensure_ascii=False),
+        created_at=datetime.utcnow().replace(microsecond=0)  # 与 MySQL DATETIME 精度一致
+    )
+
+def save_response(db: Session, endpoint: str, key: str, response: dict) -> bool:
+    """
+    记录请求的响应，与请求的写入在同一事务内提交（调用方负责提交事务）
+
+    相同请求并发到达时只有一个能写入，返回 False 的一方应回滚事务并改为返回 find_response 的结果。
+    """
+    delete_expired(db, endpoint, [key])
+    try:
+        with db.begin_nested():
+            db.add(new_record(endpoint, key, response))
+    except IntegrityError:
+        return False
+    return True
+
+def save_responses(db: Session, endpoint: str, responses: Dict[str, dict]):
+    """
+    批量记录多个请求的响应（调用方负责提交事务）
+
+    与并发请求写入了相同的键时抛出 IntegrityError，调用方应回滚后重新按 find_responses 的结果处理。
+    """
+    delete_expired(db, endpoint, list(responses))
+    db.add_all([new_record(endpoint, key, response) for key, response in responses.items()])
+    db.flush()
@@ -0,0 +1,145 @@
+import random
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from config.settings import settings
+from models import BotJob
+from loguru import logger
+
+QUEUE_STATUSES = ['pending', 'running', 'dead']  # 计入队列深度的状态；成功的任务只保留记录
+
+class PermanentJobError(Exception):
+    """重试也无法成功的错误（如不支持的链接），任务直接转入死信"""
+
+def utcnow() -> datetime:
+    return datetime.utcnow().replace(microsecond=0)  # 与 MySQL DATETIME 精度一致
+
+def enqueue_jobs(db: Session, user_id: int, urls: List[str]) -> List[BotJob]:
+    """为每个链接创建一个待处理任务（调用方负责提交事务）"""
+    jobs = [BotJob(user_id=user_id, url=url, status='pending', run_at=utcnow()) for url in urls]
+    db.add_all(jobs)
+    return jobs
+
+def expired_lease_filter(now: datetime):
+    """租约已过期的执行中任务（worker 异常退出或执行超时）"""
+    return and_(BotJob.status == 'running', BotJob.leased_until < now)
+
+def due_filter(now: datetime):
+    """可租约的任务：到期的待处理任务，以及租约已过期、未达到最大次数的执行中任务"""
+    return or_(
+        and_(BotJob.status == 'pending', BotJob.run_at <= now),
+        and_(expired_lease_filter(now), BotJob.attempts < settings.BOT_JOB_MAX_ATTEMPTS)
+    )
+
+def dead_letter_expired_leases(db: Session, now: datetime) -> int:
+    """
+    租约过期且已达到最大次数的任务转入死信，返回任务数量（调用方负责提交事务）
+
+    这类任务每次执行都让 worker 退出或超时，不会走到 fail_job，重新租约只会无限重复。
+    """
+    return db.query(BotJob).filter(
+        expired_lease_filter(now), BotJob.attempts >= settings.BOT_JOB_MAX_ATTEMPTS
+    ).update({
+        BotJob.status: 'dead',
+        BotJob.finished_at: now,
+        BotJob.lease_owner: None,
+        BotJob.leased_until: None,
+        BotJob.last_error: 'lease expired',
+    }, synchronize_session=False)
+
+def lease_jobs(db: Session, owner: str, limit: int, lease_seconds: int) -> List[BotJob]:
+    """
+    租约最多 limit 个到期任务
+
+    租约已过期、重试次数已用完的任务先转入死信。然后读出候选任务，再带着同样的条件 UPDATE 抢占，每次租约使用唯一标识，
+    多个 worker 同时租约时每个任务只会被其中一个抢到。不依赖 SKIP LOCKED，MySQL 与 SQLite 行为一致。
+    """
+    now = utcnow()
+    dead = dead_letter_expired_leases(db, now)
+    if dead:
+        db.commit()
+        logger.error(f"Moved {dead} bot jobs with expired leases to dead letter")
+    candidate_ids = [row.id for row in db.query(BotJob.id).filter(due_filter(now)).order_by(BotJob.run_at).limit(limit)]
+    if not candidate_ids:
+        return []
+
+    lease = f"{owner}:{uuid.uuid4().hex}"
+    db.query(BotJob).filter(BotJob.id.in_(candidate_ids), due_filter(now)).update({
+        BotJob.status: 'running',
+        BotJob.lease_owner: lease,
+        BotJob.leased_until: now + timedelta(seconds=lease_seconds),
+        BotJob.attempts: BotJob.attempts + 1,
+    }, synchronize_session=False)
+    db.commit()
+    return db.query(BotJob).filter(BotJob.lease_owner == lease).order_by(BotJob.id).all()
+
+def renew_leases(db: Session, leases: Dict[int, str], lease_seconds: int) -> int:
+    """
+    延长执行中任务的租约（任务ID -> 租约标识），返回延长的任务数
+
+    只延长仍由该租约持有的任务，已被其他 worker 接管或已结束的任务不受影响。
+    """
+    if not leases:
+        return 0
+    renewed = db.query(BotJob).filter(
+        BotJob.id.in_(list(leases)),
+        BotJob.lease_owner.in_(set(leases.values())),
+        BotJob.status == 'running'
+    ).update({BotJob.leased_until: utcnow() + timedelta(seconds=lease_seconds)}, synchronize_session=False)
+    db.commit()
+    return renewed
+
+def retry_delay(attempts: int) -> float:
+    """指数退避：基数 × 2^(attempts-1)，不超过上限，并加最多 10% 的随机抖动避免重试集中"""
+    delay = min(settings.BOT_JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.BOT_JOB_RETRY_MAX_SECONDS)
+    return delay * (1 + random.random() * 0.1)
+
+def complete_job(db: Session, job: BotJob) -> bool:
+    """标记任务成功；租约已被其他 worker 接管时不做修改，返回 False"""
+    updated = db.query(BotJob).filter(BotJob.id == job.id, BotJob.lease_owner == job.lease_owner).update({
+        BotJob.status: 'succeeded',
+        BotJob.finished_at: utcnow(),
+        BotJob.lease_owner: None,
+        BotJob.leased_until: None,
+        BotJob.last_error: None,
+    }, synchronize_session=False)
+    db.commit()
+    return updated > 0
+
+def fail_job(db: Session, job: BotJob, error: str, permanent: bool = False) -> str:
+    """
+    记录失败：未超过最大次数时按退避时间重新排队，否则转入死信
+
+    返回任务的新状态（pending / dead），租约已被其他 worker 接管时返回 running。
+    """
+    now = utcnow()
+    if permanent or job.attempts >= settings.BOT_JOB_MAX_ATTEMPTS:
+        values = {BotJob.status: 'dead', BotJob.finished_at: now}
+    else:
+        values = {BotJob.status: 'pending', BotJob.run_at: now + timedelta(seconds=retry_delay(job.attempts))}
+    values.update({BotJob.lease_owner: None, BotJob.leased_until: None, BotJob.last_error: error[:2000]})
+    updated = db.query(BotJob).filter(BotJob.id == job.id, BotJob.lease_owner == job.lease_owner).update(
+        values, synchronize_session=False
+    )
+    db.commit()
+    return values[BotJob.status] if updated else 'running'
+
+def requeue_dead_jobs(db: Session) -> int:
+    """将死信任务重新排队（重置重试次数），返回任务数量"""
+    requeued = db.query(BotJob).filter(BotJob.status == 'dead').update({
+        BotJob.status: 'pending',
+        BotJob.attempts: 0,
+        BotJob.run_at: utcnow(),
+        BotJob.finished_at: None,
+    }, synchronize_session=False)
+    db.commit()
+    return requeued
+
+def queue_depth(db: Session) -> Dict[str, int]:
+    """待处理、执行中和死信任务的数量"""
+    counts = dict(db.query(BotJob.status, func.count(BotJob.id)).filter(
+        BotJob.status.in_(QUEUE_STATUSES)
+    ).group_by(BotJob.status).all())
+    return {status: counts.get(status, 0) for status in QUEUE_STATUSES}
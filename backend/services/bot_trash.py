@@ -0,0 +1,116 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional
+from sqlalchemy import Integer, func, insert, literal, select
+from sqlalchemy.orm import Session
+from models import BotMessage, BotMessageTrash
+from services.list_counts import list_counts
+
+TRASH_CHUNK_SIZE = 1000  # 每个事务移动的消息数
+TRASH_RETENTION = timedelta(days=7)  # 回收站消息保留时间
+# 回收站与消息表共有的列
+MESSAGE_COLUMNS = ['message', 'source', 'parsed_urls', 'total_links', 'processed', 'received_at']
+
+def message_filters(source: Optional[str] = None) -> str:
+    """消息列表总数缓存的筛选条件键（与 GET /bot/messages 的 source 参数对应）"""
+    return f"source={source or ''}"
+
+def message_count_deltas(by_source: Dict[str, int], sign: int = 1) -> Dict[str, int]:
+    """按来源统计的消息行数 -> 消息列表总数缓存的修正量（不筛选来源的条目和各来源的条目）"""
+    deltas = {message_filters(): sign * sum(by_source.values())}
+    deltas.update({message_filters(source): sign * count for source, count in by_source.items()})
+    return deltas
+
+def id_chunks(db: Session, column, ids: Optional[List[int]], chunk_size: int) -> Iterator[List[int]]:
+    """按 ID 分块：给定 ids 时直接切分，否则按主键顺序逐块读取整张表"""
+    if ids is not None:
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), chunk_size):
+            yield ids[start:start + chunk_size]
+        return
+    last_id = 0
+    while True:
+        chunk = [row[0] for row in db.query(column).filter(column > last_id).order_by(column).limit(chunk_size)]
+        if not chunk:
+            return
+        yield chunk
+        last_id = chunk[-1]
+
+def move_to_trash(db: Session, ids: Optional[List[int]] = None, deleted_by: Optional[int] = None,
+                  chunk_size: int = TRASH_CHUNK_SIZE, progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    将消息移入回收站，ids 为 None 时移动全部消息
+
+    每块消息用一条 INSERT ... SELECT 复制到回收站、一条 DELETE 删除，每块单独提交并按来源的行数修正列表总数缓存，
+    清空大表时不会把所有消息读入内存，也不会长时间持有锁。progress 在每块提交后以累计数量调用。
+    返回移动的消息数量（不存在的 ID 被忽略）。
+    """
+    now = datetime.utcnow()
+    trash_columns = ['original_id'] + MESSAGE_COLUMNS + ['deleted_at', 'deleted_by', 'expires_at']
+    moved = 0
+    for chunk in id_chunks(db, BotMessage.id, ids, chunk_size):
+        by_source = dict(db.query(BotMessage.source, func.count(BotMessage.id)).filter(
+            BotMessage.id.in_(chunk)
+        ).group_by(BotMessage.source).all())
+        if not by_source:
+            continue
+        rows = select(
+            BotMessage.id, *[getattr(BotMessage, column) for column in MESSAGE_COLUMNS],
+            literal(now), literal(deleted_by, Integer), literal(now + TRASH_RETENTION)
+        ).where(BotMessage.id.in_(chunk))
+        db.execute(insert(BotMessageTrash).from_select(trash_columns, rows))
+        chunk_moved = db.query(BotMessage).filter(BotMessage.id.in_(chunk)).delete(synchronize_session=False)
+        db.commit()
+        moved += chunk_moved
+        list_counts.adjust('bot_messages', message_count_deltas(by_source, -1))
+        list_counts.adjust('bot_messages_trash', {'': chunk_moved})
+        if progress:
+            progress(moved)
+    return moved
+
+def restore_from_trash(db: Session, trash_ids: List[int], chunk_size: int = TRASH_CHUNK_SIZE) -> int:
+    """
+    将回收站消息批量恢复，已过期和不存在的 ID 被忽略，返回恢复的消息数量
+
+    原始 ID 未被占用时按原 ID 恢复，否则分配新 ID（与单条恢复一致）。
+    每块只读取 ID 判断是否冲突，消息内容由 INSERT ... SELECT 在数据库内复制，每块单独提交。
+    """
+    now = datetime.utcnow()
+    restored = 0
+    for chunk in id_chunks(db, BotMessageTrash.id, trash_ids, chunk_size):
+        candidates = db.query(BotMessageTrash.id, BotMessageTrash.original_id, BotMessageTrash.source).filter(
+            BotMessageTrash.id.in_(chunk),
+            BotMessageTrash.expires_at >= now
+        ).order_by(BotMessageTrash.id).all()
+        if not candidates:
+            continue
+        taken = {row.id for row in db.query(BotMessage.id).filter(
+            BotMessage.id.in_([candidate.original_id for candidate in candidates])
+        )}
+        keep_id, new_id = [], []
+        for trash_id, original_id, _ in candidates:
+            if original_id in taken:
+                new_id.append(trash_id)
+            else:
+                keep_id.append(trash_id)
+                taken.add(original_id)
+
+        trash_values = [getattr(BotMessageTrash, column) for column in MESSAGE_COLUMNS]
+        if keep_id:
+            db.execute(insert(BotMessage).from_select(
+                ['id'] + MESSAGE_COLUMNS,
+                select(BotMessageTrash.original_id, *trash_values).where(BotMessageTrash.id.in_(keep_id))
+            ))
+        if new_id:
+            db.execute(insert(BotMessage).from_select(
+                MESSAGE_COLUMNS,
+                select(*trash_values).where(BotMessageTrash.id.in_(new_id)).order_by(BotMessageTrash.id)
+            ))
+        chunk_restored = db.query(BotMessageTrash).filter(
+            BotMessageTrash.id.in_(keep_id + new_id)
+        ).delete(synchronize_session=False)
+        db.commit()
+        restored += chunk_restored
+        list_counts.adjust('bot_messages', message_count_deltas(Counter(candidate.source for candidate in candidates)))
+        list_counts.adjust('bot_messages_trash', {'': -chunk_restored})
+    return restored
@@ -0,0 +1,164 @@
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional
+from sqlalchemy.orm import Session
+from config.settings import settings
+from database import SessionLocal
+from models import BotJob
+from services.bot_jobs import (
+    PermanentJobError, complete_job, fail_job, lease_jobs, queue_depth, renew_leases, requeue_dead_jobs, utcnow
+)
+from utils.monitoring import BOT_JOB_DURATION, BOT_JOB_LATENCY, BOT_JOB_QUEUE_DEPTH, BOT_JOBS_PROCESSED
+from loguru import logger
+
+QUEUE_DEPTH_INTERVAL = 15  # 刷新队列深度指标的间隔（秒）
+
+class BotJobWorker:
+    """
+    机器人链接处理 worker
+
+    独立于 Web 进程运行，轮询租约到期任务，在线程池中以有限并发执行；
+    每个任务使用自己的数据库会话，执行结果按成功、重试、死信写回任务表。
+    执行期间由心跳线程每隔三分之一租约时长延长租约，执行时间超过租约时长的任务不会被其他 worker 重复执行，
+    租约过期只说明持有它的 worker 已退出。
+    """
+
+    def __init__(self, handler: Callable[[Session, BotJob], None], concurrency: Optional[int] = None,
+                 poll_interval: Optional[float] = None, lease_seconds: Optional[int] = None,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.handler = handler
+        self.session_factory = session_factory
+        self.concurrency = concurrency or settings.BOT_WORKER_CONCURRENCY
+        self.poll_interval = poll_interval if poll_interval is not None else settings.BOT_WORKER_POLL_INTERVAL_SECONDS
+        self.lease_seconds = lease_seconds or settings.BOT_JOB_LEASE_SECONDS
+        self.owner = f"{socket.gethostname()}-{os.getpid()}"
+        self.stopping = threading.Event()
+        self._depth_reported_at = 0.0
+        self._in_flight: Dict[int, str] = {}  # 执行中的任务ID -> 租约标识
+        self._in_flight_lock = threading.Lock()
+
+    def run_job(self, job: BotJob) -> str:
+        """执行单个任务并写回结果，返回任务的新状态"""
+        db = self.session_factory()
+        started = time.perf_counter()
+        try:
+            try:
+                self.handler(db, job)
+            except PermanentJobError as e:
+                db.rollback()
+                result = fail_job(db, job, str(e), permanent=True)
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Bot job {job.id} attempt {job.attempts} failed: {e}")
+                result = fail_job(db, job, f"{type(e).__name__}: {e}")
+            else:
+                result = 'succeeded' if complete_job(db, job) else 'running'
+                if result == 'succeeded' and job.created_at:
+                    BOT_JOB_LATENCY.observe((utcnow() - job.created_at).total_seconds())
+        finally:
+            db.close()
+            with self._in_flight_lock:
+                self._in_flight.pop(job.id, None)
+        BOT_JOB_DURATION.observe(time.perf_counter() - started)
+        BOT_JOBS_PROCESSED.labels(result={'pending': 'retry'}.get(result, result)).inc()
+        if result == 'dead':
+            logger.error(f"Bot job {job.id} moved to dead letter: {job.url}")
+        return result
+
+    def report_queue_depth(self, db: Session):
+        now = time.monotonic()
+        if now - self._depth_reported_at < QUEUE_DEPTH_INTERVAL:
+            return
+        for status, count in queue_depth(db).items():
+            BOT_JOB_QUEUE_DEPTH.labels(status=status).set(count)
+        self._depth_reported_at = now
+
+    def run_once(self, executor: ThreadPoolExecutor, running: set) -> int:
+        """按空闲并发数租约一批任务并提交到线程池，返回租约的任务数"""
+        free = self.concurrency - len(running)
+        if free <= 0:
+            return 0
+        db = self.session_factory()
+        try:
+            self.report_queue_depth(db)
+            jobs = lease_jobs(db, self.owner, free, self.lease_seconds)
+            db.expunge_all()  # 任务对象交给执行线程，与本会话解绑
+        finally:
+            db.close()
+        with self._in_flight_lock:
+            self._in_flight.update({job.id: job.lease_owner for job in jobs})
+        for job in jobs:
+            running.add(executor.submit(self.run_job, job))
+        return len(jobs)
+
+    def renew_leases(self) -> int:
+        """延长所有执行中任务的租约，返回延长的任务数"""
+        with self._in_flight_lock:
+            leases = dict(self._in_flight)
+        if not leases:
+            return 0
+        db = self.session_factory()
+        try:
+            return renew_leases(db, leases, self.lease_seconds)
+        finally:
+            db.close()
+
+    def heartbeat(self, finished: threading.Event):
+        """心跳线程：定期续约，直到 run() 结束（包括停止时等待执行中的任务完成）"""
+        while not finished.wait(self.lease_seconds / 3):
+            try:
+                self.renew_leases()
+            except Exception as e:
+                logger.error(f"Bot job lease renewal failed: {e}")
+
+    def run(self):
+        """循环执行直到 stop()，停止时等待正在执行的任务完成"""
+        logger.info(f"Bot job worker {self.owner} started, concurrency={self.concurrency}")
+        running = set()
+        finished = threading.Event()
+        threading.Thread(target=self.heartbeat, args=(finished,), name="bot-job-heartbeat", daemon=True).start()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="bot-job") as executor:
+            while not self.stopping.is_set():
+                try:
+                    leased = self.run_once(executor, running)
+                except Exception as e:
+                    logger.error(f"Bot job lease failed: {e}")
+                    leased = 0
+                if running:
+                    # 有任务完成或到达轮询间隔时再租约；刚租满时不必等待
+                    done, running = wait(running, timeout=0 if leased else self.poll_interval, return_when=FIRST_COMPLETED)
+                    running = set(running)
+                if not leased and not running:
+                    self.stopping.wait(self.poll_interval)
+            wait(running)
+        finished.set()
+        logger.info(f"Bot job worker {self.owner} stopped")
+
+    def stop(self, *args):
+        self.stopping.set()
+
+if __name__ == "__main__":
+    from prometheus_client import start_http_server
+    from routers.bot import process_bot_job
+
+    parser = argparse.ArgumentParser(description="机器人链接处理 worker")
+    parser.add_argument("--requeue-dead", action="store_true", help="将死信任务重新排队后退出")
+    args = parser.parse_args()
+
+    if args.requeue_dead:
+        session = SessionLocal()
+        try:
+            print(f"Requeued {requeue_dead_jobs(session)} dead jobs")
+        finally:
+            session.close()
+    else:
+        start_http_server(settings.BOT_WORKER_METRICS_PORT)
+        worker = BotJobWorker(process_bot_job)
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        worker.run()
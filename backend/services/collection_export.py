@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import Any, Iterable, Iterator, Optional
+from sqlalchemy.orm import Session
+from models import Collection
+
+EXPORT_BATCH_SIZE = 500  # 服务端游标每次取回的行数，也是每个输出块包含的行数
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+EXPORT_COLUMNS = [
+    Collection.id, Collection.platform, Collection.content_id, Collection.title, Collection.content,
+    Collection.url, Collection.author, Collection.cover_image, Collection.content_type,
+    Collection.category, Collection.category_id, Collection.tags, Collection.collected_at,
+    Collection.created_at, Collection.updated_at, Collection.like_count,
+]
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+def export_query(db: Session, user_id: int, platform: Optional[str] = None, category_id: Optional[int] = None):
+    """
+    导出查询：只取标量列，不构造 ORM 对象，也不进入 Session 的 identity map
+
+    yield_per 会开启服务端游标（stream_results），结果按批次从数据库读取，
+    内存占用与收藏总数无关。
+    """
+    query = db.query(*EXPORT_COLUMNS, Collection.pending_like_count).filter(Collection.user_id == user_id)
+    if platform:
+        query = query.filter(Collection.platform == platform)
+    if category_id:
+        query = query.filter(Collection.category_id == category_id)
+    return query.order_by(Collection.collected_at.desc(), Collection.id.desc()).yield_per(EXPORT_BATCH_SIZE)
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def serialize_row(row) -> dict:
+    """将查询结果行转换为可序列化的字典"""
+    *values, pending_like_count = row
+    item = {field: _plain(value) for field, value in zip(EXPORT_FIELDS, values)}
+    item['tags'] = json.loads(item['tags']) if item['tags'] else None
+    item['like_count'] = (item['like_count'] or 0) + (pending_like_count or 0)  # 加上尚未写回的增量
+    return item
+
+def _batches(rows: Iterable) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(serialize_row(row))
+        if len(batch) >= EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def iter_ndjson(rows: Iterable) -> Iterator[str]:
+    for batch in _batches(rows):
+        yield ''.join(json.dumps(item, ensure_ascii=False) + '\n' for item in batch)
+
+def iter_json(rows: Iterable) -> Iterator[str]:
+    """逐块输出一个 JSON 数组"""
+    yield '['
+    first = True
+    for batch in _batches(rows):
+        chunk = ','.join(json.dumps(item, ensure_ascii=False) for item in batch)
+        yield chunk if first else ',' + chunk
+        first = False
+    yield ']\n'
+
+def iter_csv(rows: Iterable) -> Iterator[str]:
+    """CSV 以 UTF-8 BOM 开头，方便 Excel 正确识别中文；tags 以 JSON 字符串写入"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    buffer.write('\ufeff')
+    writer.writeheader()
+    for batch in _batches(rows):
+        for item in batch:
+            if item['tags'] is not None:
+                item['tags'] = json.dumps(item['tags'], ensure_ascii=False)
+            writer.writerow(item)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def gzip_stream(chunks: Iterable[str]) -> Iterator[bytes]:
+    """边生成边压缩，每块输出后刷新，客户端可以持续收到数据"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 输出 gzip 格式
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8')) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def iter_export(db: Session, user_id: int, export_format: str, platform: Optional[str] = None,
+                category_id: Optional[int] = None, gzip: bool = False) -> Iterator[bytes]:
+    """按格式生成导出内容"""
+    rows = export_query(db, user_id, platform, category_id)
+    writer = {'ndjson': iter_ndjson, 'csv': iter_csv, 'json': iter_json}[export_format]
+    chunks = writer(rows)
+    if gzip:
+        return gzip_stream(chunks)
+    return (chunk.encode('utf-8') for chunk in chunks)
@@ -0,0 +1,244 @@
+import csv
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from pydantic import ValidationError
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+from database import SessionLocal
+from models import Collection, ImportJob
+from schemas import CollectionCreate
+from services import search as search_index
+from services import collection_tags, collection_upsert
+from services.data_version import record_collection_changes
+from loguru import logger
+
+BULK_INSERT_CHUNK_SIZE = 500  # 每条 INSERT 语句的行数
+IMPORT_BATCH_SIZE = 500  # 导入时每个事务写入的记录数
+IMPORT_MAX_ERRORS = 100  # 任务中保留的错误条数上限
+
+IMPORT_FORMATS = {
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+    '.csv': 'csv',
+}
+
+def validation_errors(e: ValidationError) -> List[dict]:
+    """将 pydantic 校验错误整理为 {field, message} 列表"""
+    return [
+        {'field': '.'.join(str(loc) for loc in error['loc']), 'message': error['msg']}
+        for error in e.errors()
+    ]
+
+def collection_ids_by_key(db: Session, user_id: int, keys: List[Tuple]) -> Dict[Tuple, int]:
+    """按 (platform, content_id) 查询该用户已有收藏的ID"""
+    found = {}
+    for start in range(0, len(keys), BULK_INSERT_CHUNK_SIZE):
+        rows = db.query(Collection.id, Collection.platform, Collection.content_id).filter(
+            Collection.user_id == user_id,
+            tuple_(Collection.platform, Collection.content_id).in_(keys[start:start + BULK_INSERT_CHUNK_SIZE])
+        )
+        found.update({(platform, content_id): collection_id for collection_id, platform, content_id in rows})
+    return found
+
+def insert_collection_rows(db: Session, user_id: int, rows: List[dict]) -> List[int]:
+    """
+    多行 INSERT 写入收藏并建立检索索引和标签关联（调用方负责提交事务）
+
+    (platform, content_id) 已存在的行会被跳过。写入成功的行会被补上 id，返回按插入顺序排列的ID列表。
+    """
+    if not rows:
+        return []
+
+    # 多行 INSERT 拿不到全部自增ID，写入前后各按本批次的唯一键查询一次，写入前不存在的即为本批次创建。
+    # 两次查询在同一事务内，并发请求写入的行不会被当作本批次的行
+    keys = list(dict.fromkeys((row['platform'], row['content_id']) for row in rows))
+    existing = collection_ids_by_key(db, user_id, keys)
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        db.execute(collection_upsert.upsert_statement(
+            db, rows[start:start + BULK_INSERT_CHUNK_SIZE], refresh=False
+        ))
+    inserted = collection_ids_by_key(db, user_id, [key for key in keys if key not in existing])
+
+    created_ids = []
+    for row in rows:
+        collection_id = inserted.pop((row['platform'], row['content_id']), None)
+        if collection_id is not None:  # 批次内重复的行只对应第一条
+            row['id'] = collection_id
+            created_ids.append(collection_id)
+
+    created_rows = [row for row in rows if 'id' in row]
+    search_index.index_new_collections(db, created_rows)
+    collection_tags.add_collection_tags(db, created_rows)
+    return created_ids
+
+class ByteCounter:
+    """逐行读取二进制文件并解码，同时记录已读取的字节数用于进度汇报"""
+
+    def __init__(self, f):
+        self.f = f
+        self.bytes_read = 0
+
+    def __iter__(self) -> Iterator[str]:
+        for line in self.f:
+            if self.bytes_read == 0 and line.startswith(b'\xef\xbb\xbf'):
+                line = line[3:]
+                self.bytes_read += 3
+            self.bytes_read += len(line)
+            yield line.decode('utf-8')
+
+def parse_csv_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """CSV 中的空值视为未填写，tags 支持 JSON 数组或逗号分隔"""
+    item = {key: value for key, value in record.items() if key and value not in (None, '')}
+    tags = item.get('tags')
+    if tags is not None:
+        try:
+            item['tags'] = json.loads(tags)
+        except ValueError:
+            item['tags'] = [tag.strip() for tag in tags.split(',') if tag.strip()]
+    return item
+
+def iter_records(lines: ByteCounter, export_format: str) -> Iterator[Tuple[int, Optional[dict], Optional[str]]]:
+    """逐条产出 (行号, 记录, 解析错误)"""
+    if export_format == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, parse_csv_record(record), None
+        return
+
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_no, None, "Expected a JSON object"
+            continue
+        yield line_no, record, None
+
+def parse_collected_at(value: Any) -> Optional[datetime]:
+    """保留源数据中的收藏时间（统一为UTC），无法解析时使用导入时间"""
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo is None else parsed.astimezone(timezone.utc).replace(tzinfo=None)
+
+class CollectionImporter:
+    """按批次校验、去重并写入一个导入文件"""
+
+    def __init__(self, db: Session, job: ImportJob):
+        self.db = db
+        self.job = job
+        self.seen: Set[Tuple[str, str]] = set()  # 文件内已出现的记录
+        self.errors: List[dict] = []
+
+    def add_error(self, line_no: int, errors: List[dict]):
+        self.job.failed += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append({'line': line_no, 'errors': errors})
+
+    def flush(self, batch: List[dict], bytes_read: int):
+        """写入一个批次并更新任务进度，每个批次单独提交；库中已有的记录由唯一约束跳过"""
+        now = datetime.utcnow().replace(microsecond=0)  # 与 MySQL DATETIME 精度一致
+        for row in batch:
+            row.update(created_at=now, updated_at=now)
+            row.setdefault('collected_at', now)
+
+        created_ids = insert_collection_rows(self.db, self.job.user_id, batch)
+        if created_ids:
+            record_collection_changes(self.db, self.job.user_id, created_ids)
+        self.job.created += len(created_ids)
+        self.job.duplicates += len(batch) - len(created_ids)
+        self.job.processed_bytes = bytes_read
+        self.job.errors = json.dumps(self.errors, ensure_ascii=False) if self.errors else None
+        self.db.commit()
+
+    def run(self, path: str):
+        batch: List[dict] = []
+        with open(path, 'rb') as f:
+            lines = ByteCounter(f)
+            for line_no, record, error in iter_records(lines, self.job.format):
+                self.job.processed += 1
+                if error:
+                    self.add_error(line_no, [{'field': '', 'message': error}])
+                    continue
+                try:
+                    data = CollectionCreate.model_validate(record).model_dump()
+                except ValidationError as e:
+                    self.add_error(line_no, validation_errors(e))
+                    continue
+
+                key = (data['platform'].value, data['content_id'])
+                if key in self.seen:
+                    self.job.duplicates += 1
+                    continue
+                self.seen.add(key)
+
+                data['tags'] = collection_tags.tags_to_json(data['tags'])
+                data['user_id'] = self.job.user_id
+                collected_at = parse_collected_at(record.get('collected_at'))
+                if collected_at:
+                    data['collected_at'] = collected_at
+                batch.append(data)
+
+                if len(batch) >= IMPORT_BATCH_SIZE:
+                    self.flush(batch, lines.bytes_read)
+                    batch = []
+            self.flush(batch, lines.bytes_read)
+
+def run_import_job(job_id: int, path: str):
+    """后台执行导入任务，使用独立的数据库会话，结束后删除上传的临时文件"""
+    db = SessionLocal()
+    try:
+        job = db.query(ImportJob).filter(ImportJob.id == job_id).first()
+        if job is None:
+            return
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.commit()
+
+        try:
+            CollectionImporter(db, job).run(path)
+            job.status = 'completed'
+        except Exception as e:
+            logger.error(f"Import job {job_id} failed: {e}")
+            db.rollback()
+            job.status = 'failed'
+            job.error_message = str(e)
+        job.finished_at = datetime.utcnow()
+        db.commit()
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def job_to_dict(job: ImportJob) -> dict:
+    """将导入任务转换为字典"""
+    progress = job.processed_bytes / job.total_bytes if job.total_bytes else 0.0
+    if job.status == 'completed':
+        progress = 1.0
+    return {
+        'id': job.id,
+        'filename': job.filename,
+        'format': job.format,
+        'status': job.status,
+        'progress': round(progress, 4),
+        'processed': job.processed,
+        'created': job.created,
+        'duplicates': job.duplicates,
+        'failed': job.failed,
+        'errors': json.loads(job.errors) if job.errors else [],
+        'error_message': job.error_message,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None
+    }
@@ -0,0 +1,156 @@
+import json
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models import Collection as CollectionModel, CollectionTag as CollectionTagModel, Tag as TagModel
+from services.data_version import bump_owner_versions
+
+TAG_NAME_MAX_LENGTH = 30  # 与 tags.name 列长度一致
+
+def normalize_tags(names: Optional[Iterable[str]]) -> List[str]:
+    """去掉首尾空白、空标签和重复标签，保持原有顺序"""
+    result = []
+    seen = set()
+    for name in names or []:
+        name = str(name).strip()[:TAG_NAME_MAX_LENGTH]
+        if name and name not in seen:
+            seen.add(name)
+            result.append(name)
+    return result
+
+def tags_to_json(names: Optional[Iterable[str]]) -> Optional[str]:
+    """生成 collections.tags 中的 JSON 副本，没有标签时为 None"""
+    names = normalize_tags(names)
+    return json.dumps(names, ensure_ascii=False) if names else None
+
+def parse_tags(value: Optional[str]) -> List[str]:
+    """解析 collections.tags 中的 JSON，格式不正确时视为没有标签"""
+    if not value:
+        return []
+    try:
+        names = json.loads(value)
+    except ValueError:
+        return []
+    return normalize_tags(names) if isinstance(names, list) else []
+
+def get_or_create_tags(db: Session, names: List[str]) -> Dict[str, int]:
+    """按名称取标签ID，不存在的标签自动创建"""
+    if not names:
+        return {}
+    tag_ids = dict(db.query(TagModel.name, TagModel.id).filter(TagModel.name.in_(names)).all())
+    for name in names:
+        if name in tag_ids:
+            continue
+        try:
+            with db.begin_nested():
+                tag = TagModel(name=name)
+                db.add(tag)
+            tag_ids[name] = tag.id
+        except IntegrityError:
+            # 并发创建同名标签，或数据库排序规则认为名称相同
+            tag_ids[name] = db.query(TagModel.id).filter(TagModel.name == name).scalar()
+    return tag_ids
+
+def set_collection_tags(db: Session, collection: CollectionModel, names: Optional[Iterable[str]]):
+    """替换单个收藏的标签，同时更新关联表和 JSON 副本（调用方负责提交事务）"""
+    names = normalize_tags(names)
+    collection.tags = tags_to_json(names)
+    db.query(CollectionTagModel).filter(
+        CollectionTagModel.collection_id == collection.id
+    ).delete(synchronize_session=False)
+    tag_ids = get_or_create_tags(db, names)
+    db.bulk_insert_mappings(CollectionTagModel, [
+        {'user_id': collection.user_id, 'collection_id': collection.id, 'tag_id': tag_ids[name]}
+        for name in names
+    ])
+
+def add_collection_tags(db: Session, rows: List[dict]):
+    """为新插入的收藏写入标签关联，rows 需包含 id、user_id 及 tags JSON（调用方负责提交事务）"""
+    names_by_row = [(row, parse_tags(row.get('tags'))) for row in rows]
+    tag_ids = get_or_create_tags(db, normalize_tags(name for _, names in names_by_row for name in names))
+    db.bulk_insert_mappings(CollectionTagModel, [
+        {'user_id': row['user_id'], 'collection_id': row['id'], 'tag_id': tag_ids[name]}
+        for row, names in names_by_row
+        for name in names
+    ])
+
+def remove_collection(db: Session, collection_id: int):
+    """删除单个收藏的标签关联（调用方负责提交事务）"""
+    db.query(CollectionTagModel).filter(
+        CollectionTagModel.collection_id == collection_id
+    ).delete(synchronize_session=False)
+
+def remove_tag(db: Session, tag: TagModel):
+    """删除标签前清理关联，并从相关收藏的 JSON 副本中去掉该标签（调用方负责提交事务）"""
+    tagged = select(CollectionTagModel.collection_id).where(CollectionTagModel.tag_id == tag.id)
+    bump_owner_versions(db, tagged)
+    for collection in db.query(CollectionModel).filter(CollectionModel.id.in_(tagged)).all():
+        collection.tags = tags_to_json(name for name in parse_tags(collection.tags) if name != tag.name)
+    db.query(CollectionTagModel).filter(
+        CollectionTagModel.tag_id == tag.id
+    ).delete(synchronize_session=False)
+
+def tagged_collection_ids(name: str):
+    """带有指定标签的收藏ID子查询，走 (tag_id, collection_id) 索引"""
+    return select(CollectionTagModel.collection_id).join(
+        TagModel, TagModel.id == CollectionTagModel.tag_id
+    ).where(TagModel.name == name)
+
+def tag_counts(db: Session, user_id: int) -> List[dict]:
+    """用户各标签下的收藏数量，只读取关联表的 (user_id, tag_id) 索引"""
+    counts = select(
+        CollectionTagModel.tag_id, func.count().label('count')
+    ).where(
+        CollectionTagModel.user_id == user_id
+    ).group_by(CollectionTagModel.tag_id).subquery()
+
+    rows = db.query(TagModel.id, TagModel.name, counts.c.count).join(
+        counts, counts.c.tag_id == TagModel.id
+    ).order_by(counts.c.count.desc(), TagModel.name).all()
+    return [{'id': tag_id, 'name': name, 'count': count} for tag_id, name, count in rows]
+
+def migrate_json_tags(db: Session, batch_size: int = 1000) -> int:
+    """
+    将 collections.tags 中已有的 JSON 标签迁移到关联表
+
+    可重复执行，已存在的关联会被跳过。返回新写入的关联数量。
+    """
+    created = 0
+    last_id = 0
+    while True:
+        rows = db.query(CollectionModel.id, CollectionModel.user_id, CollectionModel.tags).filter(
+            CollectionModel.id > last_id,
+            CollectionModel.tags.isnot(None)
+        ).order_by(CollectionModel.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        existing = {
+            (collection_id, tag_id)
+            for collection_id, tag_id in db.query(CollectionTagModel.collection_id, CollectionTagModel.tag_id).filter(
+                CollectionTagModel.collection_id.in_([row.id for row in rows])
+            )
+        }
+        names_by_row = [(row, parse_tags(row.tags)) for row in rows]
+        tag_ids = get_or_create_tags(db, normalize_tags(name for _, names in names_by_row for name in names))
+        mappings = [
+            {'user_id': row.user_id, 'collection_id': row.id, 'tag_id': tag_ids[name]}
+            for row, names in names_by_row
+            for name in names
+            if (row.id, tag_ids[name]) not in existing
+        ]
+        db.bulk_insert_mappings(CollectionTagModel, mappings)
+        db.commit()
+        created += len(mappings)
+    return created
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Migrated {migrate_json_tags(session)} collection tags")
+    finally:
+        session.close()
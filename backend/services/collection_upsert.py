@@ -0,0 +1,150 @@
+from datetime import datetime
+from typing import List, Tuple
+from sqlalchemy import func
+from sqlalchemy.dialects import mysql, sqlite
+from sqlalchemy.orm import Session, load_only
+from models import Collection, Like
+from services import search as search_index
+from services import collection_tags
+
+UPSERT_KEY = ['user_id', 'platform', 'content_id']  # 与 uq_collections_user_platform_content 一致
+# 重复收藏时用新抓取的内容覆盖的字段；收藏时间、分类和标签属于用户数据，不覆盖
+REFRESH_FIELDS = ['title', 'content', 'url', 'author', 'cover_image', 'content_type', 'updated_at']
+# 仅在原值为空时补上的字段
+FILL_FIELDS = ['category', 'category_id']
+DEDUPE_BATCH_SIZE = 500  # 去重任务每个事务处理的重复组数
+# 去重任务在建立唯一约束之前、按旧表结构运行，只读取合并需要的列
+DEDUPE_COLUMNS = ['id', 'user_id', 'tags', 'collected_at'] + REFRESH_FIELDS + FILL_FIELDS
+
+def upsert_statement(db: Session, values: List[dict], refresh: bool):
+    """
+    按唯一键写入收藏的 INSERT 语句
+
+    refresh 为 True 时已存在的行刷新抓取字段（MySQL ON DUPLICATE KEY UPDATE / SQLite ON CONFLICT DO UPDATE），
+    否则跳过已存在的行。
+    """
+    table = Collection.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == 'mysql':
+        stmt = mysql.insert(table).values(values)
+        if not refresh:
+            # 不使用 INSERT IGNORE，避免其他错误也被降级为警告
+            return stmt.on_duplicate_key_update(id=table.c.id)
+        updates = {field: stmt.inserted[field] for field in REFRESH_FIELDS}
+        updates.update({field: func.coalesce(table.c[field], stmt.inserted[field]) for field in FILL_FIELDS})
+        return stmt.on_duplicate_key_update(updates)
+
+    if dialect == 'sqlite':
+        stmt = sqlite.insert(table).values(values)
+        if not refresh:
+            return stmt.on_conflict_do_nothing(index_elements=UPSERT_KEY)
+        updates = {field: stmt.excluded[field] for field in REFRESH_FIELDS}
+        updates.update({field: func.coalesce(table.c[field], stmt.excluded[field]) for field in FILL_FIELDS})
+        return stmt.on_conflict_do_update(index_elements=UPSERT_KEY, set_=updates)
+
+    raise ValueError(f"Upsert is not supported on {dialect}")
+
+def upsert_collection(db: Session, user_id: int, data: dict) -> Tuple[Collection, bool]:
+    """
+    写入单个收藏，(user_id, platform, content_id) 已存在时刷新元数据而不是新增一行（调用方负责提交事务）
+
+    data 为 CollectionCreate.model_dump() 的结果。已存在时标签与原有标签合并，分类仅在原来为空时补上。
+    返回 (收藏, 是否新建)。
+    """
+    data = dict(data)
+    tags = data.pop('tags', None)
+    key = [
+        Collection.user_id == user_id,
+        Collection.platform == data['platform'],
+        Collection.content_id == data['content_id']
+    ]
+    # 仅用于区分新建与更新；写入本身由唯一约束保证不会重复
+    created = db.query(Collection.id).filter(*key).first() is None
+
+    now = datetime.utcnow().replace(microsecond=0)  # 与 MySQL DATETIME 精度一致
+    row = dict(data, user_id=user_id, tags=collection_tags.tags_to_json(tags),
+               collected_at=now, created_at=now, updated_at=now)
+    db.execute(upsert_statement(db, [row], refresh=True))
+
+    # 会话中可能已有该收藏的旧状态，需要用数据库中的值覆盖
+    collection = db.query(Collection).filter(*key).populate_existing().one()
+    if not created and tags:
+        tags = collection_tags.parse_tags(collection.tags) + list(tags)
+    if created or tags:
+        collection_tags.set_collection_tags(db, collection, tags)
+    search_index.index_collection(db, collection)
+    return collection, created
+
+def merge_duplicates(db: Session, collections: List[Collection]):
+    """
+    将同一内容的多条收藏合并到最早的一条（调用方负责提交事务）
+
+    元数据取最新一条，收藏时间取最早，分类取第一个非空值，标签取并集；
+    点赞转移到保留的收藏上，同一用户的重复点赞只保留最早的一次。
+    """
+    keep, newest = collections[0], collections[-1]
+    removed_ids = [collection.id for collection in collections[1:]]
+
+    for field in REFRESH_FIELDS:
+        setattr(keep, field, getattr(newest, field))
+    for field in FILL_FIELDS:
+        setattr(keep, field, next((getattr(c, field) for c in collections if getattr(c, field) is not None), None))
+    keep.collected_at = min((c.collected_at for c in collections if c.collected_at), default=keep.collected_at)
+
+    liked_users = set()
+    likes = db.query(Like).filter(
+        Like.collection_id.in_([collection.id for collection in collections])
+    ).order_by(Like.liked_at, Like.id).all()
+    for like in likes:
+        if like.user_id in liked_users:
+            db.delete(like)
+        else:
+            liked_users.add(like.user_id)
+            like.collection_id = keep.id
+
+    for collection_id in removed_ids:
+        search_index.remove_collection(db, collection_id)
+        collection_tags.remove_collection(db, collection_id)
+    collection_tags.set_collection_tags(
+        db, keep, [name for c in collections for name in collection_tags.parse_tags(c.tags)]
+    )
+    search_index.index_collection(db, keep)
+    db.flush()
+    db.query(Collection).filter(Collection.id.in_(removed_ids)).delete(synchronize_session=False)
+
+def dedupe_collections(db: Session, batch_size: int = DEDUPE_BATCH_SIZE) -> int:
+    """
+    一次性清理 (user_id, platform, content_id) 重复的历史收藏，需在建立唯一约束前执行
+
+    可重复执行，没有重复数据时不做任何修改。点赞数由之后的 0004 迁移按 likes 表回填。
+    返回删除的收藏数量。
+    """
+    removed = 0
+    while True:
+        groups = db.query(Collection.user_id, Collection.platform, Collection.content_id).group_by(
+            Collection.user_id, Collection.platform, Collection.content_id
+        ).having(func.count() > 1).limit(batch_size).all()
+        if not groups:
+            break
+
+        for user_id, platform, content_id in groups:
+            collections = db.query(Collection).options(
+                load_only(*[getattr(Collection, column) for column in DEDUPE_COLUMNS])
+            ).filter(
+                Collection.user_id == user_id,
+                Collection.platform == platform,
+                Collection.content_id == content_id
+            ).order_by(Collection.id).all()
+            merge_duplicates(db, collections)
+            removed += len(collections) - 1
+        db.commit()
+    return removed
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Removed {dedupe_collections(session)} duplicate collections")
+    finally:
+        session.close()
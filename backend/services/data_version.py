@@ -0,0 +1,48 @@
+from typing import List
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models import Collection, CollectionTombstone, User
+
+def bump_data_version(db: Session, user_id: int) -> int:
+    """
+    用户的收藏或分类发生变化时递增数据版本号，返回新的版本号（调用方负责提交事务）
+
+    UPDATE 会锁住用户行直到事务提交，同一用户的写事务按版本号顺序提交。
+    """
+    db.query(User).filter(User.id == user_id).update(
+        {User.data_version: User.data_version + 1}, synchronize_session=False
+    )
+    return db.query(User.data_version).filter(User.id == user_id).scalar()
+
+def record_collection_changes(db: Session, user_id: int, collection_ids: List[int]) -> int:
+    """收藏新增或修改：递增版本号，并将这些收藏的 change_seq 设为新版本号（调用方负责提交事务）"""
+    version = bump_data_version(db, user_id)
+    db.query(Collection).filter(Collection.id.in_(collection_ids)).update(
+        {Collection.change_seq: version}, synchronize_session=False
+    )
+    return version
+
+def record_collection_deletion(db: Session, user_id: int, collection_id: int) -> int:
+    """收藏删除：递增版本号并写入墓碑（调用方负责提交事务）"""
+    version = bump_data_version(db, user_id)
+    db.add(CollectionTombstone(user_id=user_id, collection_id=collection_id, change_seq=version))
+    return version
+
+def bump_owner_versions(db: Session, collection_ids):
+    """
+    递增一批收藏所属用户的数据版本号，并将这些收藏的 change_seq 设为各自用户的新版本号
+
+    collection_ids 可以是列表或子查询（调用方负责提交事务）。
+    """
+    owners = select(Collection.user_id).where(Collection.id.in_(collection_ids))
+    db.query(User).filter(User.id.in_(owners)).update(
+        {User.data_version: User.data_version + 1}, synchronize_session=False
+    )
+    owner_version = select(User.data_version).where(User.id == Collection.user_id).scalar_subquery()
+    db.query(Collection).filter(Collection.id.in_(collection_ids)).update(
+        {Collection.change_seq: owner_version}, synchronize_session=False
+    )
+
+def data_version_tag(user: User) -> str:
+    """列表 ETag 的版本部分；get_current_user 已读取用户行，无需额外查询"""
+    return f"{user.id}:{user.data_version or 0}"
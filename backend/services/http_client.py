@@ -0,0 +1,87 @@
+import asyncio
+from typing import Dict, Optional
+import httpx
+from config.settings import settings
+from services.outbound_limiter import outbound_limiter
+from loguru import logger
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+class AsyncHttpClient:
+    """
+    共享的异步HTTP客户端
+
+    所有外部页面抓取复用同一个 keep-alive 连接池（支持时启用 HTTP/2），
+    请求经过 outbound_limiter 按域名限制并发数和请求速率，避免单个平台占满连接池或触发封禁。
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """获取当前事件循环上的客户端，事件循环变化时重建连接池"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._discard_client()
+            self._client = httpx.AsyncClient(
+                http2=HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=settings.HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+                ),
+                timeout=settings.REQUEST_TIMEOUT
+            )
+            self._loop = loop
+        return self._client
+
+    def _discard_client(self):
+        """
+        丢弃旧事件循环上的客户端
+
+        连接池绑定在创建它的事件循环上，不能在新循环中 await 关闭。旧循环仍在运行时把关闭提交到旧循环执行，
+        已停止或关闭时只丢弃引用，连接随对象回收释放。
+        """
+        client, loop = self._client, self._loop
+        self._client = None
+        self._loop = None
+        if client is None or loop is None:
+            return
+        if loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+        else:
+            logger.debug("Dropped HTTP client bound to a stopped event loop")
+
+    async def get(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        follow_redirects: bool = True
+    ) -> httpx.Response:
+        """发送GET请求"""
+        client = self._get_client()
+        async with outbound_limiter.limit_async(url):
+            return await client.get(
+                url,
+                headers=headers,
+                timeout=timeout if timeout is not None else settings.REQUEST_TIMEOUT,
+                follow_redirects=follow_redirects
+            )
+
+    async def close(self):
+        """关闭连接池"""
+        if self._client is not None:
+            try:
+                await self._client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close HTTP client: {e}")
+            self._client = None
+            self._loop = None
+
+# 全局实例
+http_client = AsyncHttpClient()
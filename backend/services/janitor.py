@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional
+from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy.orm import Session
+from config.settings import settings
+from database import SessionLocal
+from models import BotIdempotencyKey, BotMessageTrash
+from services.list_counts import list_counts
+from utils.monitoring import JANITOR_PURGED_ROWS, JANITOR_RUN_DURATION, JANITOR_RUNS
+from loguru import logger
+
+def purge_in_batches(db: Session, model, column, cutoff: datetime, batch_size: int) -> int:
+    """
+    按 column < cutoff 分批删除过期记录，返回删除数量
+
+    每批先按索引列取出一批主键，再按主键删除并提交，单个事务只锁定少量行。
+    """
+    purged = 0
+    while True:
+        ids = [row.id for row in db.query(model.id).filter(column < cutoff).order_by(column).limit(batch_size)]
+        if not ids:
+            return purged
+        purged += db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+
+def purge_expired_trash(db: Session, batch_size: int) -> int:
+    """删除超过保留期的回收站消息"""
+    purged = purge_in_batches(db, BotMessageTrash, BotMessageTrash.expires_at, datetime.utcnow(), batch_size)
+    if purged:
+        list_counts.invalidate('bot_messages_trash')
+    return purged
+
+def purge_expired_idempotency_keys(db: Session, batch_size: int) -> int:
+    """删除去重窗口外的机器人请求记录"""
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.BOT_DEDUPE_WINDOW_SECONDS)
+    return purge_in_batches(db, BotIdempotencyKey, BotIdempotencyKey.created_at, cutoff, batch_size)
+
+# 清理任务：名称（指标标签） -> 清理函数
+PURGE_TASKS: Dict[str, Callable[[Session, int], int]] = {
+    'bot_trash': purge_expired_trash,
+    'bot_idempotency_keys': purge_expired_idempotency_keys,
+}
+
+class Janitor:
+    """
+    后台清理过期数据
+
+    由 APScheduler 在后台线程中定期执行，读接口不再顺带删除过期数据。多进程部署时每个进程各自调度，
+    删除按批进行且可重复执行，同时运行也只是多做一次空查询。
+    """
+
+    def __init__(self, interval: Optional[int] = None, batch_size: Optional[int] = None,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.interval = interval or settings.JANITOR_INTERVAL_SECONDS
+        self.batch_size = batch_size or settings.JANITOR_BATCH_SIZE
+        self.session_factory = session_factory
+        self.scheduler: Optional[BackgroundScheduler] = None
+
+    def run_once(self) -> Dict[str, int]:
+        """依次执行所有清理任务，单个任务失败不影响其他任务；返回各任务删除的数量"""
+        results = {}
+        for name, purge in PURGE_TASKS.items():
+            db = self.session_factory()
+            started = time.perf_counter()
+            try:
+                results[name] = purge(db, self.batch_size)
+            except Exception as e:
+                db.rollback()
+                JANITOR_RUNS.labels(task=name, result='error').inc()
+                logger.error(f"Janitor task {name} failed: {e}")
+                continue
+            finally:
+                db.close()
+                JANITOR_RUN_DURATION.labels(task=name).observe(time.perf_counter() - started)
+            JANITOR_RUNS.labels(task=name, result='ok').inc()
+            JANITOR_PURGED_ROWS.labels(task=name).inc(results[name])
+            if results[name]:
+                logger.info(f"Janitor task {name} purged {results[name]} rows")
+        return results
+
+    def start(self):
+        self.scheduler = BackgroundScheduler()
+        self.scheduler.add_job(
+            self.run_once, 'interval', seconds=self.interval, id='janitor',
+            max_instances=1, coalesce=True, next_run_time=datetime.now()
+        )
+        self.scheduler.start()
+
+    def stop(self):
+        if self.scheduler:
+            self.scheduler.shutdown(wait=False)
+            self.scheduler = None
+
+# 全局清理任务实例
+janitor = Janitor()
+
+if __name__ == "__main__":
+    for task, purged in janitor.run_once().items():
+        print(f"{task}: purged {purged} rows")
@@ -0,0 +1,143 @@
+import asyncio
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from database import SessionLocal
+from models import Collection, Like, LikeCountDelta
+from services.data_version import bump_owner_versions
+from utils.monitoring import LIKE_COUNTER_FLUSHES, LIKE_COUNTER_FLUSHED_ROWS
+from loguru import logger
+
+FLUSH_CHUNK_SIZE = 500  # 每条 UPDATE 的 IN 列表长度上限
+RECONCILE_BATCH_SIZE = 1000  # 对账时每个事务处理的收藏数
+
+def add_like(db: Session, user_id: int, collection_id: int) -> bool:
+    """
+    写入点赞记录和点赞数增量，由 (user_id, collection_id) 唯一约束保证只点赞一次；
+    返回是否新增（调用方负责提交事务）
+    """
+    try:
+        with db.begin_nested():
+            db.add(Like(user_id=user_id, collection_id=collection_id))
+            db.add(LikeCountDelta(collection_id=collection_id, delta=1))
+    except IntegrityError:
+        return False
+    return True
+
+def remove_like(db: Session, user_id: int, collection_id: int) -> bool:
+    """删除点赞记录并写入点赞数增量，返回是否存在（调用方负责提交事务）"""
+    deleted = db.query(Like).filter(
+        Like.user_id == user_id,
+        Like.collection_id == collection_id
+    ).delete(synchronize_session=False)
+    if deleted:
+        db.add(LikeCountDelta(collection_id=collection_id, delta=-deleted))
+    return deleted > 0
+
+def flush_like_counts(db: Optional[Session] = None) -> int:
+    """
+    将 like_count_deltas 中的增量合并写回 collections.like_count，返回更新的收藏数量
+
+    点赞只追加增量行，不更新收藏行，热门收藏不会因每次点赞都更新同一行而产生锁竞争；
+    增量与点赞记录在同一事务内提交，进程退出不会丢失，所有进程读取到相同的待写回增量。
+    增量行用加锁读取，多个进程同时写回时后到的一方等待先到的提交后只读到新的增量，不会重复写回。
+    """
+    session = db or SessionLocal()
+    try:
+        last_id = session.query(func.max(LikeCountDelta.id)).scalar()
+        if last_id is None:
+            return 0
+        sums = session.query(
+            LikeCountDelta.collection_id, func.sum(LikeCountDelta.delta), func.count(LikeCountDelta.id)
+        ).filter(LikeCountDelta.id <= last_id).group_by(LikeCountDelta.collection_id).with_for_update().all()
+
+        ids_by_delta = defaultdict(list)
+        for collection_id, delta, _ in sums:
+            if delta:
+                ids_by_delta[int(delta)].append(collection_id)
+        flushed_ids = [collection_id for ids in ids_by_delta.values() for collection_id in ids]
+        # 点赞数变化使所属用户的列表 ETag 失效，并进入增量同步
+        for start in range(0, len(flushed_ids), FLUSH_CHUNK_SIZE):
+            bump_owner_versions(session, flushed_ids[start:start + FLUSH_CHUNK_SIZE])
+        # 增量相同的收藏合并为一条 UPDATE
+        for delta, ids in ids_by_delta.items():
+            for start in range(0, len(ids), FLUSH_CHUNK_SIZE):
+                session.query(Collection).filter(
+                    Collection.id.in_(ids[start:start + FLUSH_CHUNK_SIZE])
+                ).update({Collection.like_count: Collection.like_count + delta}, synchronize_session=False)
+        deleted = session.query(LikeCountDelta).filter(LikeCountDelta.id <= last_id).delete(synchronize_session=False)
+        if deleted != sum(count for _, _, count in sums):
+            # 读取之后有增量被其他进程写回，放弃本次写回，下个周期重新读取
+            session.rollback()
+            return 0
+        session.commit()
+    except Exception:
+        session.rollback()
+        LIKE_COUNTER_FLUSHES.labels(result='error').inc()
+        raise
+    finally:
+        if db is None:
+            session.close()
+
+    flushed = len(flushed_ids)
+    LIKE_COUNTER_FLUSHES.labels(result='ok').inc()
+    LIKE_COUNTER_FLUSHED_ROWS.inc(flushed)
+    return flushed
+
+async def flush_periodically(interval: float):
+    """后台任务：每隔 interval 秒写回一次点赞增量"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(flush_like_counts)
+        except Exception as e:
+            logger.error(f"Like counter flush failed: {e}")
+
+def reconcile_like_counts(db: Session, batch_size: int = RECONCILE_BATCH_SIZE) -> int:
+    """
+    按 likes 表重新计算 like_count，修正直接改库等造成的偏差，返回修正的收藏数量
+
+    可在服务运行时执行：每批收藏先加锁读取尚未写回的增量（等待正在进行的写回提交，并阻止新的增量写入），
+    再在同一事务内统计 likes，目标值为点赞数减去这些增量，增量之后写回时不会被重复计入。
+    """
+    fixed = 0
+    last_id = 0
+    while True:
+        rows = db.query(Collection.id).filter(
+            Collection.id > last_id
+        ).order_by(Collection.id).limit(batch_size).all()
+        if not rows:
+            break
+        ids = [row.id for row in rows]
+        last_id = ids[-1]
+
+        pending = dict(db.query(LikeCountDelta.collection_id, func.sum(LikeCountDelta.delta)).filter(
+            LikeCountDelta.collection_id.in_(ids)
+        ).group_by(LikeCountDelta.collection_id).with_for_update().all())
+        counts = dict(db.query(Like.collection_id, func.count(Like.id)).filter(
+            Like.collection_id.in_(ids)
+        ).group_by(Like.collection_id).all())
+        current = dict(db.query(Collection.id, Collection.like_count).filter(Collection.id.in_(ids)).all())
+        fixed_ids = []
+        for collection_id, like_count in current.items():
+            target = counts.get(collection_id, 0) - int(pending.get(collection_id) or 0)
+            if like_count != target:
+                db.query(Collection).filter(Collection.id == collection_id).update(
+                    {Collection.like_count: target}, synchronize_session=False
+                )
+                fixed_ids.append(collection_id)
+        if fixed_ids:
+            bump_owner_versions(db, fixed_ids)
+        db.commit()
+        fixed += len(fixed_ids)
+    return fixed
+
+if __name__ == "__main__":
+    session = SessionLocal()
+    try:
+        print(f"Reconciled {reconcile_like_counts(session)} collection like counts")
+    finally:
+        session.close()
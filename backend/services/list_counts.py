@@ -0,0 +1,53 @@
+import threading
+from collections import Counter
+from typing import Dict, Optional, Tuple
+from sqlalchemy.orm import Query
+from config.settings import settings
+from services.url_cache import TTLCache
+
+COUNT_CACHE_MAX_ENTRIES = 1000  # 表 × 筛选条件的组合数上限
+
+class ListCountCache:
+    """
+    列表总数缓存
+
+    列表接口的 total 需要 COUNT(*)，表变大后每次翻页都要扫描整个索引。总数按（表, 筛选条件）缓存
+    LIST_COUNT_CACHE_TTL_SECONDS 秒；本进程写入后调用 adjust 按写入的行数修正受影响的缓存条目，
+    持续写入时缓存仍然有效，只有无法得知影响行数的批量操作才调用 invalidate 使整张表的缓存失效。
+    其他进程写入的变化在缓存过期后可见。需要精确值的调用方传 exact=True 跳过缓存。
+    """
+
+    def __init__(self, ttl: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.LIST_COUNT_CACHE_TTL_SECONDS
+        self._cache = TTLCache(COUNT_CACHE_MAX_ENTRIES)
+        self._generations: Counter = Counter()  # 失效时递增，旧条目不再被读到，由 LRU 淘汰
+        self._lock = threading.Lock()
+
+    def _key(self, table: str, filters: str) -> str:
+        return f"{table}:{self._generations[table]}:{filters}"
+
+    def count(self, query: Query, table: str, filters: str = "", exact: bool = False) -> Tuple[int, bool]:
+        """返回 (总数, 是否精确)；缓存命中时不执行 COUNT，结果可能滞后不超过 ttl 秒"""
+        key = self._key(table, filters)
+        if not exact and self.ttl > 0:
+            cached = self._cache.get(key)
+            if cached is not None:
+                return cached, False
+        total = query.count()
+        if self.ttl > 0:
+            self._cache.set(key, total, self.ttl)
+        return total, True
+
+    def adjust(self, table: str, deltas: Dict[str, int]):
+        """按写入的行数修正缓存的总数：deltas 为 筛选条件 -> 增减的行数，未缓存的条目忽略，过期时间不变"""
+        for filters, delta in deltas.items():
+            if delta:
+                self._cache.update(self._key(table, filters), lambda total, delta=delta: max(total + delta, 0))
+
+    def invalidate(self, *tables: str):
+        with self._lock:
+            for table in tables:
+                self._generations[table] += 1
+
+# 全局列表总数缓存实例
+list_counts = ListCountCache()
@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+from config.settings import settings
+from utils.monitoring import EVENT_LOOP_LAG, EVENT_LOOP_STALLS
+from loguru import logger
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监控
+
+    后台任务每隔 interval 秒睡眠一次，实际唤醒时间与预期之差即为事件循环被占用的时长，
+    超过阈值时记录日志并计数。仅靠唤醒时间只能知道发生了阻塞，不知道是谁阻塞的，
+    因此另有一个看门狗线程检查心跳：事件循环超过阈值没有心跳时，打印事件循环线程当前的调用栈，
+    即正在执行的阻塞回调（每次阻塞只打印一次）。
+    """
+
+    def __init__(self, interval: Optional[float] = None, threshold: Optional[float] = None):
+        self.interval = settings.LOOP_LAG_CHECK_INTERVAL_MS / 1000 if interval is None else interval
+        self.threshold = settings.LOOP_LAG_THRESHOLD_MS / 1000 if threshold is None else threshold
+        self._beat: Optional[float] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+
+    def record(self, lag: float) -> bool:
+        """记录一次唤醒延迟，超过阈值时返回 True"""
+        EVENT_LOOP_LAG.observe(lag)
+        if lag < self.threshold:
+            return False
+        EVENT_LOOP_STALLS.inc()
+        logger.warning(f"Event loop blocked for {lag * 1000:.0f}ms (threshold {self.threshold * 1000:.0f}ms)")
+        return True
+
+    async def run(self):
+        self._loop_thread_id = threading.get_ident()
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.record(max(time.monotonic() - self._beat - self.interval, 0))
+
+    def blocked_stack(self) -> Optional[str]:
+        """事件循环超过阈值没有心跳时返回事件循环线程当前的调用栈，否则返回 None"""
+        if self._beat is None or time.monotonic() - self._beat < self.interval + self.threshold:
+            return None
+        frame = sys._current_frames().get(self._loop_thread_id)
+        return ''.join(traceback.format_stack(frame)) if frame else None
+
+    def _watch(self):
+        reported = None
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._beat
+            if beat == reported:
+                continue
+            stack = self.blocked_stack()
+            if stack:
+                reported = beat
+                logger.warning(f"Event loop blocked, currently running:\n{stack}")
+
+    def start(self):
+        """在事件循环中启动监控任务和看门狗线程"""
+        self._stopped.clear()
+        self._task = asyncio.create_task(self.run())
+        threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+
+# 全局事件循环监控实例
+loop_monitor = LoopLagMonitor()
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+from config.settings import settings
+from utils.monitoring import OUTBOUND_WAIT_SECONDS
+
+OTHER_DOMAIN = 'other'  # 未单独配置的域名在指标中的标签，避免标签数量无限增长
+
+class TokenBucket:
+    """
+    令牌桶：每秒补充 rate 个令牌，最多积累 burst 个
+
+    采用预约方式取令牌：令牌不足时仍然扣减（允许为负），返回需要等待的秒数，
+    调用方睡眠后直接发送请求。同步与异步调用方可以共用同一个桶，等待顺序与预约顺序一致。
+    """
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """取一个令牌，返回发送请求前需要等待的秒数；rate 不大于 0 表示不限速"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+class OutboundLimiter:
+    """
+    外部请求限流器
+
+    按域名分组（配置了 xiaohongshu.com 时 www.xiaohongshu.com 等子域名共用同一组），
+    每组限制并发请求数并用令牌桶限制请求速率。所有抓取路径共用本进程内的全局实例：
+    异步路径（http_client）使用 limit_async，同步路径（scraper，在 worker 线程中运行）使用 limit。
+    """
+
+    def __init__(self, domain_limits: Optional[Dict[str, Dict[str, float]]] = None,
+                 rate: Optional[float] = None, burst: Optional[float] = None, concurrency: Optional[int] = None):
+        self.domain_limits = {
+            domain.lower(): limits
+            for domain, limits in (settings.OUTBOUND_DOMAIN_LIMITS if domain_limits is None else domain_limits).items()
+        }
+        self.rate = settings.OUTBOUND_RATE_PER_SECOND if rate is None else rate
+        self.burst = settings.OUTBOUND_BURST if burst is None else burst
+        self.concurrency = concurrency or settings.HTTP_MAX_CONNECTIONS_PER_HOST
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._async_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def domain_for(self, url: str) -> str:
+        """请求所属的限流分组：匹配到的已配置域名，否则为主机名本身"""
+        host = (urlparse(url).hostname or '').lower()
+        parts = host.split('.')
+        for i in range(len(parts) - 1):
+            domain = '.'.join(parts[i:])
+            if domain in self.domain_limits:
+                return domain
+        return host
+
+    def _limit(self, domain: str, name: str, default: float) -> float:
+        return self.domain_limits.get(domain, {}).get(name, default)
+
+    def _bucket(self, domain: str) -> TokenBucket:
+        with self._lock:
+            if domain not in self._buckets:
+                self._buckets[domain] = TokenBucket(
+                    self._limit(domain, 'rate', self.rate), self._limit(domain, 'burst', self.burst)
+                )
+            return self._buckets[domain]
+
+    def _semaphore(self, domain: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if domain not in self._semaphores:
+                self._semaphores[domain] = threading.BoundedSemaphore(int(self._limit(domain, 'concurrency', self.concurrency)))
+            return self._semaphores[domain]
+
+    def _async_semaphore(self, domain: str) -> asyncio.Semaphore:
+        """asyncio.Semaphore 绑定事件循环，事件循环变化时重建"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._async_semaphores = {}
+            self._loop = loop
+        if domain not in self._async_semaphores:
+            self._async_semaphores[domain] = asyncio.Semaphore(int(self._limit(domain, 'concurrency', self.concurrency)))
+        return self._async_semaphores[domain]
+
+    def _observe(self, domain: str, waited: float):
+        label = domain if domain in self.domain_limits else OTHER_DOMAIN
+        OUTBOUND_WAIT_SECONDS.labels(domain=label).observe(waited)
+
+    @contextmanager
+    def limit(self, url: str):
+        """同步请求：等待并发名额和令牌后执行，请求结束时释放名额"""
+        domain = self.domain_for(url)
+        started = time.monotonic()
+        semaphore = self._semaphore(domain)
+        semaphore.acquire()
+        try:
+            delay = self._bucket(domain).reserve()
+            if delay:
+                time.sleep(delay)
+            self._observe(domain, time.monotonic() - started)
+            yield
+        finally:
+            semaphore.release()
+
+    @asynccontextmanager
+    async def limit_async(self, url: str):
+        """异步请求：等待并发名额和令牌后执行，请求结束时释放名额"""
+        domain = self.domain_for(url)
+        started = time.monotonic()
+        async with self._async_semaphore(domain):
+            delay = self._bucket(domain).reserve()
+            if delay:
+                await asyncio.sleep(delay)
+            self._observe(domain, time.monotonic() - started)
+            yield
+
+# 全局实例
+outbound_limiter = OutboundLimiter()
@@ -0,0 +1,172 @@
+import html
+import json
+import re
+from typing import Any, Dict, List, Optional, Sequence, Union
+from urllib.parse import unquote
+from loguru import logger
+
+# 页面内嵌的初始状态 JSON：(起始标记, 是否经过URL编码)
+STATE_MARKERS = {
+    'xiaohongshu': [
+        (re.compile(r'window\.__INITIAL_STATE__\s*=\s*'), False),
+    ],
+    'douyin': [
+        (re.compile(r'<script id="RENDER_DATA" type="application/json">'), True),
+        (re.compile(r'window\._ROUTER_DATA\s*=\s*'), False),
+    ],
+}
+SCRIPT_END = re.compile(r'</script>', re.IGNORECASE)
+UNDEFINED_LITERAL = re.compile(r'(?<=[:\[,])\s*undefined\s*(?=[,}\]])')
+
+Path = Sequence[Union[str, int]]
+WILDCARD = '*'
+
+# 字段到状态JSON路径的声明式映射，按顺序取第一个非空值；'*' 匹配任意键/下标
+STATE_SCHEMAS: Dict[str, Dict[str, List[Path]]] = {
+    'xiaohongshu': {
+        'content_id': [('note', 'noteDetailMap', WILDCARD, 'note', 'noteId'), ('note', 'firstNoteId')],
+        'title': [('note', 'noteDetailMap', WILDCARD, 'note', 'title')],
+        'content': [('note', 'noteDetailMap', WILDCARD, 'note', 'desc')],
+        'author': [
+            ('note', 'noteDetailMap', WILDCARD, 'note', 'user', 'nickname'),
+            ('note', 'noteDetailMap', WILDCARD, 'note', 'user', 'nickName'),
+        ],
+        'cover_image': [
+            ('note', 'noteDetailMap', WILDCARD, 'note', 'imageList', 0, 'urlDefault'),
+            ('note', 'noteDetailMap', WILDCARD, 'note', 'imageList', 0, 'url'),
+            ('note', 'noteDetailMap', WILDCARD, 'note', 'imageList', 0, 'infoList', 0, 'url'),
+        ],
+        'note_type': [('note', 'noteDetailMap', WILDCARD, 'note', 'type')],
+    },
+    'douyin': {
+        'content_id': [
+            ('app', 'videoDetail', 'awemeId'),
+            (WILDCARD, 'aweme', 'detail', 'awemeId'),
+            ('loaderData', WILDCARD, 'videoInfoRes', 'item_list', 0, 'aweme_id'),
+        ],
+        'title': [
+            ('app', 'videoDetail', 'desc'),
+            (WILDCARD, 'aweme', 'detail', 'desc'),
+            ('loaderData', WILDCARD, 'videoInfoRes', 'item_list', 0, 'desc'),
+        ],
+        'content': [
+            ('app', 'videoDetail', 'desc'),
+            (WILDCARD, 'aweme', 'detail', 'desc'),
+            ('loaderData', WILDCARD, 'videoInfoRes', 'item_list', 0, 'desc'),
+        ],
+        'author': [
+            ('app', 'videoDetail', 'authorInfo', 'nickname'),
+            (WILDCARD, 'aweme', 'detail', 'authorInfo', 'nickname'),
+            ('loaderData', WILDCARD, 'videoInfoRes', 'item_list', 0, 'author', 'nickname'),
+        ],
+        'cover_image': [
+            ('app', 'videoDetail', 'video', 'originCover'),
+            ('app', 'videoDetail', 'video', 'cover'),
+            (WILDCARD, 'aweme', 'detail', 'video', 'originCover'),
+            ('loaderData', WILDCARD, 'videoInfoRes', 'item_list', 0, 'video', 'cover', 'url_list', 0),
+        ],
+    },
+}
+
+def _meta(attr: str, name: str) -> re.Pattern:
+    return re.compile(
+        rf'<meta[^>]*{attr}=["\']{re.escape(name)}["\'][^>]*content=["\']([^"\']*)["\']',
+        re.IGNORECASE
+    )
+
+def _json_key(key: str) -> re.Pattern:
+    return re.compile(rf'"{key}":"([^"]+)"')
+
+# 没有状态JSON（或字段缺失）时的后备正则，均预编译；(正则, 是否为JSON转义字符串)
+FALLBACK_PATTERNS = {
+    'xiaohongshu': {
+        'title': [(_meta('property', 'og:title'), False), (_json_key('title'), True),
+                  (re.compile(r'<title>(.*?)</title>', re.IGNORECASE | re.DOTALL), False)],
+        'content': [(_meta('name', 'description'), False), (_json_key('desc'), True)],
+        'author': [(_json_key('nickname'), True)],
+        'cover_image': [(_meta('property', 'og:image'), False), (_meta('property', 'twitter:image'), False),
+                        (_json_key('urlDefault'), True), (_json_key('cover'), True)],
+    },
+    'douyin': {
+        'title': [(_meta('property', 'og:title'), False), (_json_key('desc'), True),
+                  (re.compile(r'<title>(.*?)</title>', re.IGNORECASE | re.DOTALL), False)],
+        'content': [(_meta('name', 'description'), False), (_json_key('desc'), True)],
+        'author': [(_json_key('nickname'), True)],
+        'cover_image': [(_meta('property', 'og:image'), False), (_meta('property', 'twitter:image'), False),
+                        (_json_key('originCover'), True), (_json_key('cover'), True)],
+    },
+}
+
+def find_state(platform: str, page: str) -> Optional[Any]:
+    """定位并解析页面内嵌的初始状态JSON，只解析一次"""
+    for marker, url_encoded in STATE_MARKERS.get(platform, []):
+        start = marker.search(page)
+        if not start:
+            continue
+        end = SCRIPT_END.search(page, start.end())
+        blob = page[start.end():end.start() if end else len(page)].strip().rstrip(';')
+        if url_encoded:
+            blob = unquote(blob)
+        else:
+            # 小红书的状态对象不是严格JSON，值中可能出现 undefined
+            blob = UNDEFINED_LITERAL.sub('null', blob)
+        try:
+            return json.loads(blob)
+        except ValueError as e:
+            logger.debug(f"Failed to parse {platform} initial state: {e}")
+    return None
+
+def resolve_path(data: Any, path: Path) -> Any:
+    """按路径取值，'*' 依次尝试当前层的每个子节点"""
+    if not path:
+        return data
+    head, rest = path[0], path[1:]
+    if head == WILDCARD:
+        children = data.values() if isinstance(data, dict) else data if isinstance(data, list) else []
+        for child in children:
+            value = resolve_path(child, rest)
+            if value not in (None, ''):
+                return value
+        return None
+    if isinstance(data, dict):
+        return resolve_path(data.get(head), rest) if head in data else None
+    if isinstance(data, list) and isinstance(head, int):
+        return resolve_path(data[head], rest) if -len(data) <= head < len(data) else None
+    return None
+
+def decode_json_string(text: str) -> str:
+    """解码正则截取到的JSON字符串片段中的转义字符"""
+    try:
+        return json.loads(f'"{text}"')
+    except ValueError:
+        return text
+
+def extract_page_fields(platform: str, page: str) -> Dict[str, str]:
+    """
+    从页面中提取内容字段
+
+    先解析一次内嵌状态JSON并按平台声明的路径取值，
+    只有状态JSON中缺失的字段才用预编译正则在原始HTML中查找。
+    """
+    fields: Dict[str, str] = {}
+
+    state = find_state(platform, page)
+    if state is not None:
+        for field, paths in STATE_SCHEMAS.get(platform, {}).items():
+            for path in paths:
+                value = resolve_path(state, path)
+                if value not in (None, ''):
+                    fields[field] = str(value).strip()
+                    break
+
+    for field, patterns in FALLBACK_PATTERNS.get(platform, {}).items():
+        if fields.get(field):
+            continue
+        for pattern, json_escaped in patterns:
+            match = pattern.search(page)
+            if match:
+                value = match.group(1).strip()
+                fields[field] = decode_json_string(value) if json_escaped else html.unescape(value)
+                break
+
+    return fields
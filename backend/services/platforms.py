@@ -0,0 +1,39 @@
+from functools import lru_cache
+from typing import Optional, Tuple
+from urllib.parse import urlparse
+
+# 域名 -> 平台，按主机名后缀匹配（子域名同样匹配，如 www.bilibili.com、zhuanlan.zhihu.com）
+PLATFORM_DOMAINS = {
+    # 小红书
+    'xiaohongshu.com': 'xiaohongshu',
+    'xhslink.com': 'xiaohongshu',  # 小红书短链接
+    # 微信
+    'weixin.qq.com': 'wechat',
+    # B站
+    'bilibili.com': 'bilibili',
+    'b23.tv': 'bilibili',  # B站短链接
+    # 知乎
+    'zhihu.com': 'zhihu',
+    # 抖音
+    'douyin.com': 'douyin',
+}
+
+SHORT_LINK_DOMAINS = frozenset({'xhslink.com', 'b23.tv', 'v.douyin.com', 't.cn', 'dwz.cn', 'bit.ly', 'tinyurl.com'})
+
+def match_domain(hostname: str, domains) -> Optional[str]:
+    """返回 hostname 本身或其上级域名中第一个在 domains 中的域名"""
+    parts = hostname.split('.')
+    for i in range(len(parts)):
+        domain = '.'.join(parts[i:])
+        if domain in domains:
+            return domain
+    return None
+
+@lru_cache(maxsize=4096)
+def classify_host(hostname: str) -> Tuple[str, bool]:
+    """主机名对应的 (平台, 是否短链接)；消息中的主机名种类很少，结果缓存"""
+    domain = match_domain(hostname, PLATFORM_DOMAINS)
+    return PLATFORM_DOMAINS[domain] if domain else 'other', match_domain(hostname, SHORT_LINK_DOMAINS) is not None
+
+def url_hostname(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
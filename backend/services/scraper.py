@@ -7,6 +7,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from typing import Dict, List, Optional
 from config.settings import settings
+from services.outbound_limiter import outbound_limiter
 import json
 import time
 from loguru import logger
@@ -25,9 +26,10 @@ class BaseScraper:
         })
     
     def get_page_content(self, url: str) -> str:
-        """获取页面内容"""
+        """获取页面内容（经过 outbound_limiter 按域名限流）"""
         try:
-            response = self.session.get(url, timeout=settings.REQUEST_TIMEOUT)
+            with outbound_limiter.limit(url):
+                response = self.session.get(url, timeout=settings.REQUEST_TIMEOUT)
             response.raise_for_status()
             return response.text
         except Exception as e:
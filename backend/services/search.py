@@ -0,0 +1,204 @@
+import html
+import re
+from collections import Counter
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, case, func, or_
+from sqlalchemy.orm import Session
+from models import Collection as CollectionModel, CollectionSearchTerm as SearchTermModel
+from loguru import logger
+
+# 中日韩字符（含扩展A区、日文假名、韩文音节）
+CJK_RANGES = r'぀-ヿ㐀-䶿一-鿿가-힯豈-﫿'
+TOKEN_PATTERN = re.compile(rf'[{CJK_RANGES}]+|[a-z0-9]+')
+CJK_PATTERN = re.compile(rf'[{CJK_RANGES}]')
+
+# 字段权重：标题命中比作者、正文更重要
+FIELD_WEIGHTS = {
+    'title': 3,
+    'author': 2,
+    'content': 1,
+}
+
+MAX_TERM_LENGTH = 64
+SNIPPET_RADIUS = 40
+CANDIDATE_WINDOW = 1000
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """分词：拉丁字母/数字按单词切分，中日韩文本切成二元组（单字成词时保留单字）"""
+    if not text:
+        return []
+
+    tokens = []
+    for segment in TOKEN_PATTERN.findall(text.lower()):
+        if CJK_PATTERN.match(segment):
+            if len(segment) == 1:
+                tokens.append(segment)
+            else:
+                tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+        else:
+            tokens.append(segment[:MAX_TERM_LENGTH])
+    return tokens
+
+def is_prefix_term(term: str) -> bool:
+    """单个汉字查询词需按前缀匹配二元组"""
+    return len(term) == 1 and bool(CJK_PATTERN.match(term))
+
+def build_terms(collection: CollectionModel) -> Dict[str, int]:
+    """计算收藏的 词项 -> 权重（字段权重 × 词频）"""
+    weights = Counter()
+    for field, field_weight in FIELD_WEIGHTS.items():
+        for term, tf in Counter(tokenize(getattr(collection, field))).items():
+            weights[term] += field_weight * tf
+    return dict(weights)
+
+def index_collection(db: Session, collection: CollectionModel):
+    """增量更新单个收藏的倒排索引（调用方负责提交事务）"""
+    remove_collection(db, collection.id)
+    db.bulk_insert_mappings(SearchTermModel, [
+        {
+            'user_id': collection.user_id,
+            'collection_id': collection.id,
+            'term': term,
+            'weight': weight
+        }
+        for term, weight in build_terms(collection).items()
+    ])
+
+def index_new_collections(db: Session, rows: List[dict]):
+    """为新插入的收藏批量建立索引，rows 需包含 id、user_id 及检索字段（调用方负责提交事务）"""
+    db.bulk_insert_mappings(SearchTermModel, [
+        {
+            'user_id': row['user_id'],
+            'collection_id': row['id'],
+            'term': term,
+            'weight': weight
+        }
+        for row in rows
+        for term, weight in build_terms(SimpleNamespace(**row)).items()
+    ])
+
+def remove_collection(db: Session, collection_id: int):
+    """删除单个收藏的倒排索引（调用方负责提交事务）"""
+    db.query(SearchTermModel).filter(
+        SearchTermModel.collection_id == collection_id
+    ).delete(synchronize_session=False)
+
+def rebuild_index(db: Session, user_id: Optional[int] = None, batch_size: int = 1000) -> int:
+    """全量重建索引，用于已有数据的初始化"""
+    query = db.query(CollectionModel)
+    if user_id is not None:
+        query = query.filter(CollectionModel.user_id == user_id)
+
+    count = 0
+    for collection in query.yield_per(batch_size):
+        index_collection(db, collection)
+        count += 1
+        if count % batch_size == 0:
+            db.commit()
+    db.commit()
+
+    logger.info(f"Rebuilt search index for {count} collections")
+    return count
+
+def search_collections(db: Session, user_id: int, q: str, limit: int = 20) -> List[Tuple[int, int]]:
+    """
+    检索收藏，返回按得分排序的 (collection_id, score)
+
+    所有查询词项都必须命中（AND 语义）。单个汉字无法组成二元组，
+    按词项前缀匹配以该字开头的二元组。
+    """
+    terms = sorted(set(tokenize(q)))
+    if not terms:
+        return []
+
+    # 前缀匹配用范围条件表达，保证能走 (user_id, term) 索引
+    conditions = [
+        and_(SearchTermModel.term >= term, SearchTermModel.term < term + '\U0010ffff')
+        if is_prefix_term(term)
+        else SearchTermModel.term == term
+        for term in terms
+    ]
+
+    # 单个词项：直接按 (term, weight) 索引倒序取前 N 条，无需聚合
+    if len(terms) == 1 and not is_prefix_term(terms[0]):
+        rows = db.query(
+            SearchTermModel.collection_id,
+            SearchTermModel.weight
+        ).filter(
+            SearchTermModel.user_id == user_id,
+            SearchTermModel.term == terms[0]
+        ).order_by(
+            SearchTermModel.weight.desc(), SearchTermModel.collection_id.desc()
+        ).limit(limit).all()
+        return [(collection_id, weight) for collection_id, weight in rows]
+
+    # 多词项：以命中文档最少的词项驱动，候选集限制在其权重最高的 CANDIDATE_WINDOW 篇内，
+    # 只有最稀有的词项也超过窗口大小时排名才是近似的
+    def postings(condition):
+        return db.query(SearchTermModel.collection_id).filter(
+            SearchTermModel.user_id == user_id,
+            condition
+        )
+
+    driving = min(conditions, key=lambda condition: postings(condition).limit(CANDIDATE_WINDOW + 1).count())
+    candidate_ids = [
+        collection_id for collection_id, in postings(driving).order_by(
+            SearchTermModel.weight.desc(), SearchTermModel.collection_id.desc()
+        ).limit(CANDIDATE_WINDOW)
+    ]
+    if not candidate_ids:
+        return []
+
+    score = func.sum(SearchTermModel.weight)
+    rows = db.query(
+        SearchTermModel.collection_id,
+        score.label('score')
+    ).filter(
+        SearchTermModel.collection_id.in_(candidate_ids),
+        or_(*conditions)
+    ).group_by(
+        SearchTermModel.collection_id
+    ).having(
+        and_(*[func.max(case((condition, 1), else_=0)) == 1 for condition in conditions])
+    ).order_by(
+        score.desc(), SearchTermModel.collection_id.desc()
+    ).limit(limit).all()
+
+    return [(collection_id, int(total)) for collection_id, total in rows]
+
+def highlight(text: Optional[str], q: str, snippet: bool = False) -> str:
+    """用 <em> 标记命中片段；snippet=True 时截取首个命中附近的文本"""
+    if not text:
+        return ''
+
+    # 优先整段匹配，其次按二元组匹配被拆开的中文词
+    segments = sorted(set(TOKEN_PATTERN.findall(q.lower())) | set(tokenize(q)), key=len, reverse=True)
+    if not segments:
+        return html.escape(text)
+
+    pattern = re.compile('|'.join(re.escape(seg) for seg in segments), re.IGNORECASE)
+
+    if snippet:
+        first = pattern.search(text)
+        start = max(0, first.start() - SNIPPET_RADIUS) if first else 0
+        end = min(len(text), start + SNIPPET_RADIUS * 3)
+        text = ('…' if start > 0 else '') + text[start:end] + ('…' if end < len(text) else '')
+
+    parts = []
+    last = 0
+    for match in pattern.finditer(text):
+        parts.append(html.escape(text[last:match.start()]))
+        parts.append(f"<em>{html.escape(match.group(0))}</em>")
+        last = match.end()
+    parts.append(html.escape(text[last:]))
+    return ''.join(parts).replace('</em><em>', '')
+
+if __name__ == "__main__":
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        print(f"Indexed {rebuild_index(session)} collections")
+    finally:
+        session.close()
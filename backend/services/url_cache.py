@@ -0,0 +1,184 @@
+import asyncio
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from config.settings import settings
+from services.platforms import classify_host
+from utils.monitoring import URL_CACHE_REQUESTS
+from loguru import logger
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:
+    aioredis = None
+
+# 各平台元数据缓存时间（秒）：视频/文章标题基本不变，笔记类内容更新较频繁
+PLATFORM_TTLS = {
+    'bilibili': 24 * 3600,
+    'wechat': 7 * 24 * 3600,
+    'zhihu': 24 * 3600,
+    'xiaohongshu': 6 * 3600,
+    'douyin': 6 * 3600,
+    'other': 3600,
+}
+NEGATIVE_TTL = 300  # 解析失败结果的缓存时间
+REDIS_RETRY_INTERVAL = 30  # Redis 不可用后的重试间隔
+REDIS_KEY_PREFIX = 'streamcraft:url-meta:'
+
+# 各平台分享链接中的追踪参数，不影响内容本身；只对对应平台的链接去除，
+# 其他网站上同名参数（如 from、ts）可能决定页面内容。utm_* 对所有链接去除
+PLATFORM_TRACKING_PARAMS = {
+    'bilibili': frozenset({
+        'spm_id_from', 'vd_source', 'share_source', 'share_medium', 'share_plat', 'share_session_id',
+        'share_from', 'share_tag', 'share_times', 'unique_k', 'bbid', 'ts', 'timestamp', 'from',
+    }),
+    'xiaohongshu': frozenset({'xhsshare', 'appuid', 'apptime', 'share_id', 'author_share', 'exSource', 'xsec_source'}),
+    'wechat': frozenset({'scene', 'sharer_shareid', 'sharer_sharetime', 'clicktime', 'enterid', 'from'}),
+}
+
+def normalize_url(url: str) -> str:
+    """规范化URL作为缓存键：小写域名、去掉锚点和追踪参数、参数排序"""
+    parts = urlsplit(url.strip())
+    platform, _ = classify_host((parts.hostname or '').lower())
+    tracking = PLATFORM_TRACKING_PARAMS.get(platform, frozenset())
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in tracking and not key.startswith('utm_')
+    )
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower() or 'https', parts.netloc.lower(), path, urlencode(query), ''))
+
+def is_negative(result: dict) -> bool:
+    """没有解析出标题的结果视为失败"""
+    return not result.get('title')
+
+class TTLCache:
+    """线程安全的进程内 LRU 缓存，条目带过期时间"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: int):
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def update(self, key: str, func: Callable[[Any], Any]) -> bool:
+        """用 func 替换未过期条目的值，保留原过期时间；条目不存在时返回 False"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return False
+            self._data[key] = (entry[0], func(entry[1]))
+            return True
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+class UrlMetadataCache:
+    """
+    URL元数据两级缓存
+
+    第一级为进程内 LRU，第二级为 Redis（多个 worker 共享）。
+    Redis 不可用时自动降级为仅使用进程内缓存，并在一段时间后重试。
+    """
+
+    def __init__(self):
+        self.local = TTLCache(settings.URL_CACHE_MAX_ENTRIES)
+        self._redis = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_disabled_until = 0.0
+
+    def _get_redis(self):
+        if aioredis is None or not settings.REDIS_URL or time.monotonic() < self._redis_disabled_until:
+            return None
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = aioredis.from_url(
+                settings.REDIS_URL,
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5,
+                decode_responses=True
+            )
+            self._redis_loop = loop
+        return self._redis
+
+    def _redis_failed(self, e: Exception):
+        logger.warning(f"URL cache redis unavailable, falling back to local cache: {e}")
+        self._redis = None
+        self._redis_disabled_until = time.monotonic() + REDIS_RETRY_INTERVAL
+
+    async def get(self, url: str) -> Optional[dict]:
+        """读取缓存，返回解析结果；未命中返回 None"""
+        key = normalize_url(url)
+
+        entry = self.local.get(key)
+        if entry is not None:
+            URL_CACHE_REQUESTS.labels(tier='local', result='negative_hit' if entry['negative'] else 'hit').inc()
+            return entry['result']
+        URL_CACHE_REQUESTS.labels(tier='local', result='miss').inc()
+
+        client = self._get_redis()
+        if client is None:
+            return None
+        try:
+            raw = await client.get(REDIS_KEY_PREFIX + key)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+
+        if raw is None:
+            URL_CACHE_REQUESTS.labels(tier='redis', result='miss').inc()
+            return None
+
+        entry = json.loads(raw)
+        URL_CACHE_REQUESTS.labels(tier='redis', result='negative_hit' if entry['negative'] else 'hit').inc()
+        # 回填进程内缓存，过期时间与 Redis 保持一致
+        remaining = int(entry['expires_at'] - time.time())
+        if remaining > 0:
+            self.local.set(key, entry, remaining)
+        return entry['result']
+
+    async def set(self, url: str, result: dict):
+        """写入缓存，失败结果使用较短的负缓存时间"""
+        key = normalize_url(url)
+        negative = is_negative(result)
+        ttl = NEGATIVE_TTL if negative else PLATFORM_TTLS.get(result.get('platform'), PLATFORM_TTLS['other'])
+        entry = {'result': result, 'negative': negative, 'expires_at': time.time() + ttl}
+
+        self.local.set(key, entry, ttl)
+
+        client = self._get_redis()
+        if client is None:
+            return
+        try:
+            await client.set(REDIS_KEY_PREFIX + key, json.dumps(entry, ensure_ascii=False), ex=ttl)
+        except Exception as e:
+            self._redis_failed(e)
+
+# 全局实例
+url_metadata_cache = UrlMetadataCache()
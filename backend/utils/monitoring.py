@@ -84,4 +84,38 @@ def monitor_db_operation(operation):
                 logger.error(f"Database operation {operation} failed after {duration:.2f}s: {e}")
                 raise
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
+
+# 事件循环监控
+EVENT_LOOP_LAG = Histogram(
+    'event_loop_lag_seconds', 'Delay between scheduled and actual wakeups of the event loop',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+EVENT_LOOP_STALLS = Counter('event_loop_stalls_total', 'Event loop wakeups delayed beyond LOOP_LAG_THRESHOLD_MS')
+
+# 后台清理任务监控
+JANITOR_RUNS = Counter('janitor_runs_total', 'Janitor purge task runs', ['task', 'result'])
+JANITOR_PURGED_ROWS = Counter('janitor_purged_rows_total', 'Expired rows deleted by the janitor', ['task'])
+JANITOR_RUN_DURATION = Histogram('janitor_run_duration_seconds', 'Janitor purge task duration', ['task'])
+
+# 外部请求限流监控
+OUTBOUND_WAIT_SECONDS = Histogram(
+    'outbound_request_wait_seconds', 'Time outbound requests wait for per-domain concurrency and rate limits', ['domain'],
+    buckets=(0, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30)
+)
+
+# URL元数据缓存监控
+URL_CACHE_REQUESTS = Counter('url_cache_requests_total', 'URL metadata cache lookups', ['tier', 'result'])
+
+# 点赞计数写缓冲监控
+LIKE_COUNTER_FLUSHES = Counter('like_counter_flushes_total', 'Buffered like count flushes', ['result'])
+LIKE_COUNTER_FLUSHED_ROWS = Counter('like_counter_flushed_rows_total', 'Collections updated by like count flushes')
+
+# 机器人任务队列监控（由 worker 进程暴露）
+BOT_JOB_QUEUE_DEPTH = Gauge('bot_job_queue_depth', 'Bot link jobs by status', ['status'])
+BOT_JOBS_PROCESSED = Counter('bot_jobs_processed_total', 'Bot link job attempts', ['result'])
+BOT_JOB_DURATION = Histogram('bot_job_duration_seconds', 'Bot link job execution time')
+BOT_JOB_LATENCY = Histogram(
+    'bot_job_latency_seconds', 'Time from enqueue to success of bot link jobs',
+    buckets=(1, 5, 15, 30, 60, 120, 300, 900, 1800, 3600, 7200)
+)
@@ -0,0 +1,80 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_
+
+def encode_cursor(sort_value: Optional[datetime], row_id: int) -> str:
+    """将 (排序时间, id) 编码为不透明游标，排序时间为 NULL 时编码为 null"""
+    payload = json.dumps([sort_value.isoformat() if sort_value else None, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """解码游标，格式不合法时返回400"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(sort_value) if sort_value is not None else None, int(row_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def encode_sync_token(change_seq: int, row_id: int) -> str:
+    """将增量同步位置 (change_seq, id) 编码为不透明令牌"""
+    payload = json.dumps([change_seq, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_sync_token(token: str) -> Tuple[int, int]:
+    """解码同步令牌，格式不合法时返回400"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        change_seq, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return int(change_seq), int(row_id)
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+
+def keyset_paginate(
+    query,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+    key: Optional[Callable[[Any], Any]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (sort_column DESC, id DESC) 进行游标分页
+
+    提供 cursor 时从游标位置继续读取（走复合索引，不扫描跳过的行）；
+    否则退回到已废弃的 skip 偏移分页。多取一行用于判断是否还有下一页。
+    key 用于从查询结果行中取出模型对象（查询返回元组时使用）。
+    排序列可以为 NULL：MySQL 与 SQLite 降序时 NULL 都排在最后，游标条件按同样的顺序处理。
+    """
+    query = query.order_by(sort_column.desc(), id_column.desc())
+
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor)
+        if sort_value is None:
+            query = query.filter(sort_column.is_(None), id_column < last_id)
+        else:
+            query = query.filter(or_(
+                sort_column < sort_value,
+                and_(sort_column == sort_value, id_column < last_id),
+                sort_column.is_(None)
+            ))
+    elif skip:
+        query = query.offset(skip)
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = key(rows[-1]) if key else rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
@@ -0,0 +1,91 @@
+import functools
+import hashlib
+import inspect
+from typing import Any, Callable, Optional
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from schemas import SuccessResponse
+
+class FastJSONResponse(JSONResponse):
+    """使用 orjson 编码的 JSON 响应，datetime、枚举由 orjson 直接处理，其他类型交给 jsonable_encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+
+def encode_success_response(endpoint: Callable, status_code: Optional[int] = None) -> Callable:
+    """
+    包装路由函数：返回 SuccessResponse 时直接生成 FastJSONResponse
+
+    路由参数中注入的 Response 上设置的响应头和状态码会一并带上。
+    """
+    if getattr(endpoint, "__fast_json__", False):
+        return endpoint  # include_router 复制路由时已经包装过
+
+    response_params = [
+        name for name, param in inspect.signature(endpoint).parameters.items()
+        if param.annotation is Response
+    ]
+
+    def to_response(result: Any, kwargs: dict) -> Any:
+        if not isinstance(result, SuccessResponse):
+            return result
+        # 只做浅拷贝，data 中的字典与列表由 orjson 一次编码
+        response = FastJSONResponse(dict(result), status_code=status_code or 200)
+        for name in response_params:
+            sub_response = kwargs[name]
+            response.raw_headers.extend(sub_response.headers.raw)
+            if sub_response.status_code:
+                response.status_code = sub_response.status_code
+        return response
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            return to_response(await endpoint(*args, **kwargs), kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            return to_response(endpoint(*args, **kwargs), kwargs)
+    wrapper.__fast_json__ = True
+    return wrapper
+
+def list_etag(request: Request, version: str) -> str:
+    """由数据版本号和查询参数生成弱 ETag，同一版本下不同筛选/分页条件的 ETag 不同"""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{version}|{request.url.path}?{query}".encode()).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """按弱比较规则判断 If-None-Match 是否命中"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in {c.removeprefix("W/") for c in candidates}
+
+def not_modified(request: Request, response: Response, version: str) -> Optional[Response]:
+    """
+    条件 GET：If-None-Match 命中时返回 304 响应，调用方直接返回它而不执行列表查询
+
+    未命中时在 response 上设置 ETag，返回 None。
+    """
+    etag = list_etag(request, version)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+class FastJSONRoute(APIRoute):
+    """
+    SuccessResponse 只编码一次的路由
+
+    默认流程会按 response_model 校验返回值、转换为可序列化对象后再 json.dumps，
+    大列表要完整遍历三遍。返回 SuccessResponse 时改为直接用 orjson 编码，
+    response_model 仍用于生成 OpenAPI 文档；返回其他对象时仍走默认流程。
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, encode_success_response(endpoint, kwargs.get("status_code")), **kwargs)
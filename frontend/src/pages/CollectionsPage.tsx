@@ -3,7 +3,7 @@ import { motion } from 'framer-motion'
 import { Search, Heart, Grid, List, FolderPlus, MoreHorizontal, Plus, X, Link as LinkIcon, RefreshCw, ArrowLeft, Trash2 } from 'lucide-react'
 import { useNavigate, useParams } from 'react-router-dom'
 import { toast } from 'react-hot-toast'
-import { CollectionService } from '@/services/collectionService'
+import { CollectionService, COLLECTION_CARD_FIELDS } from '@/services/collectionService'
 import { CategoryService } from '@/services/categoryService'
 import { Collection, Platform, Category, ContentType } from '@/types'
 
@@ -55,7 +55,7 @@ const CollectionsPage = () => {
   const loadCollections = async () => {
     try {
       setLoading(true)
-      const params: any = { limit: 100 }
+      const params: any = { limit: 100, fields: COLLECTION_CARD_FIELDS }
       if (selectedCategoryId) {
         params.category_id = selectedCategoryId
       }
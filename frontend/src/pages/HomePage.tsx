@@ -3,7 +3,7 @@ import { motion } from 'framer-motion'
 import { Search, Plus, Heart, MessageCircle, TrendingUp } from 'lucide-react'
 import { useNavigate } from 'react-router-dom'
 import { useAuthStore } from '@/stores/authStore'
-import { CollectionService } from '@/services/collectionService'
+import { CollectionService, COLLECTION_CARD_FIELDS } from '@/services/collectionService'
 import { Collection, Platform } from '@/types'
 
 const HomePage = () => {
@@ -26,7 +26,7 @@ const HomePage = () => {
   const loadCollections = async () => {
     try {
       setLoading(true)
-      const data = await CollectionService.getCollections({ limit: 12 })
+      const data = await CollectionService.getCollections({ limit: 12, fields: COLLECTION_CARD_FIELDS })
       setCollections(data || [])
     } catch (error) {
       console.error('Failed to load collections:', error)
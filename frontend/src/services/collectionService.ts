@@ -2,13 +2,20 @@ import { apiClient } from './apiClient'
 import { Collection } from '@/types'
 
 export interface CollectionQueryParams {
+  cursor?: string
   skip?: number
   limit?: number
   platform?: string
   category?: string
   category_id?: number
+  tag?: string
+  fields?: string
 }
 
+// 列表卡片展示的字段，列表接口默认不返回正文，卡片需要正文摘要
+export const COLLECTION_CARD_FIELDS =
+  'title,content,url,author,cover_image,platform,category,category_id,collected_at,like_count'
+
 export class CollectionService {
   static async getCollections(params?: CollectionQueryParams): Promise<Collection[]> {
     const response = await apiClient.get<Collection[]>('/collections', { params })
@@ -1,14 +1,23 @@
+import csv
+import io
+import json
+import os
+import re
+from datetime import datetime
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+
+# 测试数据库配置
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+os.environ.setdefault("DATABASE_URL", SQLALCHEMY_DATABASE_URL)
+
 from main import app
 from database import Base, get_db
-from models import User
+from models import User, Collection, Like
 from utils.security import get_password_hash
 
-# 测试数据库配置
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -28,6 +37,21 @@ def setup_database():
     yield
     Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture(autouse=True)
+def flush_like_counter():
+    """写回点赞增量，SQLite 会复用被删除的主键，残留的增量会带到后续测试"""
+    from services.like_counter import flush_like_counts
+    yield
+    db = TestingSessionLocal()
+    flush_like_counts(db)
+    db.close()
+
+@pytest.fixture(autouse=True)
+def reset_list_counts():
+    """测试直接写入数据库时不会使列表总数缓存失效，每个测试开始前清空"""
+    from services.list_counts import list_counts
+    list_counts.invalidate('bot_messages', 'bot_messages_trash')
+
 @pytest.fixture
 def client():
     """创建测试客户端"""
@@ -58,6 +82,62 @@ def get_auth_token(client, username="testuser", password="password123"):
     })
     return response.json()["access_token"]
 
+def get_auth_headers(client, username="testuser", password="password123"):
+    """通过JSON登录获取认证请求头"""
+    response = client.post("/api/v1/login", json={
+        "username": username,
+        "password": password
+    })
+    return {"Authorization": f"Bearer {response.json()['data']['access_token']}"}
+
+@pytest.fixture
+def make_collections(test_user):
+    """批量创建测试收藏，测试结束后清理"""
+    db = TestingSessionLocal()
+    created_ids = []
+
+    def _make(count, **kwargs):
+        items = []
+        for i in range(count):
+            item = Collection(
+                user_id=test_user.id,
+                platform=kwargs.get("platform", "bilibili"),
+                content_id=f"{kwargs.get('prefix', 'item')}{len(created_ids) + i}",
+                title=kwargs.get("title", f"测试收藏{i}"),
+                content=kwargs.get("content", "测试内容"),
+            )
+            db.add(item)
+            items.append(item)
+        db.commit()
+        created_ids.extend(item.id for item in items)
+        return items
+
+    yield _make
+    db.query(Like).filter(Like.collection_id.in_(created_ids)).delete(synchronize_session=False)
+    db.query(Collection).filter(Collection.id.in_(created_ids)).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+class QueryCounter:
+    """统计并记录执行的SQL语句"""
+
+    def __init__(self, bind):
+        self.bind = bind
+        self.count = 0
+        self.statements = []
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+        if not executemany:
+            self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.bind, "before_cursor_execute", self._on_execute)
+
 class TestAuth:
     def test_register_user(self, client):
         """测试用户注册"""
@@ -118,6 +198,1350 @@ class TestCollections:
         response = client.get("/api/v1/collections")
         assert response.status_code == 401
 
+class TestCollectionQueries:
+    def test_list_query_count_is_constant(self, client, test_user, make_collections):
+        """列表查询的SQL语句数量不随分页大小增长"""
+        from services.like_counter import reconcile_like_counts
+        headers = get_auth_headers(client)
+        items = make_collections(5)
+        db = TestingSessionLocal()
+        db.add_all([Like(user_id=test_user.id, collection_id=item.id) for item in items[:2]])
+        db.commit()
+        reconcile_like_counts(db)
+        db.close()
+
+        with QueryCounter(engine) as small:
+            response = client.get("/api/v1/collections?limit=1", headers=headers)
+        assert response.status_code == 200
+        with QueryCounter(engine) as large:
+            response = client.get("/api/v1/collections?limit=100", headers=headers)
+        assert response.status_code == 200
+
+        data = response.json()["data"]
+        assert len(data) == 5
+        assert small.count == large.count
+        like_counts = {item["id"]: item["like_count"] for item in data}
+        assert like_counts[items[0].id] == 1
+        assert like_counts[items[4].id] == 0
+
+    def test_list_field_projection(self, client, test_user, make_collections):
+        """列表默认不读取正文；fields 只读取并返回指定字段，未请求 like_count 时不统计点赞"""
+        headers = get_auth_headers(client)
+        make_collections(2, content="很长的正文" * 200)
+
+        with QueryCounter(engine) as counter:
+            response = client.get("/api/v1/collections", headers=headers)
+        items = response.json()["data"]
+        assert len(items) == 2
+        assert "content" not in items[0]
+        assert (items[0]["title"], items[0]["like_count"]) == ("测试收藏1", 0)
+        assert not any(re.search(r"collections_content\b", statement) for statement, _ in counter.statements)
+
+        with QueryCounter(engine) as counter:
+            response = client.get("/api/v1/collections", params={"fields": "title, cover_image"}, headers=headers)
+        assert [set(item) for item in response.json()["data"]] == [{"id", "title", "cover_image"}] * 2
+        statements = [statement for statement, _ in counter.statements if "FROM collections" in statement]
+        assert statements and not any("likes" in statement or "collections_author" in statement for statement in statements)
+
+        response = client.get("/api/v1/collections", params={"fields": "title,content"}, headers=headers)
+        assert response.json()["data"][0]["content"].startswith("很长的正文")
+
+        response = client.get("/api/v1/collections", params={"fields": "title,password"}, headers=headers)
+        assert response.status_code == 400
+
+    def test_detail_includes_like_count(self, client, test_user, make_collections):
+        """详情接口返回点赞数"""
+        headers = get_auth_headers(client)
+        item = make_collections(1)[0]
+        client.post(f"/api/v1/collections/{item.id}/like", headers=headers)
+        response = client.get(f"/api/v1/collections/{item.id}", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["data"]["like_count"] == 1
+
+    def test_cursor_pagination_walks_all_pages(self, client, test_user, make_collections):
+        """游标分页按 collected_at 倒序遍历全部数据且不重复"""
+        headers = get_auth_headers(client)
+        items = make_collections(5)
+        seen = []
+        cursor = None
+        while True:
+            params = {"limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            body = client.get("/api/v1/collections", params=params, headers=headers).json()
+            seen.extend(item["id"] for item in body["data"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        assert seen == sorted((item.id for item in items), reverse=True)
+
+    def test_invalid_cursor_rejected(self, client, test_user):
+        """非法游标返回400"""
+        headers = get_auth_headers(client)
+        response = client.get("/api/v1/collections?cursor=not-a-cursor", headers=headers)
+        assert response.status_code == 400
+
+class TestBulkCreate:
+    def test_bulk_create_reports_per_item_errors(self, client, test_user):
+        """批量创建：有效条目一次写入，无效条目按下标返回错误"""
+        headers = get_auth_headers(client)
+        items = [
+            {"platform": "bilibili", "content_id": f"bulk{i}", "title": f"批量收藏{i}", "tags": ["导入"]}
+            for i in range(3)
+        ]
+        items.insert(1, {"platform": "unknown", "content_id": "bad"})
+
+        with QueryCounter(engine) as counter:
+            response = client.post("/api/v1/collections/bulk", json={"items": items}, headers=headers)
+        assert response.status_code == 200
+        data = response.json()["data"]
+        assert data["created"] == 3
+        assert [error["index"] for error in data["errors"]] == [1]
+        # 语句数与条目数无关：写入收藏、检索词和标签关联各一条，新标签在保存点内创建
+        assert counter.count < 14
+
+        for collection_id, expected in zip(data["created_ids"], ["bulk0", "bulk1", "bulk2"]):
+            item = client.get(f"/api/v1/collections/{collection_id}", headers=headers).json()["data"]
+            assert item["content_id"] == expected
+            assert item["tags"] == ["导入"]
+            client.delete(f"/api/v1/collections/{collection_id}", headers=headers)
+
+    def test_bulk_create_rejects_oversized_batch(self, client, test_user):
+        """超过单次上限返回400"""
+        headers = get_auth_headers(client)
+        items = [{"platform": "bilibili", "content_id": str(i), "title": "x"} for i in range(1001)]
+        response = client.post("/api/v1/collections/bulk", json={"items": items}, headers=headers)
+        assert response.status_code == 400
+
+class TestCollectionExport:
+    def test_export_ndjson_in_batches(self, client, make_collections, monkeypatch):
+        """NDJSON 导出跨多个批次时行数完整、顺序与列表一致"""
+        from services import collection_export
+        monkeypatch.setattr(collection_export, "EXPORT_BATCH_SIZE", 2)
+        make_collections(5, prefix="export")
+        response = client.get("/api/v1/collections/export?format=ndjson", headers=get_auth_headers(client))
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert "attachment" in response.headers["content-disposition"]
+        items = [json.loads(line) for line in response.text.splitlines()]
+        assert [item["content_id"] for item in items] == [f"export{i}" for i in range(4, -1, -1)]
+        assert items[0]["platform"] == "bilibili"
+        assert items[0]["like_count"] == 0
+
+    def test_export_csv_gzip(self, client, make_collections):
+        """CSV 导出可边生成边 gzip 压缩"""
+        make_collections(2, prefix="csv", title='标题, 含"引号"')
+        response = client.get("/api/v1/collections/export?format=csv&gzip=true", headers=get_auth_headers(client))
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        rows = list(csv.DictReader(io.StringIO(response.text.lstrip("\ufeff"))))
+        assert len(rows) == 2
+        assert rows[0]["title"] == '标题, 含"引号"'
+
+    def test_export_rejects_unknown_format(self, client, test_user):
+        response = client.get("/api/v1/collections/export?format=xml", headers=get_auth_headers(client))
+        assert response.status_code == 400
+
+@pytest.fixture
+def cleanup_user_data(test_user):
+    """清理测试用户通过接口写入的收藏、索引、标签、分类和导入任务"""
+    yield
+    from models import Category, CollectionSearchTerm, CollectionTag, CollectionTombstone, ImportJob, Tag
+    db = TestingSessionLocal()
+    ids = [row.id for row in db.query(Collection.id).filter(Collection.user_id == test_user.id)]
+    db.query(CollectionSearchTerm).filter(CollectionSearchTerm.collection_id.in_(ids)).delete(synchronize_session=False)
+    db.query(CollectionTag).filter(CollectionTag.collection_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Like).filter(Like.collection_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Collection).filter(Collection.id.in_(ids)).delete(synchronize_session=False)
+    db.query(Tag).delete()
+    db.query(ImportJob).delete()
+    db.query(Category).filter(Category.user_id == test_user.id).delete(synchronize_session=False)
+    db.query(CollectionTombstone).filter(CollectionTombstone.user_id == test_user.id).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+class TestCollectionImport:
+    def test_import_ndjson_dedupes_and_reports_progress(self, client, make_collections, cleanup_user_data, monkeypatch):
+        """NDJSON 分批导入：文件内及库中已有的记录去重，错误按行号返回"""
+        from services import collection_import
+        monkeypatch.setattr(collection_import, "IMPORT_BATCH_SIZE", 2)
+        make_collections(1, prefix="imp-existing")
+        lines = [
+            {"platform": "bilibili", "content_id": "imp-1", "title": "导入一", "collected_at": "2023-05-01T08:00:00Z"},
+            {"platform": "bilibili", "content_id": "imp-2", "title": "导入二"},
+            {"platform": "bilibili", "content_id": "imp-1", "title": "文件内重复"},
+            {"platform": "bilibili", "content_id": "imp-existing0", "title": "库中已有"},
+            {"platform": "bilibili", "content_id": "imp-3"},
+            {"platform": "zhihu", "content_id": "imp-4", "title": "导入四", "tags": ["阅读"]},
+        ]
+        body = "\n".join(json.dumps(line, ensure_ascii=False) for line in lines) + "\n{not json}\n"
+        headers = get_auth_headers(client)
+        response = client.post("/api/v1/collections/import",
+            files={"file": ("items.ndjson", body.encode("utf-8"), "application/x-ndjson")}, headers=headers)
+        assert response.status_code == 200
+        job_id = response.json()["data"]["id"]
+
+        job = client.get(f"/api/v1/collections/import/{job_id}", headers=headers).json()["data"]
+        assert job["status"] == "completed"
+        assert job["progress"] == 1.0
+        assert (job["processed"], job["created"], job["duplicates"], job["failed"]) == (7, 3, 2, 2)
+        assert [error["line"] for error in job["errors"]] == [5, 7]
+
+        db = TestingSessionLocal()
+        imported = db.query(Collection).filter(Collection.content_id == "imp-1").one()
+        assert imported.collected_at.isoformat() == "2023-05-01T08:00:00"
+        db.close()
+
+    def test_import_csv(self, client, test_user, cleanup_user_data):
+        """CSV 导入：空值视为未填写，tags 支持逗号分隔"""
+        body = "\ufeffplatform,content_id,title,category_id,tags\nwechat,imp-csv,公众号文章,,\"读书,笔记\"\n"
+        headers = get_auth_headers(client)
+        response = client.post("/api/v1/collections/import",
+            files={"file": ("items.csv", body.encode("utf-8"), "text/csv")}, headers=headers)
+        job = client.get(f"/api/v1/collections/import/{response.json()['data']['id']}", headers=headers).json()["data"]
+        assert (job["created"], job["failed"]) == (1, 0)
+
+        db = TestingSessionLocal()
+        imported = db.query(Collection).filter(Collection.content_id == "imp-csv").one()
+        assert json.loads(imported.tags) == ["读书", "笔记"]
+        db.close()
+
+    def test_import_rejects_unknown_format(self, client, test_user):
+        response = client.post("/api/v1/collections/import",
+            files={"file": ("items.xlsx", b"data", "application/octet-stream")}, headers=get_auth_headers(client))
+        assert response.status_code == 400
+
+class TestCollectionTags:
+    def test_tags_filter_and_counts(self, client, cleanup_user_data):
+        """标签写入关联表，支持按标签筛选和计数，更新后同步"""
+        headers = get_auth_headers(client)
+        first = client.post("/api/v1/collections", json={
+            "platform": "bilibili", "content_id": "tag-1", "title": "一", "tags": ["教程", " 编程 ", "教程"]
+        }, headers=headers).json()["data"]
+        client.post("/api/v1/collections", json={
+            "platform": "bilibili", "content_id": "tag-2", "title": "二", "tags": ["教程"]
+        }, headers=headers)
+        assert first["tags"] == ["教程", "编程"]
+
+        response = client.get("/api/v1/collections", params={"tag": "编程"}, headers=headers)
+        assert [item["content_id"] for item in response.json()["data"]] == ["tag-1"]
+
+        counts = client.get("/api/v1/tags/counts", headers=headers).json()["data"]
+        assert [(item["name"], item["count"]) for item in counts] == [("教程", 2), ("编程", 1)]
+
+        client.put(f"/api/v1/collections/{first['id']}", json={"tags": ["随笔"]}, headers=headers)
+        counts = client.get("/api/v1/tags/counts", headers=headers).json()["data"]
+        assert {item["name"]: item["count"] for item in counts} == {"教程": 1, "随笔": 1}
+        assert client.get("/api/v1/collections", params={"tag": "编程"}, headers=headers).json()["data"] == []
+
+    def test_migrate_json_tags(self, test_user, cleanup_user_data):
+        """已有 JSON 标签可重复迁移到关联表"""
+        from models import CollectionTag
+        from services.collection_tags import migrate_json_tags
+        db = TestingSessionLocal()
+        db.add_all([
+            Collection(user_id=test_user.id, platform="zhihu", content_id="legacy-1", title="旧数据", tags='["历史", "迁移"]'),
+            Collection(user_id=test_user.id, platform="zhihu", content_id="legacy-2", title="旧数据", tags="not json"),
+        ])
+        db.commit()
+        assert migrate_json_tags(db) == 2
+        assert migrate_json_tags(db) == 0
+        assert db.query(CollectionTag).count() == 2
+        db.close()
+
+class TestCollectionUpsert:
+    def test_create_same_content_refreshes_metadata(self, client, cleanup_user_data):
+        """重复收藏同一内容时刷新元数据、合并标签，不新增记录"""
+        headers = get_auth_headers(client)
+        first = client.post("/api/v1/collections", json={
+            "platform": "bilibili", "content_id": "BV1up", "title": "旧标题", "category": "学习", "tags": ["教程"]
+        }, headers=headers).json()
+        second = client.post("/api/v1/collections", json={
+            "platform": "bilibili", "content_id": "BV1up", "title": "新标题", "category": "娱乐", "tags": ["编程"]
+        }, headers=headers).json()
+
+        assert first["message"] == "Collection created successfully"
+        assert second["message"] == "Collection already exists, metadata refreshed"
+        data = second["data"]
+        assert data["id"] == first["data"]["id"]
+        assert (data["title"], data["category"], data["tags"]) == ("新标题", "学习", ["教程", "编程"])
+
+        response = client.get("/api/v1/collections/search", params={"q": "新标题"}, headers=headers)
+        assert [item["id"] for item in response.json()["data"]] == [data["id"]]
+        db = TestingSessionLocal()
+        assert db.query(Collection).filter(Collection.content_id == "BV1up").count() == 1
+        db.close()
+
+    def test_bulk_create_skips_existing(self, client, make_collections, cleanup_user_data):
+        """批量创建跳过已收藏及请求内重复的内容，created_ids 与写入的条目对应"""
+        make_collections(1, prefix="dup")
+        headers = get_auth_headers(client)
+        items = [
+            {"platform": "bilibili", "content_id": "dup0", "title": "库中已有"},
+            {"platform": "bilibili", "content_id": "new-1", "title": "新一"},
+            {"platform": "bilibili", "content_id": "new-1", "title": "请求内重复"},
+            {"platform": "zhihu", "content_id": "dup0", "title": "其他平台"},
+        ]
+        data = client.post("/api/v1/collections/bulk", json={"items": items}, headers=headers).json()["data"]
+        assert (data["created"], data["duplicates"]) == (2, 2)
+
+        created = [client.get(f"/api/v1/collections/{collection_id}", headers=headers).json()["data"]
+                   for collection_id in data["created_ids"]]
+        assert [(item["platform"], item["content_id"], item["title"]) for item in created] == [
+            ("bilibili", "new-1", "新一"), ("zhihu", "dup0", "其他平台")
+        ]
+
+    def test_bulk_rows_ignore_concurrent_inserts(self, test_user, cleanup_user_data, monkeypatch):
+        """同一秒内其他请求写入的收藏不会被当作本批次创建的行"""
+        from models import PlatformEnum
+        from schemas import CollectionCreate
+        from services import collection_import, collection_upsert
+        db = TestingSessionLocal()
+        now = datetime.utcnow().replace(microsecond=0)
+        upsert_statement = collection_upsert.upsert_statement
+
+        def concurrent_upsert(session, values, refresh):
+            session.add(Collection(user_id=test_user.id, platform=PlatformEnum.ZHIHU, content_id="other",
+                                   title="其他请求", created_at=now, updated_at=now, collected_at=now))
+            session.flush()
+            return upsert_statement(session, values, refresh)
+
+        monkeypatch.setattr(collection_upsert, "upsert_statement", concurrent_upsert)
+        rows = [
+            dict(CollectionCreate(platform="bilibili", content_id=f"mine{i}", title="本批次").model_dump(),
+                 tags="[]", user_id=test_user.id, created_at=now, updated_at=now, collected_at=now)
+            for i in range(2)
+        ]
+        try:
+            created_ids = collection_import.insert_collection_rows(db, test_user.id, rows)
+            db.commit()
+            ids = {collection.content_id: collection.id for collection in db.query(Collection).filter(
+                Collection.user_id == test_user.id)}
+        finally:
+            db.close()
+        assert created_ids == [row["id"] for row in rows] == [ids["mine0"], ids["mine1"]]
+
+    def test_dedupe_existing_duplicates(self, tmp_path):
+        """去重任务合并历史重复收藏：保留最早一条，元数据取最新，点赞与标签合并"""
+        from models import CollectionTag, Tag
+        from services.collection_upsert import dedupe_collections
+        dedupe_engine = create_engine(f"sqlite:///{tmp_path / 'dedupe.db'}")
+        Base.metadata.create_all(bind=dedupe_engine)
+        with dedupe_engine.begin() as conn:
+            conn.exec_driver_sql("DROP INDEX uq_collections_user_platform_content")  # 模拟建立唯一约束前的数据
+
+        db = sessionmaker(bind=dedupe_engine)()
+        users = [User(username=f"u{i}", email=f"u{i}@example.com", hashed_password="x") for i in range(2)]
+        db.add_all(users)
+        db.flush()
+        collections = [
+            Collection(user_id=users[0].id, platform="bilibili", content_id="BV1", title="旧", category="学习",
+                       tags='["教程"]', collected_at=datetime(2023, 1, 1)),
+            Collection(user_id=users[0].id, platform="bilibili", content_id="BV1", title="新",
+                       tags='["编程"]', collected_at=datetime(2023, 6, 1)),
+            Collection(user_id=users[0].id, platform="zhihu", content_id="BV1", title="其他平台"),
+        ]
+        db.add_all(collections)
+        db.flush()
+        db.add_all([
+            Like(user_id=users[1].id, collection_id=collections[0].id),
+            Like(user_id=users[1].id, collection_id=collections[1].id),
+            Like(user_id=users[0].id, collection_id=collections[1].id),
+        ])
+        db.commit()
+
+        assert dedupe_collections(db) == 1
+        assert dedupe_collections(db) == 0
+        kept = db.query(Collection).filter(Collection.platform == "bilibili").one()
+        assert kept.id == collections[0].id
+        assert (kept.title, kept.category, kept.collected_at) == ("新", "学习", datetime(2023, 1, 1))
+        assert json.loads(kept.tags) == ["教程", "编程"]
+        assert sorted(like.user_id for like in db.query(Like).filter(Like.collection_id == kept.id)) == sorted(u.id for u in users)
+        assert db.query(Like).count() == 2
+        assert db.query(Tag.name).join(CollectionTag, CollectionTag.tag_id == Tag.id).filter(
+            CollectionTag.collection_id == kept.id
+        ).count() == 2
+        assert db.query(Collection).count() == 2
+        db.close()
+
+class TestLikeCounter:
+    def test_like_writes_delta_until_flush(self, client, make_collections):
+        """点赞写入增量行，读取时叠加；写回后落到 like_count 列并删除增量"""
+        from models import LikeCountDelta
+        from services.like_counter import flush_like_counts
+        headers = get_auth_headers(client)
+        item = make_collections(1)[0]
+        assert client.post(f"/api/v1/collections/{item.id}/like", headers=headers).status_code == 200
+        response = client.post(f"/api/v1/collections/{item.id}/like", headers=headers)
+        assert response.json()["message"] == "Already liked"
+
+        db = TestingSessionLocal()
+        assert db.query(Collection.like_count).filter(Collection.id == item.id).scalar() == 0
+        assert [row.delta for row in db.query(LikeCountDelta).filter(LikeCountDelta.collection_id == item.id)] == [1]
+        assert client.get(f"/api/v1/collections/{item.id}", headers=headers).json()["data"]["like_count"] == 1
+        assert client.get("/api/v1/collections", headers=headers).json()["data"][0]["like_count"] == 0  # 列表在写回后更新
+
+        with QueryCounter(engine) as counter:
+            assert flush_like_counts(db) == 1
+        assert sum(statement.startswith("UPDATE collections SET like_count") for statement, _ in counter.statements) == 1
+        assert db.query(LikeCountDelta).count() == 0
+        assert db.query(Collection.like_count).filter(Collection.id == item.id).scalar() == 1
+
+        assert client.delete(f"/api/v1/collections/{item.id}/like", headers=headers).status_code == 200
+        assert client.delete(f"/api/v1/collections/{item.id}/like", headers=headers).status_code == 404
+        assert client.get(f"/api/v1/collections/{item.id}", headers=headers).json()["data"]["like_count"] == 0
+        flush_like_counts(db)
+        assert db.query(Collection.like_count).filter(Collection.id == item.id).scalar() == 0
+        db.close()
+
+    def test_flush_groups_by_delta_and_applies_once(self, make_collections):
+        """增量相同的收藏合并为一条 UPDATE；已写回的增量不会被再次写回"""
+        from models import LikeCountDelta
+        from services.like_counter import flush_like_counts
+        items = make_collections(3)
+        db = TestingSessionLocal()
+        db.add_all([LikeCountDelta(collection_id=item.id, delta=2) for item in items])
+        db.add(LikeCountDelta(collection_id=items[0].id, delta=-1))
+        db.commit()
+
+        with QueryCounter(engine) as queries:
+            assert flush_like_counts(db) == 3
+        assert sum(statement.startswith("UPDATE collections SET like_count") for statement, _ in queries.statements) == 2
+        assert flush_like_counts(db) == 0
+        assert [db.query(Collection.like_count).filter(Collection.id == item.id).scalar() for item in items] == [1, 2, 2]
+        db.close()
+
+    def test_reconcile_fixes_drift(self, test_user, make_collections):
+        """对账按 likes 表修正丢失或多写的计数"""
+        from services.like_counter import reconcile_like_counts
+        items = make_collections(3)
+        db = TestingSessionLocal()
+        db.add(Like(user_id=test_user.id, collection_id=items[0].id))
+        db.query(Collection).filter(Collection.id == items[1].id).update({Collection.like_count: 5})
+        db.commit()
+
+        assert reconcile_like_counts(db, batch_size=2) == 2
+        assert reconcile_like_counts(db) == 0
+        assert [db.query(Collection.like_count).filter(Collection.id == item.id).scalar() for item in items] == [1, 0, 0]
+        db.close()
+
+    def test_reconcile_while_deltas_pending(self, client, test_user, make_collections):
+        """对账扣除尚未写回的增量，之后写回不会重复计数"""
+        from services.like_counter import flush_like_counts, reconcile_like_counts
+        headers = get_auth_headers(client)
+        item = make_collections(1)[0]
+        client.post(f"/api/v1/collections/{item.id}/like", headers=headers)
+
+        db = TestingSessionLocal()
+        assert reconcile_like_counts(db) == 0
+        assert client.get(f"/api/v1/collections/{item.id}", headers=headers).json()["data"]["like_count"] == 1
+        db.query(Collection).filter(Collection.id == item.id).update({Collection.like_count: 7})
+        db.commit()
+        assert reconcile_like_counts(db) == 1
+        assert db.query(Collection.like_count).filter(Collection.id == item.id).scalar() == 0
+        assert flush_like_counts(db) == 1
+        assert db.query(Collection.like_count).filter(Collection.id == item.id).scalar() == 1
+        db.close()
+
+class TestConditionalGet:
+    def test_collection_list_not_modified(self, client, make_collections, cleanup_user_data):
+        """ETag 未变化时返回 304 且不执行列表查询；任何写操作后 ETag 变化"""
+        headers = get_auth_headers(client)
+        item = make_collections(2)[0]
+        response = client.get("/api/v1/collections", headers=headers)
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "private, no-cache"
+
+        with QueryCounter(engine) as counter:
+            response = client.get("/api/v1/collections", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert not any("FROM collections" in statement for statement, _ in counter.statements)
+
+        other = client.get("/api/v1/collections", params={"limit": 1}, headers={**headers, "If-None-Match": etag})
+        assert other.status_code == 200
+        assert other.headers["etag"] != etag
+
+        client.put(f"/api/v1/collections/{item.id}", json={"title": "新标题"}, headers=headers)
+        response = client.get("/api/v1/collections", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        etag = response.headers["etag"]
+
+        client.post("/api/v1/collections", json={"platform": "bilibili", "content_id": "etag-new", "title": "新增"},
+                    headers=headers)
+        assert client.get("/api/v1/collections", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+    def test_category_list_and_like_flush(self, client, make_collections, cleanup_user_data):
+        """分类写操作和点赞数写回同样使 ETag 失效"""
+        from services.like_counter import flush_like_counts
+        headers = get_auth_headers(client)
+        item = make_collections(1)[0]
+        etag = client.get("/api/v1/categories", headers=headers).headers["etag"]
+        assert client.get("/api/v1/categories", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+        client.post("/api/v1/categories", json={"name": "ETag分类"}, headers=headers)
+        response = client.get("/api/v1/categories", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert [category["name"] for category in response.json()["data"]] == ["ETag分类"]
+
+        etag = client.get("/api/v1/collections", headers=headers).headers["etag"]
+        client.post(f"/api/v1/collections/{item.id}/like", headers=headers)
+        # 写回之前版本号不变，命中 304 的列表与重新查询的列表点赞数一致
+        assert client.get("/api/v1/collections", headers={**headers, "If-None-Match": etag}).status_code == 304
+        assert client.get("/api/v1/collections", headers=headers).json()["data"][0]["like_count"] == 0
+        db = TestingSessionLocal()
+        flush_like_counts(db)
+        db.close()
+        response = client.get("/api/v1/collections", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json()["data"][0]["like_count"] == 1
+
+class TestCollectionSync:
+    def test_changes_since_token(self, client, test_user, cleanup_user_data):
+        """增量同步返回令牌之后新增、修改的收藏和删除的收藏ID"""
+        headers = get_auth_headers(client)
+        ids = [
+            client.post("/api/v1/collections", json={"platform": "bilibili", "content_id": f"sync{i}", "title": f"同步{i}"},
+                        headers=headers).json()["data"]["id"]
+            for i in range(3)
+        ]
+        data = client.get("/api/v1/collections/changes", headers=headers).json()["data"]
+        assert [item["id"] for item in data["changed"]] == ids
+        assert (data["deleted"], data["has_more"]) == ([], False)
+        assert "content" not in data["changed"][0]
+        since = data["next_since"]
+
+        client.put(f"/api/v1/collections/{ids[2]}", json={"title": "已修改"}, headers=headers)
+        client.delete(f"/api/v1/collections/{ids[0]}", headers=headers)
+        new_id = client.post("/api/v1/collections", json={"platform": "zhihu", "content_id": "sync-new", "title": "新增"},
+                             headers=headers).json()["data"]["id"]
+
+        with QueryCounter(engine) as counter:
+            data = client.get("/api/v1/collections/changes", params={"since": since}, headers=headers).json()["data"]
+        assert [(item["id"], item["title"]) for item in data["changed"]] == [(ids[2], "已修改"), (new_id, "新增")]
+        assert data["deleted"] == [ids[0]]
+        assert sum("FROM collection" in statement for statement, _ in counter.statements) == 2
+
+        data = client.get("/api/v1/collections/changes", params={"since": data["next_since"]}, headers=headers).json()["data"]
+        assert (data["changed"], data["deleted"], data["has_more"]) == ([], [], False)
+
+    def test_changes_paginate_within_one_sequence(self, client, test_user, cleanup_user_data):
+        """同一批写入的收藏版本号相同，分页按 (change_seq, id) 继续，不重复不遗漏"""
+        from utils.pagination import encode_sync_token
+        headers = get_auth_headers(client)
+        items = [{"platform": "bilibili", "content_id": f"page{i}", "title": f"分页{i}"} for i in range(5)]
+        created_ids = client.post("/api/v1/collections/bulk", json={"items": items}, headers=headers).json()["data"]["created_ids"]
+
+        seen, since = [], None
+        while True:
+            params = {"limit": 2, "fields": "title", **({"since": since} if since else {})}
+            data = client.get("/api/v1/collections/changes", params=params, headers=headers).json()["data"]
+            seen.extend(item["id"] for item in data["changed"])
+            since = data["next_since"]
+            if not data["has_more"]:
+                break
+        assert seen == created_ids
+
+        response = client.get("/api/v1/collections/changes", params={"since": "not-a-token"}, headers=headers)
+        assert response.status_code == 400
+        response = client.get("/api/v1/collections/changes", params={"since": encode_sync_token(10 ** 9, 0)}, headers=headers)
+        assert response.status_code == 410
+
+@pytest.fixture
+def bot_jobs():
+    """清理测试写入的机器人任务"""
+    from models import BotJob
+    yield BotJob
+    db = TestingSessionLocal()
+    db.query(BotJob).delete()
+    db.commit()
+    db.close()
+
+class TestBotJobQueue:
+    def test_bot_message_enqueues_jobs(self, client, test_user, bot_jobs, monkeypatch):
+        """机器人消息为每个链接写入持久化任务，不在 Web 进程内处理"""
+        from config.settings import settings
+        monkeypatch.setattr(settings, "BOT_TOKEN", "test-bot-token")
+        response = client.post(
+            "/api/v1/bot/message",
+            json={"message": "看看 https://www.bilibili.com/video/BV1xx411c7mD 和 https://www.zhihu.com/question/1"},
+            headers={"Authorization": "Bearer test-bot-token"}
+        )
+        data = response.json()["data"]
+        db = TestingSessionLocal()
+        jobs = db.query(bot_jobs).order_by(bot_jobs.id).all()
+        assert [job.id for job in jobs] == data["job_ids"]
+        user_id = db.query(User.id).first().id  # 机器人消息保存到第一个用户
+        assert [(job.user_id, job.status, job.attempts) for job in jobs] == [(user_id, "pending", 0)] * 2
+        db.close()
+
+    def test_lease_is_exclusive_and_expires(self, test_user, bot_jobs):
+        """同一任务只会被一个租约抢到；租约过期后可被重新租约"""
+        from datetime import timedelta
+        from services.bot_jobs import enqueue_jobs, lease_jobs
+        db = TestingSessionLocal()
+        enqueue_jobs(db, test_user.id, ["https://example.com/a", "https://example.com/b"])
+        db.commit()
+
+        first = lease_jobs(db, "worker-1", 1, lease_seconds=60)
+        second = lease_jobs(db, "worker-2", 5, lease_seconds=60)
+        assert len(first) == len(second) == 1
+        assert first[0].id != second[0].id
+        assert lease_jobs(db, "worker-3", 5, lease_seconds=60) == []
+
+        db.query(bot_jobs).filter(bot_jobs.id == first[0].id).update(
+            {bot_jobs.leased_until: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+        reclaimed = lease_jobs(db, "worker-3", 5, lease_seconds=60)
+        assert [(job.id, job.attempts) for job in reclaimed] == [(first[0].id, 2)]
+        db.close()
+
+    def test_expired_lease_at_max_attempts_is_dead_lettered(self, test_user, bot_jobs, monkeypatch):
+        """租约过期且已达到最大次数的任务转入死信，不再被重新租约"""
+        from datetime import timedelta
+        from config.settings import settings
+        from services.bot_jobs import enqueue_jobs, lease_jobs
+        monkeypatch.setattr(settings, "BOT_JOB_MAX_ATTEMPTS", 2)
+        db = TestingSessionLocal()
+        enqueue_jobs(db, test_user.id, ["https://example.com/crash"])
+        db.commit()
+
+        expire = {bot_jobs.leased_until: datetime.utcnow() - timedelta(seconds=1)}
+        job_id = lease_jobs(db, "worker-1", 1, lease_seconds=60)[0].id
+        db.query(bot_jobs).filter(bot_jobs.id == job_id).update(expire)
+        db.commit()
+        assert [job.attempts for job in lease_jobs(db, "worker-2", 1, lease_seconds=60)] == [2]
+        db.query(bot_jobs).filter(bot_jobs.id == job_id).update(expire)
+        db.commit()
+
+        assert lease_jobs(db, "worker-3", 1, lease_seconds=60) == []
+        job = db.query(bot_jobs).filter(bot_jobs.id == job_id).one()
+        assert (job.status, job.attempts, job.last_error, job.lease_owner) == ("dead", 2, "lease expired", None)
+        assert job.finished_at is not None
+        db.close()
+
+    def test_worker_retries_with_backoff_and_dead_letters(self, test_user, bot_jobs, monkeypatch):
+        """失败的任务按指数退避重新排队，超过最大次数或永久错误时转入死信"""
+        from concurrent.futures import ThreadPoolExecutor, wait
+        from datetime import timedelta
+        from config.settings import settings
+        from services.bot_jobs import PermanentJobError, enqueue_jobs, requeue_dead_jobs
+        from services.bot_worker import BotJobWorker
+        monkeypatch.setattr(settings, "BOT_JOB_MAX_ATTEMPTS", 2)
+        monkeypatch.setattr(settings, "BOT_JOB_RETRY_BASE_SECONDS", 60)
+
+        def handler(db, job):
+            if job.url.endswith("flaky"):
+                raise RuntimeError("timeout")
+            if job.url.endswith("poison"):
+                raise PermanentJobError("unsupported")
+
+        db = TestingSessionLocal()
+        jobs = enqueue_jobs(db, test_user.id, ["https://example.com/ok", "https://example.com/flaky", "https://example.com/poison"])
+        db.commit()
+        ids = [job.id for job in jobs]
+        worker = BotJobWorker(handler, concurrency=3, session_factory=TestingSessionLocal)
+
+        def run_batch():
+            running = set()
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                leased = worker.run_once(executor, running)
+                wait(running)
+            return leased
+
+        assert run_batch() == 3
+        db.expire_all()
+        ok, flaky, poison = [db.get(bot_jobs, job_id) for job_id in ids]
+        assert (ok.status, ok.finished_at is not None) == ("succeeded", True)
+        assert (poison.status, poison.attempts, poison.last_error) == ("dead", 1, "unsupported")
+        assert flaky.status == "pending"
+        assert 60 <= (flaky.run_at - datetime.utcnow()).total_seconds() <= 67
+        assert run_batch() == 0  # 退避时间未到
+
+        flaky.run_at = datetime.utcnow() - timedelta(seconds=1)
+        db.commit()
+        assert run_batch() == 1
+        db.expire_all()
+        assert (db.get(bot_jobs, ids[1]).status, db.get(bot_jobs, ids[1]).attempts) == ("dead", 2)
+
+        assert requeue_dead_jobs(db) == 2
+        assert {job.status for job in db.query(bot_jobs).filter(bot_jobs.id.in_(ids[1:]))} == {"pending"}
+        db.close()
+
+    def test_worker_renews_lease_of_running_job(self, test_user, bot_jobs):
+        """执行时间超过租约的任务由 worker 续约，不会被其他 worker 重新租约或转入死信"""
+        from concurrent.futures import ThreadPoolExecutor, wait
+        from datetime import timedelta
+        from services.bot_jobs import enqueue_jobs, lease_jobs
+        from services.bot_worker import BotJobWorker
+        seen = {}
+
+        def handler(db, job):
+            db.query(bot_jobs).filter(bot_jobs.id == job.id).update(
+                {bot_jobs.leased_until: datetime.utcnow() - timedelta(seconds=1)}
+            )
+            db.commit()
+            seen["renewed"] = worker.renew_leases()
+            other = TestingSessionLocal()
+            try:
+                seen["stolen"] = lease_jobs(other, "worker-2", 5, lease_seconds=60)
+                seen["leased_until"] = other.get(bot_jobs, job.id).leased_until
+            finally:
+                other.close()
+
+        db = TestingSessionLocal()
+        job = enqueue_jobs(db, test_user.id, ["https://example.com/slow"])[0]
+        db.commit()
+        job_id = job.id
+        worker = BotJobWorker(handler, concurrency=1, lease_seconds=60, session_factory=TestingSessionLocal)
+        running = set()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert worker.run_once(executor, running) == 1
+            wait(running)
+
+        assert (seen["renewed"], seen["stolen"]) == (1, [])
+        assert seen["leased_until"] > datetime.utcnow() + timedelta(seconds=50)
+        assert worker.renew_leases() == 0  # 任务结束后不再续约
+        db.expire_all()
+        job = db.get(bot_jobs, job_id)
+        assert (job.status, job.attempts) == ("succeeded", 1)
+        db.close()
+
+@pytest.fixture
+def bot_dedupe_records(bot_jobs, monkeypatch):
+    """启用机器人 token，并清理测试写入的消息、回收站和去重记录"""
+    from config.settings import settings
+    from models import BotIdempotencyKey, BotMessage, BotMessageTrash
+    monkeypatch.setattr(settings, "BOT_TOKEN", "test-bot-token")
+    yield BotIdempotencyKey
+    db = TestingSessionLocal()
+    db.query(BotIdempotencyKey).delete()
+    db.query(BotMessage).delete()
+    db.query(BotMessageTrash).delete()
+    db.commit()
+    db.close()
+
+class TestKeysetPagination:
+    def test_null_sort_values_page_after_others(self, bot_dedupe_records):
+        """排序列为 NULL 的行排在最后，游标可以跨过并停在这些行上"""
+        from models import BotMessage
+        from utils.pagination import keyset_paginate
+        db = TestingSessionLocal()
+        db.add_all([BotMessage(message=f"m{i}", received_at=datetime(2024, 1, 1 + i)) for i in range(4)])
+        db.commit()
+        db.query(BotMessage).filter(BotMessage.message.in_(["m1", "m3"])).update(
+            {BotMessage.received_at: None}, synchronize_session=False
+        )
+        db.commit()
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = keyset_paginate(db.query(BotMessage), BotMessage.received_at, BotMessage.id, 1, cursor=cursor)
+            seen.extend(row.message for row in rows)
+            if not cursor:
+                break
+        assert seen == ["m2", "m0", "m3", "m1"]
+        db.close()
+
+class TestBotIdempotency:
+    def test_parse_replays_retried_and_forwarded_messages(self, client, bot_dedupe_records):
+        """相同消息ID的重试和相同内容的转发返回首次的结果，不重复写入消息"""
+        from models import BotMessage
+        headers = {"Authorization": "Bearer test-bot-token", "X-Message-Source": "feishu"}
+        message = {"message": "看看 https://www.zhihu.com/question/1"}
+        first = client.post("/api/v1/bot/parse", json=message, headers={**headers, "X-Message-Id": "om_1"})
+        retried = client.post("/api/v1/bot/parse", json={"message": "edited"}, headers={**headers, "X-Message-Id": "om_1"})
+        forwarded = client.post("/api/v1/bot/parse", json={"message": "看看  https://www.zhihu.com/question/1 "}, headers=headers)
+        assert "Idempotent-Replayed" not in first.headers
+        assert retried.headers["Idempotent-Replayed"] == "true"
+        assert retried.json() == first.json()
+        assert forwarded.json()["data"]["message_id"] != first.json()["data"]["message_id"]  # 首次按内容到达
+        assert client.post("/api/v1/bot/parse", json=message, headers=headers).json() == forwarded.json()
+
+        db = TestingSessionLocal()
+        assert db.query(BotMessage).count() == 2
+        db.close()
+
+    def test_message_retry_does_not_enqueue_twice(self, client, test_user, bot_dedupe_records):
+        """/bot/message 的重复请求返回首次的任务ID，不重复创建抓取任务"""
+        from models import BotJob
+        headers = {"Authorization": "Bearer test-bot-token", "Idempotency-Key": "retry-1"}
+        message = {"message": "https://www.bilibili.com/video/BV1xx411c7mD"}
+        first = client.post("/api/v1/bot/message", json=message, headers=headers).json()
+        second = client.post("/api/v1/bot/message", json=message, headers=headers).json()
+        assert second == first
+        db = TestingSessionLocal()
+        assert [job.id for job in db.query(BotJob)] == first["data"]["job_ids"]
+        db.close()
+
+    def test_dedupe_window_and_concurrent_save(self, bot_dedupe_records, monkeypatch):
+        """窗口外的记录不再生效并被新响应替换；并发写入同一键时只有一个成功"""
+        from datetime import timedelta
+        from config.settings import settings
+        from services import bot_dedupe
+        monkeypatch.setattr(settings, "BOT_DEDUPE_WINDOW_SECONDS", 60)
+        key = bot_dedupe.dedupe_key("hello")
+        assert key == bot_dedupe.dedupe_key(" hello\n") != bot_dedupe.dedupe_key("hello", "id-1")
+
+        db = TestingSessionLocal()
+        assert bot_dedupe.save_response(db, "parse", key, {"n": 1})
+        db.commit()
+        other = TestingSessionLocal()
+        assert bot_dedupe.save_response(other, "parse", key, {"n": 2}) is False
+        other.rollback()
+        other.close()
+        assert bot_dedupe.find_response(db, "parse", key) == {"n": 1}
+        assert bot_dedupe.find_response(db, "message", key) is None
+
+        db.query(bot_dedupe_records).update({bot_dedupe_records.created_at: datetime.utcnow() - timedelta(seconds=61)})
+        db.commit()
+        assert bot_dedupe.find_response(db, "parse", key) is None
+        assert bot_dedupe.save_response(db, "parse", key, {"n": 3})
+        db.commit()
+        assert bot_dedupe.find_response(db, "parse", key) == {"n": 3}
+        assert db.query(bot_dedupe_records).count() == 1
+        db.close()
+
+class TestBotParsing:
+    def test_parse_links_matches_host_suffixes(self):
+        """按主机名后缀识别平台，保持链接出现顺序并去重"""
+        from routers.bot import parse_links
+        links = parse_links(
+            "https://b23.tv/AbC123 https://www.bilibili.com/video/BV1xx411c7mD https://zhuanlan.zhihu.com/p/1 "
+            "https://www.zhihu.com/question/12/answer/34 https://notbilibili.com/video/BV1 https://b23.tv/AbC123"
+        )
+        assert [(link["platform"], link["content_id"], link["short_link"]) for link in links] == [
+            ("bilibili", "AbC123", True),
+            ("bilibili", "BV1xx411c7mD", False),
+            ("zhihu", None, False),
+            ("zhihu", "34", False),
+            ("other", None, False),
+        ]
+
+    def test_batch_parse(self, client, bot_dedupe_records):
+        """批量解析按请求顺序返回结果，重复消息（包括已单条解析过的）返回首次的结果"""
+        from models import BotMessage
+        headers = {"Authorization": "Bearer test-bot-token"}
+        single = client.post("/api/v1/bot/parse", json={"message": "https://www.douyin.com/video/123"}, headers=headers).json()
+        response = client.post("/api/v1/bot/parse/batch", json={"messages": [
+            {"message": "http://xhslink.com/o/375N4Taih1F", "message_id": "om_1"},
+            {"message": "没有链接"},
+            {"message": "https://www.douyin.com/video/123"},
+            {"message": "重新编辑", "message_id": "om_1"},
+        ]}, headers=headers).json()
+        data = response["data"]
+        assert (data["total_messages"], data["total_links"], data["replayed_count"]) == (4, 3, 2)
+        first, empty, replayed, retried = data["results"]
+        assert first["data"]["links"][0]["content_id"] == "375N4Taih1F"
+        assert empty["success"] is False
+        assert replayed == single
+        assert retried == first
+
+        db = TestingSessionLocal()
+        assert db.query(BotMessage).count() == 3
+        db.close()
+        too_many = {"messages": [{"message": f"m{i}"} for i in range(501)]}
+        assert client.post("/api/v1/bot/parse/batch", json=too_many, headers=headers).status_code == 422
+
+class TestBotTrash:
+    def add_messages(self, db, count):
+        from models import BotMessage
+        messages = [
+            BotMessage(message=f"消息 {i}", source="feishu", parsed_urls="[]", total_links=i, processed=True,
+                       received_at=datetime(2024, 1, 1, 12, i))
+            for i in range(count)
+        ]
+        db.add_all(messages)
+        db.commit()
+        return [message.id for message in messages]
+
+    def test_move_to_trash_in_chunks(self, test_user, bot_dedupe_records):
+        """按块复制并删除消息，每块提交后报告进度，内容完整复制到回收站"""
+        from models import BotMessage, BotMessageTrash
+        from services import bot_trash
+        db = TestingSessionLocal()
+        ids = self.add_messages(db, 5)
+        progress = []
+        assert bot_trash.move_to_trash(db, deleted_by=test_user.id, chunk_size=2, progress=progress.append) == 5
+        assert progress == [2, 4, 5]
+        assert db.query(BotMessage).count() == 0
+        trash = db.query(BotMessageTrash).order_by(BotMessageTrash.original_id).all()
+        assert [row.original_id for row in trash] == ids
+        assert (trash[3].message, trash[3].source, trash[3].total_links, trash[3].deleted_by) == ("消息 3", "feishu", 3, test_user.id)
+        assert trash[3].received_at == datetime(2024, 1, 1, 12, 3)
+        assert (trash[0].expires_at - trash[0].deleted_at).days == 7
+        assert bot_trash.move_to_trash(db, [ids[0], 999999]) == 0
+        db.query(BotMessageTrash).delete()
+        db.commit()
+        db.close()
+
+    def test_batch_restore(self, client, test_user, bot_dedupe_records):
+        """批量恢复按原 ID 恢复，原 ID 被占用时分配新 ID，过期和不存在的消息被跳过"""
+        from datetime import timedelta
+        from models import BotMessage, BotMessageTrash
+        from services import bot_trash
+        db = TestingSessionLocal()
+        ids = self.add_messages(db, 4)
+        bot_trash.move_to_trash(db, ids)
+        db.add(BotMessage(id=ids[1], message="占用原 ID", received_at=datetime.utcnow()))
+        trash = {row.original_id: row.id for row in db.query(BotMessageTrash)}
+        db.query(BotMessageTrash).filter(BotMessageTrash.original_id == ids[3]).update(
+            {BotMessageTrash.expires_at: datetime.utcnow() - timedelta(seconds=1)}
+        )
+        db.commit()
+
+        response = client.post("/api/v1/bot/trash/batch-restore", json=list(trash.values()) + [999999],
+                               headers=get_auth_headers(client))
+        assert response.status_code == 200
+        assert (response.json()["restored_count"], response.json()["skipped_count"]) == (3, 2)
+        restored = {row.message: row.id for row in db.query(BotMessage)}
+        assert restored["消息 0"] == ids[0] and restored["消息 2"] == ids[2]
+        assert restored["消息 1"] != ids[1]
+        assert [row.original_id for row in db.query(BotMessageTrash)] == [ids[3]]
+        db.query(BotMessageTrash).delete()
+        db.commit()
+        db.close()
+
+class TestListCounts:
+    def test_totals_cached_until_local_write(self, client, test_user, bot_dedupe_records):
+        """翻页复用缓存的总数，exact=true 精确计算，本进程删除消息后按行数修正缓存"""
+        from models import BotMessage
+        headers = {"Authorization": "Bearer test-bot-token", "X-Message-Source": "feishu"}
+        ids = [
+            client.post("/api/v1/bot/parse", json={"message": f"https://www.zhihu.com/question/{i}"}, headers=headers).json()["data"]["message_id"]
+            for i in range(2)
+        ]
+
+        def list_messages(**params):
+            with QueryCounter(engine) as counter:
+                body = client.get("/api/v1/bot/messages", params={"source": "feishu", "limit": 1, **params}).json()
+            counts = [s for s, _ in counter.statements if "count(" in s.lower()]
+            return body["total"], body["total_exact"], len(counts)
+
+        assert list_messages() == (2, True, 1)
+        db = TestingSessionLocal()
+        db.add(BotMessage(message="其他进程写入", source="feishu", received_at=datetime.utcnow()))
+        db.commit()
+        db.close()
+        assert list_messages() == (2, False, 0)
+        assert list_messages(exact="true") == (3, True, 1)
+        assert list_messages(source="dingtalk") == (0, True, 1)  # 按筛选条件分别缓存
+
+        assert client.delete(f"/api/v1/bot/messages/{ids[0]}", headers=get_auth_headers(client)).status_code == 200
+        assert list_messages() == (2, False, 0)
+        assert list_messages(exact="true") == (2, True, 1)
+
+    def test_cached_total_survives_insert(self, client, test_user, bot_dedupe_records):
+        """写入单条消息后缓存的总数按行数修正而不失效，其他筛选条件的缓存不受影响"""
+        headers = {"Authorization": "Bearer test-bot-token", "X-Message-Source": "feishu"}
+
+        def list_messages(source):
+            with QueryCounter(engine) as counter:
+                body = client.get("/api/v1/bot/messages", params={"source": source, "limit": 1}).json()
+            return body["total"], len([s for s, _ in counter.statements if "count(" in s.lower()])
+
+        client.post("/api/v1/bot/parse", json={"message": "第一条"}, headers=headers)
+        assert (list_messages("feishu"), list_messages("dingtalk")) == ((1, 1), (0, 1))
+        client.post("/api/v1/bot/parse", json={"message": "第二条"}, headers=headers)
+        client.post("/api/v1/bot/parse", json={"message": "第二条"}, headers=headers)  # 重复消息不计入
+        assert (list_messages("feishu"), list_messages("dingtalk")) == ((2, 0), (0, 0))
+        response = client.post("/api/v1/bot/parse/batch", json={"messages": [{"message": "第三条"}, {"message": "第四条"}]},
+                               headers=headers)
+        assert response.status_code == 200
+        assert list_messages("feishu") == (4, 0)
+
+class TestJanitor:
+    def test_purges_expired_rows_in_batches(self, bot_dedupe_records, monkeypatch):
+        """只删除过期数据，分批提交，并记录删除数量"""
+        from datetime import timedelta
+        from prometheus_client import REGISTRY
+        from config.settings import settings
+        from models import BotMessageTrash
+        from services.janitor import Janitor
+        monkeypatch.setattr(settings, "BOT_DEDUPE_WINDOW_SECONDS", 60)
+        now = datetime.utcnow()
+        db = TestingSessionLocal()
+        db.add_all([
+            BotMessageTrash(original_id=i, message=f"消息 {i}", received_at=now,
+                            expires_at=now + timedelta(days=-1 if i < 5 else 1))
+            for i in range(6)
+        ] + [
+            bot_dedupe_records(endpoint="parse", key=f"k{i}", response="{}", created_at=now - timedelta(seconds=seconds))
+            for i, seconds in enumerate([120, 0])
+        ])
+        db.commit()
+        labels = {"task": "bot_trash"}
+        before = REGISTRY.get_sample_value("janitor_purged_rows_total", labels) or 0
+
+        results = Janitor(batch_size=2, session_factory=TestingSessionLocal).run_once()
+        assert results == {"bot_trash": 5, "bot_idempotency_keys": 1}
+        assert REGISTRY.get_sample_value("janitor_purged_rows_total", labels) == before + 5
+        assert REGISTRY.get_sample_value("janitor_run_duration_seconds_count", labels) >= 1
+        assert [row.original_id for row in db.query(BotMessageTrash)] == [5]
+        assert [row.key for row in db.query(bot_dedupe_records)] == ["k1"]
+        db.query(BotMessageTrash).delete()
+        db.commit()
+        db.close()
+
+    def test_trash_list_is_read_only(self, client, test_user):
+        """回收站列表不再删除过期消息，只是不返回它们"""
+        from datetime import timedelta
+        from models import BotMessageTrash
+        now = datetime.utcnow()
+        db = TestingSessionLocal()
+        db.add_all([
+            BotMessageTrash(original_id=1, message="已过期", received_at=now, deleted_at=now, expires_at=now - timedelta(days=1)),
+            BotMessageTrash(original_id=2, message="未过期", received_at=now, deleted_at=now, expires_at=now + timedelta(days=1)),
+        ])
+        db.commit()
+        headers = get_auth_headers(client)
+        with QueryCounter(engine) as counter:
+            response = client.get("/api/v1/bot/trash", headers=headers)
+        assert response.status_code == 200
+        assert [msg["message"] for msg in response.json()["messages"]] == ["未过期"]
+        assert response.json()["total"] == 1
+        assert not [s for s, _ in counter.statements if s.lstrip().upper().startswith(("DELETE", "UPDATE", "INSERT"))]
+        assert db.query(BotMessageTrash).count() == 2
+        db.query(BotMessageTrash).delete()
+        db.commit()
+        db.close()
+
+class TestCollectionSearch:
+    def test_tokenize_mixes_cjk_bigrams_and_words(self):
+        """中文切二元组，英文按单词切分"""
+        from services.search import tokenize
+        assert tokenize("机器学习 Python3入门") == ["机器", "器学", "学习", "python3", "入门"]
+
+    def test_search_ranks_and_highlights(self, client, test_user):
+        """创建、更新、删除时同步索引，标题命中排在正文命中之前"""
+        headers = get_auth_headers(client)
+        created = []
+        for title, content in [("深度学习入门", "介绍神经网络"), ("周末随笔", "最近在看深度学习的书")]:
+            response = client.post("/api/v1/collections", json={
+                "platform": "zhihu", "content_id": title, "title": title, "content": content
+            }, headers=headers)
+            created.append(response.json()["data"]["id"])
+
+        data = client.get("/api/v1/collections/search", params={"q": "深度学习"}, headers=headers).json()["data"]
+        assert [item["id"] for item in data] == created
+        assert data[0]["highlight"]["title"] == "<em>深度学习</em>入门"
+
+        client.put(f"/api/v1/collections/{created[0]}", json={"title": "读书清单"}, headers=headers)
+        client.delete(f"/api/v1/collections/{created[1]}", headers=headers)
+        data = client.get("/api/v1/collections/search", params={"q": "深度学习"}, headers=headers).json()["data"]
+        assert data == []
+
+        data = client.get("/api/v1/collections/search", params={"q": "读书"}, headers=headers).json()["data"]
+        assert [item["id"] for item in data] == [created[0]]
+        client.delete(f"/api/v1/collections/{created[0]}", headers=headers)
+
+class TestHttpClient:
+    def test_client_rebuilt_on_new_loop_closes_old_pool(self):
+        """事件循环变化时重建客户端，旧循环仍在运行时其中的旧连接池被关闭"""
+        import asyncio
+        import threading
+        from services.http_client import AsyncHttpClient
+        http = AsyncHttpClient()
+        old_loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=old_loop.run_forever, daemon=True)
+        thread.start()
+
+        async def get_client():
+            return http._get_client()
+
+        try:
+            old_client = asyncio.run_coroutine_threadsafe(get_client(), old_loop).result(5)
+            new_client = asyncio.run(get_client())
+            assert new_client is not old_client
+            for _ in range(100):
+                if old_client.is_closed:
+                    break
+                asyncio.run_coroutine_threadsafe(asyncio.sleep(0.01), old_loop).result(5)
+            assert old_client.is_closed
+            assert not new_client.is_closed
+        finally:
+            old_loop.call_soon_threadsafe(old_loop.stop)
+            thread.join(5)
+            old_loop.close()
+
+class TestParseUrl:
+    def test_parse_bilibili_url_uses_shared_client(self, client, test_user, monkeypatch):
+        """parse-url 通过共享异步客户端抓取并解析"""
+        import httpx
+        from services.http_client import http_client
+        from services.url_cache import url_metadata_cache
+        requested = []
+
+        async def fake_get(url, headers=None, timeout=None, follow_redirects=True):
+            requested.append(url)
+            return httpx.Response(200, json={
+                "code": 0,
+                "data": {"title": "测试视频", "desc": "简介", "pic": "https://i0.hdslb.com/cover.jpg", "owner": {"name": "UP主"}}
+            }, request=httpx.Request("GET", url))
+
+        monkeypatch.setattr(http_client, "get", fake_get)
+        url_metadata_cache.local.clear()
+        headers = get_auth_headers(client)
+        response = client.post("/api/v1/collections/parse-url",
+            json={"url": "https://www.bilibili.com/video/BV1xx411c7mD"}, headers=headers)
+        data = response.json()["data"]
+        assert requested == ["https://api.bilibili.com/x/web-interface/view?bvid=BV1xx411c7mD"]
+        assert data["title"] == "测试视频"
+        assert data["author"] == "UP主"
+
+        # 带追踪参数的同一链接命中缓存
+        response = client.post("/api/v1/collections/parse-url",
+            json={"url": "https://www.bilibili.com/video/BV1xx411c7mD/?spm_id_from=333.1007#reply"}, headers=headers)
+        assert response.headers["X-Cache"] == "HIT"
+        assert response.json()["data"]["title"] == "测试视频"
+        assert len(requested) == 1
+
+        response = client.post("/api/v1/collections/parse-url?bypass_cache=true",
+            json={"url": "https://www.bilibili.com/video/BV1xx411c7mD"}, headers=headers)
+        assert response.headers["X-Cache"] == "MISS"
+        assert len(requested) == 2
+
+    def test_normalize_url_drops_tracking_params(self):
+        """缓存键忽略大小写域名、锚点、追踪参数和参数顺序"""
+        from services.url_cache import normalize_url
+        assert normalize_url("https://WWW.Bilibili.com/video/BV1/?b=2&utm_source=x&a=1#top") == \
+            normalize_url("https://www.bilibili.com/video/BV1?a=1&b=2")
+
+    def test_normalize_url_keeps_params_on_other_sites(self):
+        """平台追踪参数只对对应平台去除，其他网站上的同名参数保留"""
+        from services.url_cache import normalize_url
+        assert normalize_url("https://www.bilibili.com/video/BV1?from=search&ts=1") == \
+            normalize_url("https://www.bilibili.com/video/BV1")
+        assert normalize_url("https://example.com/feed?from=2024&ts=1&utm_medium=x") == "https://example.com/feed?from=2024&ts=1"
+        assert normalize_url("https://example.com/feed?from=2024") != normalize_url("https://example.com/feed?from=2025")
+
+class TestOutboundLimiter:
+    def test_token_bucket_reserves_future_tokens(self):
+        """令牌用完后按预约顺序返回递增的等待时间，时间推移后恢复"""
+        from services.outbound_limiter import TokenBucket
+        now = [0.0]
+        bucket = TokenBucket(rate=1, burst=2, clock=lambda: now[0])
+        assert [bucket.reserve() for _ in range(4)] == [0, 0, 1, 2]
+        now[0] = 5.0
+        assert bucket.reserve() == 0
+        assert TokenBucket(rate=0, burst=1).reserve() == 0
+
+    def test_sync_concurrency_is_capped_per_domain(self):
+        """同一域名（含子域名）的并发请求数不超过配置，其他域名不受影响"""
+        import threading
+        import time
+        from services.outbound_limiter import OutboundLimiter
+        limiter = OutboundLimiter({"example.com": {"rate": 0, "concurrency": 2}}, rate=0, concurrency=5)
+        assert limiter.domain_for("https://cdn.api.example.com/a") == "example.com"
+        assert limiter.domain_for("https://notexample.com/a") == "notexample.com"
+
+        active, peak, lock = [0], [0], threading.Lock()
+
+        def fetch(url):
+            with limiter.limit(url):
+                with lock:
+                    active[0] += 1
+                    peak[0] = max(peak[0], active[0])
+                time.sleep(0.05)
+                with lock:
+                    active[0] -= 1
+
+        threads = [threading.Thread(target=fetch, args=(f"https://www{i}.example.com/",)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert peak[0] == 2
+
+    def test_async_rate_limit_records_wait_time(self):
+        """异步路径按令牌桶限速，并记录排队等待时间"""
+        import asyncio
+        import time
+        from prometheus_client import REGISTRY
+        from services.outbound_limiter import OutboundLimiter
+        limiter = OutboundLimiter({"example.com": {"rate": 20, "burst": 1}})
+        labels = {"domain": "example.com"}
+        before = REGISTRY.get_sample_value("outbound_request_wait_seconds_count", labels) or 0
+
+        async def fetch_all():
+            async def fetch():
+                async with limiter.limit_async("https://example.com/page"):
+                    pass
+            started = time.monotonic()
+            await asyncio.gather(*[fetch() for _ in range(5)])
+            return time.monotonic() - started
+
+        assert asyncio.run(fetch_all()) >= 0.19  # 首个请求立即发送，其余每 50ms 一个
+        assert REGISTRY.get_sample_value("outbound_request_wait_seconds_count", labels) == before + 5
+        assert REGISTRY.get_sample_value("outbound_request_wait_seconds_sum", labels) > 0
+
+class TestEventLoop:
+    def test_bot_endpoints_with_db_run_in_threadpool(self):
+        """使用同步数据库会话的机器人接口不能是 async def，否则会在事件循环中阻塞"""
+        import inspect
+        from routers import bot
+        routes = [route for route in bot.router.routes if "db" in inspect.signature(route.endpoint).parameters]
+        assert routes
+        assert [route.path for route in routes if inspect.iscoroutinefunction(route.endpoint)] == []
+
+    def test_loop_monitor_reports_blocking_callback(self):
+        """阻塞事件循环的回调被计数，看门狗能拿到阻塞时的调用栈"""
+        import asyncio
+        import threading
+        import time
+        from prometheus_client import REGISTRY
+        from services.loop_monitor import LoopLagMonitor
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+        before = REGISTRY.get_sample_value("event_loop_stalls_total") or 0
+        stacks = []
+
+        def blocking_callback():
+            time.sleep(0.3)
+
+        async def run():
+            task = asyncio.create_task(monitor.run())
+            await asyncio.sleep(0.05)
+            threading.Timer(0.15, lambda: stacks.append(monitor.blocked_stack())).start()
+            blocking_callback()
+            await asyncio.sleep(0.05)
+            task.cancel()
+
+        asyncio.run(run())
+        assert REGISTRY.get_sample_value("event_loop_stalls_total") >= before + 1
+        assert "blocking_callback" in stacks[0]
+        assert monitor.record(0.001) is False
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "pages")
+
+def load_page(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+class TestPageExtractor:
+    def test_extract_xiaohongshu_state(self):
+        """从小红书初始状态中提取字段，兼容 undefined 和转义引号"""
+        from services.page_extractor import extract_page_fields
+        fields = extract_page_fields("xiaohongshu", load_page("xiaohongshu_note.html"))
+        assert fields["content_id"] == "65a1b2c3d4e5f6a7b8c9d0e1"
+        assert fields["title"] == "秋季穿搭｜一周通勤不重样"
+        assert '"基础款"' in fields["content"]
+        assert fields["author"] == "小鹿穿搭日记"
+        assert fields["cover_image"] == "https://sns-webpic-qc.xhscdn.com/cover-1.jpg"
+
+    def test_extract_douyin_render_data(self):
+        """从URL编码的 RENDER_DATA 中提取字段"""
+        from services.page_extractor import extract_page_fields
+        fields = extract_page_fields("douyin", load_page("douyin_video.html"))
+        assert fields["content_id"] == "7301234567890123456"
+        assert fields["author"] == "户外小王"
+        assert fields["cover_image"] == "https://p3-pc-sign.douyinpic.com/origin-cover.jpeg"
+
+    def test_fallback_to_meta_tags(self):
+        """没有状态JSON时退回 meta 标签"""
+        from services.page_extractor import extract_page_fields
+        page = '<html><head><meta property="og:title" content="A &amp; B"></head></html>'
+        assert extract_page_fields("douyin", page) == {"title": "A & B"}
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")  # SQLite 查询计划中未使用任何索引的全表扫描
+
+class TestQueryPlans:
+    def test_router_queries_use_indexes(self, client, make_collections, cleanup_user_data):
+        """对接口实际执行的每条查询运行 EXPLAIN，不允许出现全表扫描"""
+        from models import HotContent
+        from services.hot_content_crawler import HotContentCrawler
+        headers = get_auth_headers(client)
+        item = make_collections(3)[0]
+        client.put(f"/api/v1/collections/{item.id}", json={"tags": ["索引"]}, headers=headers)
+        cursor = client.get("/api/v1/collections", params={"limit": 1}, headers=headers).json()["next_cursor"]
+
+        paths = [
+            "/api/v1/collections",
+            f"/api/v1/collections?cursor={cursor}",
+            "/api/v1/collections?platform=bilibili",
+            "/api/v1/collections?category=生活",
+            "/api/v1/collections?category_id=1",
+            "/api/v1/collections?tag=索引",
+            "/api/v1/collections/search?q=测试",
+            "/api/v1/collections/changes",
+            "/api/v1/collections/changes?since=WzEsMF0",
+            f"/api/v1/collections/{item.id}",
+            "/api/v1/collections/export",
+            "/api/v1/tags/counts",
+            "/api/v1/categories",
+            "/api/v1/bot/messages",
+            "/api/v1/bot/messages?source=feishu",
+            "/api/v1/bot/trash",
+            "/api/v1/hot-content",
+            "/api/v1/hot-content?platform=BILIBILI",
+        ]
+        db = TestingSessionLocal()
+        with QueryCounter(engine) as counter:
+            for path in paths:
+                assert client.get(path, headers=headers).status_code == 200, path
+            HotContentCrawler().save_to_database(
+                [{"platform": "BILIBILI", "title": "热门", "url": "https://www.bilibili.com/video/BV1", "hot_score": 1}], db
+            )
+        db.query(HotContent).delete()
+        db.commit()
+        db.close()
+
+        scans = []
+        with engine.connect() as conn:
+            for statement, parameters in counter.statements:
+                if not statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE")):
+                    continue
+                for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters):
+                    match = FULL_SCAN.match(row[-1])
+                    if match and match.group(1) in Base.metadata.tables:  # 子查询物化后的扫描不计
+                        scans.append((row[-1], " ".join(statement.split())))
+        assert scans == []
+
+    def test_migrations_match_models(self, tmp_path):
+        """在空库上执行全部迁移后，索引与模型声明一致"""
+        from alembic import command
+        from alembic.config import Config
+        from sqlalchemy import inspect
+        backend_dir = os.path.join(os.path.dirname(__file__), "..", "backend")
+        url = f"sqlite:///{tmp_path / 'migrations.db'}"
+        config = Config(os.path.join(backend_dir, "alembic.ini"))
+        config.set_main_option("sqlalchemy.url", url)
+        command.upgrade(config, "head")
+
+        inspector = inspect(create_engine(url))
+        for table in Base.metadata.sorted_tables:
+            expected = {index.name for index in table.indexes}
+            actual = {index["name"] for index in inspector.get_indexes(table.name)}
+            assert expected <= actual, table.name
+
+class TestResponseEncoding:
+    def test_success_response_skips_default_serialization(self, client, make_collections, monkeypatch):
+        """SuccessResponse 由 orjson 直接编码，不再经过 FastAPI 的校验与序列化，输出仍符合声明的模型"""
+        import fastapi.routing
+        from typing import List
+        from schemas import Collection as CollectionSchema, PaginatedResponse
+
+        def fail(**kwargs):
+            raise AssertionError("serialize_response should not be called")
+
+        headers = get_auth_headers(client)
+        make_collections(3)
+        monkeypatch.setattr(fastapi.routing, "serialize_response", fail)
+        response = client.get("/api/v1/collections", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        page = PaginatedResponse[List[CollectionSchema]].model_validate(response.json())
+        assert len(page.data) == 3
+        assert page.data[0].platform == "bilibili"
+
+    def test_openapi_uses_typed_models(self):
+        """response_model 仍用于生成接口文档"""
+        schema = app.openapi()
+        response = schema["paths"]["/api/v1/collections"]["get"]["responses"]["200"]
+        ref = response["content"]["application/json"]["schema"]["$ref"]
+        assert ref.endswith("PaginatedResponse_List_Collection__")
+
 class TestCategories:
     def test_create_category(self, client, test_user):
         """测试创建分类"""